@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2022 PrimeQA Team
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Measure CPU time spent serializing "/ask" responses.
+
+"before": response validated against "QuestionAnsweringResponse" (exclude_none) and rendered with stdlib "json",
+          as FastAPI does for a plain dictionary returned from an endpoint
+"after":  response rendered directly with "ORJSONResponse"
+
+With "--compact", responses are built in "compact" response mode (evidences refer to documents by index).
+
+Usage: python -m benchmarks.ask_serialization [--documents 20] [--answers 5] [--iterations 500] [--compact]
+"""
+
+import argparse
+import random
+import string
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from orchestrator.service.application import build_answer, build_documents
+from orchestrator.service.data_models import QuestionAnsweringResponse
+
+
+def _random_text(length: int) -> str:
+    return "".join(random.choices(string.ascii_letters + " ", k=length))
+
+
+def build_response(
+    num_documents: int, num_answers: int, document_length: int, compact: bool = False
+):
+    documents = [
+        {
+            "text": _random_text(document_length),
+            "score": random.random() * 20,
+            "confidence": random.random(),
+            "document_id": f"document-{idx}",
+            "title": _random_text(40),
+            "url": None,
+        }
+        for idx in range(num_documents)
+    ]
+    answers = [
+        {
+            "text": _random_text(30),
+            "confidence": random.random(),
+            "evidences": [
+                {
+                    "context_index": random.randrange(num_documents),
+                    "offsets": [{"start": 10, "end": 40}],
+                }
+            ],
+        }
+        for _ in range(num_answers)
+    ]
+    return {
+        "answers": [build_answer(answer, documents, compact) for answer in answers],
+        "documents": build_documents(documents),
+    }
+
+
+def serialize_before(response: dict) -> bytes:
+    value = QuestionAnsweringResponse.validate(response)
+    return JSONResponse(content=jsonable_encoder(value, exclude_none=True)).body
+
+
+def serialize_after(response: dict) -> bytes:
+    return ORJSONResponse(content=response).body
+
+
+def measure(fn, response: dict, iterations: int) -> float:
+    start_t = time.process_time()
+    for _ in range(iterations):
+        fn(response)
+    return (time.process_time() - start_t) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=20)
+    parser.add_argument("--answers", type=int, default=5)
+    parser.add_argument("--document-length", type=int, default=2000)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--compact", action="store_true")
+    args = parser.parse_args()
+
+    response = build_response(
+        args.documents, args.answers, args.document_length, args.compact
+    )
+    before = measure(serialize_before, response, args.iterations)
+    after = measure(serialize_after, response, args.iterations)
+
+    print(
+        f"documents={args.documents} answers={args.answers} document_length={args.document_length} compact={args.compact}"
+    )
+    print(f"payload: {len(serialize_after(response))} bytes")
+    print(f"before: {before * 1e3:.3f} ms CPU/response")
+    print(f"after:  {after * 1e3:.3f} ms CPU/response ({before / after:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
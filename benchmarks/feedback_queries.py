@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2022 PrimeQA Team
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Measure prepared statement reuse for "get_feedbacks" under mixed filter traffic.
+
+"before": values quoted into the WHERE clause, as the feedback store used to do
+"after":  parameterized WHERE clause from "build_where_clause", with bucketed "IN (?, ...)" arities
+
+Reuse rate is the hit rate of a per-connection LRU statement cache of the same size as
+sqlite3's ("cached_statements"), replayed over the SQL text of each query.
+
+Usage: python -m benchmarks.feedback_queries [--queries 5000] [--feedbacks 20000]
+"""
+
+from collections import OrderedDict
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from orchestrator.store import Store, build_where_clause
+
+
+_APPLICATIONS = ["reading", "qa", "retrieval"]
+
+
+def build_legacy_query(where_clauses: dict) -> str:
+    conditions = []
+    for field_name, field_value in where_clauses.items():
+        if isinstance(field_value, list):
+            conditions.append(f"""{field_name} IN ("{'","'.join(field_value)}")""")
+        else:
+            conditions.append(f'{field_name}="{field_value}"')
+    return "SELECT * FROM feedback_table WHERE " + " AND ".join(conditions)
+
+
+def build_query(where_clauses: dict):
+    where_clause, params = build_where_clause(where_clauses)
+    return "SELECT * FROM feedback_table" + where_clause, params
+
+
+def random_filters(num_feedbacks: int, num_users: int) -> dict:
+    # Mix of lookups by feedback ids, by users and by applications, as issued by [GET] /feedbacks
+    where_clauses = {}
+    kind = random.random()
+    if kind < 0.4:
+        where_clauses["feedback_id"] = [
+            f"feedback-{random.randrange(num_feedbacks)}"
+            for _ in range(random.randint(1, 12))
+        ]
+    if kind >= 0.3:
+        where_clauses["user_id"] = [
+            f"user-{random.randrange(num_users)}" for _ in range(random.randint(1, 3))
+        ]
+    if kind >= 0.7:
+        where_clauses["application"] = random.sample(
+            _APPLICATIONS, random.randint(1, len(_APPLICATIONS))
+        )
+    return where_clauses
+
+
+def reuse_rate(statements: list, cache_size: int) -> float:
+    cache = OrderedDict()
+    hits = 0
+    for statement in statements:
+        if statement in cache:
+            cache.move_to_end(statement)
+            hits += 1
+        else:
+            cache[statement] = True
+            if len(cache) > cache_size:
+                cache.popitem(last=False)
+    return hits / len(statements)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--feedbacks", type=int, default=20000)
+    parser.add_argument("--users", type=int, default=200)
+    args = parser.parse_args()
+
+    random.seed(81)
+    filters = [random_filters(args.feedbacks, args.users) for _ in range(args.queries)]
+
+    with tempfile.TemporaryDirectory() as store_dir:
+        os.environ["STORE_DIR"] = store_dir
+        store = Store()
+        store.save_feedbacks(
+            [
+                {
+                    "feedback_id": f"feedback-{idx}",
+                    "user_id": f"user-{idx % args.users}",
+                    "question": "What is PrimeQA?",
+                    "answer": "open source repository",
+                    "thumbs_up": True,
+                    "thumbs_down": False,
+                    "context": "PrimeQA is a public open source repository.",
+                    "start_char_offset": 10,
+                    "end_char_offset": 32,
+                    "application": _APPLICATIONS[idx % len(_APPLICATIONS)],
+                }
+                for idx in range(args.feedbacks)
+            ]
+        )
+        conn = store._connections.get()
+        cache_size = store._connections.cached_statements
+
+        before_statements = [build_legacy_query(where) for where in filters]
+        start_t = time.perf_counter()
+        for statement in before_statements:
+            conn.execute(statement).fetchall()
+        before_t = (time.perf_counter() - start_t) / args.queries
+
+        after_queries = [build_query(where) for where in filters]
+        start_t = time.perf_counter()
+        for statement, params in after_queries:
+            conn.execute(statement, params).fetchall()
+        after_t = (time.perf_counter() - start_t) / args.queries
+
+        store.close()
+
+    print(
+        f"queries={args.queries} feedbacks={args.feedbacks} users={args.users} cached_statements={cache_size}"
+    )
+    print(
+        f"before: {len(set(before_statements)):5d} distinct statements, "
+        f"{reuse_rate(before_statements, cache_size):6.1%} reuse, {before_t * 1e6:7.1f} us/query"
+    )
+    after_statements = [statement for statement, _ in after_queries]
+    print(
+        f"after:  {len(set(after_statements)):5d} distinct statements, "
+        f"{reuse_rate(after_statements, cache_size):6.1%} reuse, {after_t * 1e6:7.1f} us/query"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2022 PrimeQA Team
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Measure feedback store throughput under concurrent readers and writers.
+
+"before": a new SQLite connection per call (rollback journal), as the feedback store used to do
+"after":  "Store", with long-lived per-thread connections in WAL mode
+"write-behind": "Store" with write-behind enabled, writes applied in batched transactions by a background thread
+
+Usage: python -m benchmarks.feedback_store [--readers 4] [--writers 4] [--operations 500]
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+from orchestrator.store import Store
+
+
+def _feedback(writer: int, idx: int) -> dict:
+    return {
+        "feedback_id": f"feedback-{writer}-{idx}",
+        "user_id": f"user-{writer}",
+        "question": "What is PrimeQA?",
+        "answer": "open source repository",
+        "thumbs_up": True,
+        "thumbs_down": False,
+        "context": "PrimeQA is a public open source repository. " * 10,
+        "start_char_offset": 10,
+        "end_char_offset": 32,
+        "application": "reading",
+    }
+
+
+class ConnectionPerCallStore:
+    def __init__(self, root_dir: str):
+        self.db_file = os.path.join(root_dir, "sqlite_db.db")
+        conn = sqlite3.connect(self.db_file)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS feedback_table (feedback_id VARCHAR, user_id VARCHAR, question VARCHAR, answer VARCHAR, thumbs_up BOOLEAN, thumbs_down BOOLEAN, context VARCHAR, start_char_offset INTEGER, end_char_offset INTEGER, application VARCAR)"
+        )
+        conn.commit()
+        conn.close()
+
+    def save_feedback(self, feedback: dict):
+        conn = sqlite3.connect(self.db_file)
+        try:
+            rows = conn.execute(
+                "SELECT * FROM feedback_table WHERE feedback_id=? AND user_id=?",
+                (feedback["feedback_id"], feedback["user_id"]),
+            ).fetchall()
+            if not rows:
+                conn.execute(
+                    "INSERT INTO feedback_table VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    list(feedback.values()),
+                )
+                conn.commit()
+        finally:
+            conn.close()
+
+    def get_feedbacks(self, where_clauses: dict = None) -> list:
+        conn = sqlite3.connect(self.db_file)
+        try:
+            return conn.execute(
+                f'SELECT * FROM feedback_table WHERE user_id="{where_clauses["user_id"]}"'
+            ).fetchall()
+        finally:
+            conn.close()
+
+
+def measure(store, readers: int, writers: int, operations: int) -> dict:
+    errors = []
+
+    def write(writer: int) -> float:
+        start_t = time.perf_counter()
+        for idx in range(operations):
+            try:
+                store.save_feedback(_feedback(writer, idx))
+            except sqlite3.Error as error:
+                errors.append(error)
+        return time.perf_counter() - start_t
+
+    def read(reader: int) -> float:
+        start_t = time.perf_counter()
+        for _ in range(operations):
+            try:
+                store.get_feedbacks(where_clauses={"user_id": f"user-{reader}"})
+            except sqlite3.Error as error:
+                errors.append(error)
+        return time.perf_counter() - start_t
+
+    start_t = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=readers + writers) as executor:
+        write_times = [executor.submit(write, writer) for writer in range(writers)]
+        read_times = [executor.submit(read, reader) for reader in range(readers)]
+        write_times = [future.result() for future in write_times]
+        read_times = [future.result() for future in read_times]
+    elapsed = time.perf_counter() - start_t
+
+    return {
+        "writes/s": writers * operations / max(write_times),
+        "reads/s": readers * operations / max(read_times),
+        "elapsed": elapsed,
+        "errors": len(errors),
+    }
+
+
+def _report(label: str, result: dict):
+    print(
+        f"{label} {result['writes/s']:8.0f} writes/s {result['reads/s']:8.0f} reads/s "
+        f"({result['elapsed']:.2f} s, {result['errors']} errors)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--operations", type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"readers={args.readers} writers={args.writers} operations={args.operations}")
+    with tempfile.TemporaryDirectory() as before_dir:
+        before = measure(
+            ConnectionPerCallStore(before_dir),
+            args.readers,
+            args.writers,
+            args.operations,
+        )
+    _report("before:", before)
+
+    with tempfile.TemporaryDirectory() as after_dir:
+        os.environ["STORE_DIR"] = after_dir
+        store = Store()
+        try:
+            after = measure(store, args.readers, args.writers, args.operations)
+        finally:
+            store.close()
+    _report("after: ", after)
+
+    with tempfile.TemporaryDirectory() as write_behind_dir:
+        os.environ["STORE_DIR"] = write_behind_dir
+        store = Store()
+        store.enable_write_behind()
+        try:
+            write_behind = measure(store, args.readers, args.writers, args.operations)
+        finally:
+            store.close()
+    _report("write-behind:", write_behind)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,429 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2022 PrimeQA Team
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import Any, Callable, Tuple, Union
+from collections import OrderedDict
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from orchestrator.metrics import Metrics
+
+
+_logger = logging.getLogger(__name__)
+
+
+def build_cache_key(*parts: str) -> str:
+    """
+    Build a stable cache key from string parts
+
+    Parameters
+    ----------
+    parts: str
+        ordered parts identifying the cached item
+
+    Returns
+    -------
+    str: hex digest
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+#############################################################################################
+#                       Request coalescing
+#############################################################################################
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls sharing the same key into a single execution.
+
+    The first caller (leader) runs the function, while callers arriving before it
+    finishes (followers) wait and receive the leader's result or exception.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable, *args, **kwargs) -> Tuple[Any, bool]:
+        """
+        Run function or join an in-flight execution for the same key
+
+        Parameters
+        ----------
+        key: str
+            key identifying identical calls
+        fn: Callable
+            function to run
+
+        Returns
+        -------
+        tuple: result, True if result was shared from another in-flight call
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _Call()
+                self._calls[key] = call
+            else:
+                call.followers += 1
+
+        # Followers wait for leader's execution
+        if not is_leader:
+            call.done.wait()
+            Metrics.increment(f"{self.name}_coalesced_calls")
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        # Leader runs the function
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result, False
+        except BaseException as err:
+            call.error = err
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            Metrics.increment(f"{self.name}_executions")
+            call.done.set()
+
+
+#############################################################################################
+#                       In-memory (first level) cache
+#############################################################################################
+class _Entry:
+    def __init__(self, value: Any, delta: float, expires_at: float, stale_until: float):
+        self.value = value
+        self.delta = delta
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+
+
+class LoadingCache:
+    """
+    Thread-safe, size bounded LRU cache which loads missing values on demand.
+
+    To keep refresh load on backends smooth:
+    - TTL of each entry is randomized by +/- `jitter` fraction, so that entries loaded together do not expire together
+    - entries are recomputed early with a probability growing as expiry approaches
+      (XFetch, Vattani et al., "Optimal Probabilistic Cache Stampede Prevention")
+    - concurrent loads for the same key share a single loader execution
+    - if loader fails, last known value is served for up to `stale_ttl` seconds after expiry
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl: float,
+        max_size: int = 1024,
+        jitter: float = 0.1,
+        beta: float = 1.0,
+        stale_ttl: float = None,
+    ):
+        self.name = name
+        self.ttl = ttl
+        self.max_size = max_size
+        self.jitter = jitter
+        self.beta = beta
+        self.stale_ttl = ttl if stale_ttl is None else stale_ttl
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._loads = SingleFlight(name=name)
+
+    def _should_refresh(self, entry: _Entry, now: float) -> bool:
+        # XFetch: -log(U) for U in (0, 1] grows rarely large, hence only few callers refresh early
+        return (
+            now - entry.delta * self.beta * math.log(1.0 - random.random())
+            >= entry.expires_at
+        )
+
+    def _load(self, key: str, loader: Callable) -> Any:
+        start_t = time.time()
+        value = loader()
+        self.set(key, value, delta=time.time() - start_t)
+        return value
+
+    def get(self, key: str, loader: Callable) -> Any:
+        """
+        Get value from cache, loading it if missing or due for refresh
+
+        Parameters
+        ----------
+        key: str
+            cache key
+        loader: Callable
+            function with no arguments returning value for the key
+
+        Returns
+        -------
+        cached or freshly loaded value
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        # Step 1: Serve cached value, unless due for refresh
+        if entry is not None and not self._should_refresh(entry, now):
+            Metrics.increment(f"{self.name}_hits")
+            return entry.value
+
+        if entry is not None and now < entry.expires_at:
+            Metrics.increment(f"{self.name}_early_refreshes")
+        else:
+            Metrics.increment(f"{self.name}_misses")
+
+        # Step 2: Load value, sharing execution with concurrent loads for the same key
+        try:
+            value, _ = self._loads.do(key, self._load, key, loader)
+            return value
+        except Exception as err:
+            # Step 3: Serve stale value, if available
+            if entry is not None and now < entry.stale_until:
+                _logger.warning(
+                    "Serving stale %s cache entry, failed to refresh: %s",
+                    self.name,
+                    err,
+                )
+                Metrics.increment(f"{self.name}_stale_served")
+                return entry.value
+            raise
+
+    def set(self, key: str, value: Any, delta: float = 0.0):
+        expires_at = time.time() + self.ttl * (
+            1 + random.uniform(-self.jitter, self.jitter)
+        )
+        with self._lock:
+            self._entries[key] = _Entry(
+                value, delta, expires_at, expires_at + self.stale_ttl
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: str = None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+#############################################################################################
+#                       Persistent (second level) cache
+#############################################################################################
+class PersistentCache:
+    """
+    SQLite backed cache stored on disk.
+
+    Database runs in WAL mode so that all server workers on the same host can share it.
+    Expired entries and entries with stale version tags are removed by a background
+    compaction thread.
+    """
+
+    def __init__(
+        self,
+        db_file: str,
+        ttl: float,
+        compaction_interval: float = 600,
+        busy_timeout: float = 5.0,
+    ):
+        self.db_file = db_file
+        self.ttl = ttl
+        self.compaction_interval = compaction_interval
+        self.busy_timeout = busy_timeout
+
+        self._local = threading.local()
+        self._compactor = None
+        self._compactor_pid = None
+        self._compactor_lock = threading.Lock()
+        self._stopped = threading.Event()
+
+        # Create cache table, if necessary
+        conn = self._connection()
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_table (key VARCHAR PRIMARY KEY, version VARCHAR, value BLOB, expires_at REAL)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS cache_table_expires_at ON cache_table (expires_at)"
+        )
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections are opened per thread (and per process) as sqlite connections can not be shared
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.db_file, timeout=self.busy_timeout)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _ensure_compactor(self):
+        # Background thread is started lazily to make sure it runs in the serving process
+        if self._compactor_pid == os.getpid() or not self.compaction_interval:
+            return
+
+        with self._compactor_lock:
+            if self._compactor_pid != os.getpid():
+                self._compactor = threading.Thread(
+                    target=self._compaction_loop,
+                    name="persistent-cache-compactor",
+                    daemon=True,
+                )
+                self._compactor.start()
+                self._compactor_pid = os.getpid()
+
+    def _compaction_loop(self):
+        while not self._stopped.wait(self.compaction_interval):
+            self.compact()
+
+    def get(self, key: str, version: str = "") -> Union[Any, None]:
+        self._ensure_compactor()
+        try:
+            row = (
+                self._connection()
+                .execute(
+                    "SELECT value FROM cache_table WHERE key=? AND version=? AND expires_at>=?",
+                    (key, version, time.time()),
+                )
+                .fetchone()
+            )
+        except sqlite3.Error as error:
+            _logger.warning("Failed to read from persistent cache: %s", error)
+            return None
+
+        if row is None:
+            return None
+
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, version: str = "", ttl: float = None):
+        self._ensure_compactor()
+        try:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_table VALUES (?, ?, ?, ?)",
+                (
+                    key,
+                    version,
+                    json.dumps(value).encode("utf-8"),
+                    time.time() + (self.ttl if ttl is None else ttl),
+                ),
+            )
+            conn.commit()
+        except sqlite3.Error as error:
+            _logger.warning("Failed to write to persistent cache: %s", error)
+
+    def compact(self, version: str = None) -> int:
+        """
+        Delete expired entries (and entries not matching the version tag, if provided)
+        and return freed pages to the filesystem.
+
+        Parameters
+        ----------
+        version: str
+            active version tag
+
+        Returns
+        -------
+        int: number of deleted entries
+        """
+        try:
+            conn = self._connection()
+            if version is None:
+                cursor = conn.execute(
+                    "DELETE FROM cache_table WHERE expires_at<?", (time.time(),)
+                )
+            else:
+                cursor = conn.execute(
+                    "DELETE FROM cache_table WHERE expires_at<? OR version!=?",
+                    (time.time(), version),
+                )
+            conn.commit()
+            conn.execute("PRAGMA incremental_vacuum")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            return cursor.rowcount
+        except sqlite3.Error as error:
+            _logger.warning("Failed to compact persistent cache: %s", error)
+            return 0
+
+    def close(self):
+        self._stopped.set()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+#############################################################################################
+#                       Tiered cache
+#############################################################################################
+class TieredCache:
+    """
+    In-memory cache optionally backed by a persistent cache.
+
+    Lookups hit the in-memory tier first and fall back to the persistent tier, before
+    running the loader. Values loaded by the loader are written to both tiers.
+    """
+
+    def __init__(self, memory: LoadingCache, persistent: PersistentCache = None):
+        self.memory = memory
+        self.persistent = persistent
+
+    def get(self, key: str, loader: Callable, version: str = "") -> Any:
+        def load():
+            if self.persistent is not None:
+                value = self.persistent.get(key, version)
+                if value is not None:
+                    return value
+
+            value = loader()
+            if self.persistent is not None:
+                self.persistent.set(key, value, version)
+
+            return value
+
+        return self.memory.get(build_cache_key(key, version), load)
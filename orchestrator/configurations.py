@@ -174,6 +174,114 @@ class Settings(object):
     def num_rest_server_workers(self):
         pass
 
+    @config_value(property_type=positive_integer_type, default=30)
+    def rest_server_worker_graceful_timeout(self):
+        pass
+
+    @config_value(property_type=positive_integer_type, default=32)
+    def num_qa_endpoint_threads(self):
+        pass
+
+    @config_value(property_type=positive_integer_type, default=8)
+    def num_metadata_endpoint_threads(self):
+        pass
+
+    @config_value(property_type=positive_integer_type, default=8)
+    def num_feedback_endpoint_threads(self):
+        pass
+
+    @config_value(property_type=positive_integer_type, default=16)
+    def num_retriever_fan_out_threads(self):
+        pass
+
+    @config_value(property_type=positive_integer_type, default=16)
+    def num_discovery_shard_threads(self):
+        pass
+
+    @config_value(property_type=positive_integer_type, default=1000)
+    def feedback_ingestion_chunk_size(self):
+        pass
+
+    @config_value(property_type=positive_integer_type, default=67108864)
+    def feedback_ingestion_max_array_size(self):
+        pass
+
+    @config_value(property_type=bool, default=False)
+    def enable_feedback_write_behind(self):
+        pass
+
+    @config_value(property_type=float, default=0.05)
+    def feedback_write_behind_flush_interval(self):
+        pass
+
+    @config_value(property_type=positive_integer_type, default=500)
+    def feedback_write_behind_batch_size(self):
+        pass
+
+    @config_value(property_type=positive_integer_type, default=10000)
+    def feedback_write_behind_max_queue_size(self):
+        pass
+
+    @config_value(property_type=positive_integer_type, default=16)
+    def primeqa_retriever_max_concurrency(self):
+        pass
+
+    @config_value(property_type=positive_integer_type, default=8)
+    def primeqa_reader_max_concurrency(self):
+        pass
+
+    @config_value(property_type=positive_integer_type, default=16)
+    def discovery_retriever_max_concurrency(self):
+        pass
+
+    @config_value(property_type=positive_integer_type, default=64)
+    def backend_max_queue_size(self):
+        pass
+
+    @config_value(property_type=float, default=0.5)
+    def backend_queue_target(self):
+        pass
+
+    @config_value(property_type=float, default=5.0)
+    def backend_queue_interval(self):
+        pass
+
+    @config_value(property_type=positive_integer_type, default=1)
+    def backend_retry_after(self):
+        pass
+
+    @config_value(property_type=str, default="gradient")
+    def backend_limit_algorithm(self):
+        pass
+
+    @config_value(property_type=positive_integer_type, default=1)
+    def backend_min_concurrency(self):
+        pass
+
+    @config_value(property_type=float, default=1.5)
+    def backend_latency_tolerance(self):
+        pass
+
+    @config_value(property_type=positive_integer_type, default=32)
+    def discovery_connection_pool_size(self):
+        pass
+
+    @config_value(property_type=float, default=60.0)
+    def discovery_token_refresh_margin(self):
+        pass
+
+    @config_value(property_type=int, default=4)
+    def discovery_warm_up_connections(self):
+        pass
+
+    @config_value(property_type=positive_integer_type, default=16)
+    def discovery_max_clients(self):
+        pass
+
+    @config_value(property_type=bool, default=False)
+    def enable_async_discovery_retriever(self):
+        pass
+
     @config_value(property_type=bool)
     def require_client_auth(self):
         pass
@@ -206,6 +314,30 @@ class Settings(object):
     def require_ssl(self):
         pass
 
+    @config_value(property_type=bool, default=False)
+    def enable_answer_cache(self):
+        pass
+
+    @config_value(property_type=positive_integer_type, default=1024)
+    def answer_cache_size(self):
+        pass
+
+    @config_value(property_type=positive_integer_type, default=300)
+    def answer_cache_ttl(self):
+        pass
+
+    @config_value(property_type=bool, default=False)
+    def enable_persistent_answer_cache(self):
+        pass
+
+    @config_value(property_type=positive_integer_type, default=86400)
+    def persistent_answer_cache_ttl(self):
+        pass
+
+    @config_value(property_type=positive_integer_type, default=600)
+    def persistent_answer_cache_compaction_interval(self):
+        pass
+
     def _get_config_dict(self):
         config_dict = {}
         for property_name in dir(self):
@@ -46,6 +46,7 @@ ATTR_CONFIDENCE = "confidence"
 ATTR_QUESTION = "question"
 ATTR_ANSWERS = "answers"
 ATTR_ANSWER_START = "answer_start"
+ATTR_TEXT_OFFSET = "text_offset"
 
 
 class RETRIEVER(str, Enum):
@@ -62,6 +63,7 @@ class READER(str, Enum):
 class EVIDENCE_TYPES(str, Enum):
     TEXT = "text"
     DOCUMENT = "document"
+    DOCUMENT_REFERENCE = "document_reference"
 
 
 class TEXT_EVIDENCE(str, Enum):
@@ -80,6 +82,12 @@ class DOCUMENT_EVIDENCE(str, Enum):
     ATTR_OFFSETS = "offsets"
 
 
+class DOCUMENT_REFERENCE_EVIDENCE(str, Enum):
+    ATTR_EVIDENCE_TYPE = "evidence_type"
+    ATTR_DOCUMENT_INDEX = "document_index"
+    ATTR_OFFSETS = "offsets"
+
+
 class OFFSET(str, Enum):
     ATTR_START = "start"
     ATTR_END = "end"
@@ -149,6 +157,40 @@ class FEEDBACK(str, Enum):
     APPLICATION = "application"
 
 
+class COLLECTION_STRATEGY(str, Enum):
+    AUTO = "auto"
+    SINGLE = "single"
+    SHARDED = "sharded"
+
+
+class LIMITER(str, Enum):
+    PRIMEQA_RETRIEVER = "primeqa_retriever"
+    PRIMEQA_READER = "primeqa_reader"
+    DISCOVERY_RETRIEVER = "discovery_retriever"
+
+
+class LIMIT_ALGORITHM(str, Enum):
+    FIXED = "fixed"
+    AIMD = "aimd"
+    GRADIENT = "gradient"
+
+
+class FUSION(str, Enum):
+    RECIPROCAL_RANK = "rrf"
+    WEIGHTED_SCORE = "weighted"
+
+
+class RESPONSE_MODE(str, Enum):
+    FULL = "full"
+    COMPACT = "compact"
+
+
 class FEEDBACK_RESPONSE_FORMAT(str, Enum):
     RAW = "raw"
     PRIMEQA = "primeqa"
+
+
+class FEEDBACK_INGESTION_STATUS(str, Enum):
+    SAVED = "saved"
+    INVALID = "invalid"
+    FAILED = "failed"
@@ -25,6 +25,26 @@ class Error(Exception):
     pass
 
 
+class OverloadedError(Error):
+    """
+    Raised when a backend call is not admitted, because the backend is at capacity.
+
+    Parameters
+    ----------
+    message: str
+        error message
+    status_code: int
+        HTTP status code to respond with (429 or 503)
+    retry_after: int
+        seconds after which client may retry
+    """
+
+    def __init__(self, message: str, status_code: int = 503, retry_after: int = 1):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
 class ErrorMessages(str, Enum):
 
     # Discovery
@@ -65,5 +85,14 @@ class ErrorMessages(str, Enum):
     # NETWORK
     NETWORK_ERROR = "E9001: Failed to establish connection."
 
+    # ADMISSION CONTROL
+    BACKEND_OVERLOADED = (
+        "E3001: {} is overloaded, too many requests are waiting. Please retry later."
+    )
+    BACKEND_QUEUE_TIMEOUT = (
+        "E3002: {} is overloaded, request waited too long. Please retry later."
+    )
+
     # SQL DATABASE
     FAILED_TO_EXECUTE_COMMAND = "E2001: Failed to execute command. {}"
+    UNSUPPORTED_EXPORT_FORMAT = "E2002: Unsupported export format. {}"
@@ -14,8 +14,10 @@ deposited with the U.S. Copyright Office.
 END_COPYRIGHT
 """
 from .engine import (
+    configure_discovery_service_connections,
     connect_cloud_discovery_service_instance,
     connect_cp4d_discovery_service_instance,
     retrieve,
     get_discovery_collections,
+    warm_up_discovery_service_connection,
 )
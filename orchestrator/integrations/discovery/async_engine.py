@@ -0,0 +1,287 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2022 PrimeQA Team
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Non-blocking Watson Discovery integration, calling Watson Discovery (v2) REST API with an
+asynchronous HTTP client instead of the (blocking) IBM Watson SDK.
+"""
+
+from typing import List, Union
+import asyncio
+import functools
+import logging
+import os
+import time
+
+import httpx
+from ibm_cloud_sdk_core.authenticators import (
+    Authenticator,
+    IAMAuthenticator,
+    BearerTokenAuthenticator,
+)
+
+from orchestrator.constants import LIMITER
+from orchestrator.integrations.discovery.clients import (
+    ClientPool,
+    PooledClient,
+    TokenPrefetcher,
+)
+from orchestrator.integrations.limiter import limited
+
+
+_logger = logging.getLogger(__name__)
+
+_API_VERSION = "2020-08-30"
+
+
+class AsyncDiscoveryClient:
+    """
+    Asynchronous client for Watson Discovery (v2) REST API, keeping up to `pool_size`
+    connections alive.
+
+    NOTE: Client must be used from a single event loop, since its connections are bound to it.
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        authenticator: Authenticator,
+        disable_ssl_verification: bool = False,
+        pool_size: int = 32,
+        timeout: float = 60.0,
+    ):
+        self.endpoint = endpoint.rstrip("/")
+        self.authenticator = authenticator
+
+        self._http_client = httpx.AsyncClient(
+            verify=not disable_ssl_verification,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=pool_size, max_keepalive_connections=pool_size
+            ),
+        )
+        self._in_flight = 0
+        self._closing = False
+        self._close_task = None
+
+    async def _headers(self) -> dict:
+        request = {"headers": {"Accept": "application/json"}}
+
+        # Authenticating may fetch an access token (with a blocking request), unless one is due later
+        token_manager = getattr(self.authenticator, "token_manager", None)
+        if token_manager is not None and token_manager.refresh_time < time.time():
+            await asyncio.to_thread(self.authenticator.authenticate, request)
+        else:
+            self.authenticator.authenticate(request)
+
+        return request["headers"]
+
+    async def _request(self, method: str, path: str, **kwargs) -> dict:
+        self._in_flight += 1
+        try:
+            response = await self._http_client.request(
+                method,
+                f"{self.endpoint}/v2{path}",
+                params={"version": _API_VERSION},
+                headers=await self._headers(),
+                **kwargs,
+            )
+            response.raise_for_status()
+            return response.json()
+        finally:
+            self._in_flight -= 1
+            if self._closing and not self._in_flight:
+                await self.close()
+
+    async def query(
+        self,
+        project_id: str,
+        collection_ids: List[str],
+        natural_language_query: str,
+        count: int,
+        return_: List[str] = None,
+        passages: dict = None,
+    ) -> dict:
+        body = {
+            "collection_ids": collection_ids,
+            "natural_language_query": natural_language_query,
+            "count": count,
+        }
+        if return_:
+            body["return"] = return_
+        if passages:
+            body["passages"] = passages
+
+        return await self._request("POST", f"/projects/{project_id}/query", json=body)
+
+    async def list_collections(self, project_id: str) -> dict:
+        return await self._request("GET", f"/projects/{project_id}/collections")
+
+    async def close(self):
+        await self._http_client.aclose()
+
+    def close_when_idle(self):
+        """
+        Close HTTP client (and its keep-alive connections) once in-flight requests complete, e.g.
+        when client is evicted from client pool
+        """
+        self._closing = True
+        if self._in_flight:
+            # NOTE: Last in-flight request closes HTTP client
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+
+        try:
+            if loop is not None:
+                # NOTE: Task is referenced, so that it is not garbage collected before completion
+                self._close_task = loop.create_task(self.close())
+            else:
+                asyncio.run(self.close())
+        except Exception:
+            _logger.warning(
+                "Failed to close client for %s", self.endpoint, exc_info=True
+            )
+
+
+# Configure IBM Watson discovery service connections
+# NOTE: Clients are pooled per endpoint and credentials, "WDS" only refers to the most recently connected client
+WDS = None
+POOL_SIZE = 32
+CLIENT_POOL = ClientPool(name="async_discovery")
+
+
+def reset_discovery_service_connection():
+    """
+    Drop clients inherited from parent process, so that forked server workers open their own
+    connections (on their own event loop). Clients are re-created on next use.
+    """
+    global WDS, CLIENT_POOL
+    WDS = None
+    CLIENT_POOL = CLIENT_POOL.abandon()
+
+
+os.register_at_fork(after_in_child=reset_discovery_service_connection)
+
+
+def configure_discovery_service_connections(pool_size: int, max_clients: int = 16):
+    global POOL_SIZE
+    POOL_SIZE = pool_size
+    CLIENT_POOL.max_clients = max_clients
+
+
+def _build_cloud_discovery_client(endpoint: str, api_key: str) -> PooledClient:
+    authenticator = IAMAuthenticator(apikey=api_key)
+
+    # Fetch access tokens in the background, so that queries never wait for them
+    prefetcher = TokenPrefetcher(authenticator.token_manager)
+    prefetcher.start()
+
+    client = AsyncDiscoveryClient(endpoint, authenticator, pool_size=POOL_SIZE)
+    return PooledClient(
+        client, authenticator, prefetcher, on_close=client.close_when_idle
+    )
+
+
+def _build_cp4d_discovery_client(endpoint: str, token: str) -> PooledClient:
+    authenticator = BearerTokenAuthenticator(token)
+    client = AsyncDiscoveryClient(
+        endpoint,
+        authenticator,
+        disable_ssl_verification=True,
+        pool_size=POOL_SIZE,
+    )
+    return PooledClient(client, authenticator, on_close=client.close_when_idle)
+
+
+def connect_cloud_discovery_service_instance(
+    endpoint: str, api_key: str
+) -> AsyncDiscoveryClient:
+    global WDS
+    WDS = CLIENT_POOL.get(
+        endpoint,
+        api_key,
+        functools.partial(_build_cloud_discovery_client, endpoint, api_key),
+    ).client
+    return WDS
+
+
+def connect_cp4d_discovery_service_instance(
+    endpoint: str, token: str
+) -> AsyncDiscoveryClient:
+    global WDS
+    WDS = CLIENT_POOL.get(
+        endpoint,
+        token,
+        functools.partial(_build_cp4d_discovery_client, endpoint, token),
+    ).client
+    return WDS
+
+
+@limited(LIMITER.DISCOVERY_RETRIEVER.value)
+async def retrieve(
+    project_id: str,
+    question: str,
+    collection_id: Union[str, List[str]],
+    limit: int = 3,
+    return_fields: List[str] = None,
+    passage_count: int = None,
+    passage_characters: int = None,
+    client: AsyncDiscoveryClient = None,
+) -> List[dict]:
+    # Single query may span multiple collections
+    collection_ids = (
+        [collection_id] if isinstance(collection_id, str) else list(collection_id)
+    )
+
+    # Optionally, return passages from "text" field (in "document_passages" of each hit)
+    passages = None
+    if passage_count:
+        passages = {
+            "enabled": True,
+            "per_document": True,
+            "max_per_document": passage_count,
+            "fields": ["text"],
+            "count": passage_count,
+        }
+        if passage_characters:
+            passages["characters"] = passage_characters
+
+    try:
+        result = await (client or WDS).query(
+            project_id=project_id,
+            collection_ids=collection_ids,
+            natural_language_query=question,
+            count=limit,
+            return_=return_fields,
+            passages=passages,
+        )
+        return result["results"]
+    except httpx.HTTPStatusError:
+        _logger.warning("Watson Discovery query failed", exc_info=True)
+        return []
+
+
+async def get_discovery_collections(
+    project_id: str, client: AsyncDiscoveryClient = None
+) -> List[dict]:
+    return (await (client or WDS).list_collections(project_id=project_id))[
+        "collections"
+    ]
@@ -0,0 +1,452 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2022 PrimeQA Team
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Tuple
+import hashlib
+import logging
+import socket
+import threading
+import time
+
+import requests
+from ibm_cloud_sdk_core.http_adapter import SSLHTTPAdapter
+from urllib3.connection import HTTPConnection
+
+from orchestrator.metrics import Metrics
+
+
+_logger = logging.getLogger(__name__)
+
+
+class KeepAliveHTTPAdapter(SSLHTTPAdapter):
+    """
+    HTTP adapter enabling TCP keep-alive on pooled connections, so that idle connections are not
+    silently dropped by load balancers or NAT gateways between requests.
+    """
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        pool_kwargs.setdefault(
+            "socket_options",
+            HTTPConnection.default_socket_options
+            + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)],
+        )
+        super().init_poolmanager(connections, maxsize, block, **pool_kwargs)
+
+
+class PooledSession(requests.Session):
+    """
+    HTTP session of a pooled client, tracking requests in flight, so that it can be closed once
+    they complete (see "close_when_idle")
+
+    NOTE: Responses are expected to be read within requests (i.e. without "stream=True"), as is
+    done by IBM Cloud SDK.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._in_flight = 0
+        self._closing = False
+        self._in_flight_lock = threading.Lock()
+
+    def send(self, request, **kwargs):
+        with self._in_flight_lock:
+            self._in_flight += 1
+        try:
+            return super().send(request, **kwargs)
+        finally:
+            with self._in_flight_lock:
+                self._in_flight -= 1
+                idle = self._closing and not self._in_flight
+
+            # NOTE: Last in-flight request closes session
+            if idle:
+                self.close()
+
+    def close_when_idle(self):
+        """
+        Close session (and its keep-alive connections) once in-flight requests complete, e.g. when
+        client is evicted from client pool
+        """
+        with self._in_flight_lock:
+            self._closing = True
+            idle = not self._in_flight
+
+        if idle:
+            self.close()
+
+
+def build_http_session(
+    pool_size: int, disable_ssl_verification: bool = False
+) -> PooledSession:
+    """
+    Build HTTP session keeping up to `pool_size` connections alive per host
+
+    Parameters
+    ----------
+    pool_size: int
+        maximum number of pooled connections per host
+    disable_ssl_verification: bool
+        True to skip verification of server's certificate
+
+    Returns
+    -------
+    PooledSession: HTTP session
+    """
+    adapter = KeepAliveHTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=pool_size,
+        _disable_ssl_verification=disable_ssl_verification,
+    )
+    session = PooledSession()
+    session.verify = not disable_ssl_verification
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class TokenPrefetcher:
+    """
+    Background refresh of IAM access tokens.
+
+    IBM Cloud SDK refreshes tokens on the request thread, once token is due for refresh. Instead,
+    tokens are fetched on a background thread `margin` seconds before they are due, so that
+    requests always find a valid token.
+
+    Metrics:
+    - "discovery_token_prefetches" (counter): tokens fetched in the background
+    - "discovery_token_prefetch_failures" (counter): failed background token fetches
+    """
+
+    def __init__(
+        self, token_manager, margin: float = 60.0, retry_interval: float = 5.0
+    ):
+        self.token_manager = token_manager
+        self.margin = margin
+        self.retry_interval = retry_interval
+
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="discovery-token-prefetcher", daemon=True
+        )
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def prefetch(self):
+        # NOTE: SDK's token managers expose no public method to force a token fetch
+        self.token_manager._save_token_info(self.token_manager.request_token())
+        Metrics.increment("discovery_token_prefetches")
+
+    def _run(self):
+        while not self._stopped.is_set():
+            # Step 1: Wait until token is due for prefetch (immediately, if no token was fetched yet)
+            wait = self.token_manager.refresh_time - self.margin - time.time()
+            if wait > 0:
+                self._stopped.wait(wait)
+                continue
+
+            # Step 2: Fetch token
+            try:
+                self.prefetch()
+            except Exception:
+                Metrics.increment("discovery_token_prefetch_failures")
+                _logger.warning(
+                    "Failed to prefetch Watson Discovery access token", exc_info=True
+                )
+
+            # Step 3: Pace fetches, when retrying or when tokens are due for refresh sooner than margin
+            self._stopped.wait(self.retry_interval)
+
+
+def credential_fingerprint(credential: str) -> str:
+    """
+    Identify credential (API key or token) without keeping it in pool keys, logs or metrics
+
+    Parameters
+    ----------
+    credential: str
+        API key or token
+
+    Returns
+    -------
+    str: credential's fingerprint
+    """
+    return hashlib.sha256(credential.encode("utf-8")).hexdigest()[:16]
+
+
+class PooledClient:
+    """
+    Client held by a client pool, along with its authenticator, token prefetcher (if any) and
+    function releasing client's connections (if any)
+    """
+
+    def __init__(
+        self,
+        client,
+        authenticator,
+        prefetcher: TokenPrefetcher = None,
+        on_close: Callable[[], None] = None,
+    ):
+        self.client = client
+        self.authenticator = authenticator
+        self.prefetcher = prefetcher
+        self.on_close = on_close
+
+    def stop_prefetching(self):
+        if self.prefetcher is not None:
+            self.prefetcher.stop()
+
+    def close(self):
+        self.stop_prefetching()
+        if self.on_close is not None:
+            self.on_close()
+
+
+class ClientPool:
+    """
+    Thread-safe pool of clients keyed by service endpoint and credential fingerprint, so that
+    requests against different service instances (e.g. of different tenants) share neither
+    clients nor authenticators.
+
+    Clients are built once per key. When more than `max_clients` clients are pooled, the least
+    recently used ones are evicted and closed (see "PooledClient.close"). Clients releasing their
+    connections on close must let requests still using them complete.
+
+    Metrics (prefixed with pool name):
+    - "_clients" (gauge): pooled clients
+    - "_clients_built" (counter): clients built
+    - "_clients_evicted" (counter): clients evicted
+    """
+
+    def __init__(self, name: str, max_clients: int = 16):
+        self.name = name
+        self.max_clients = max_clients
+
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def get(
+        self, endpoint: str, credential: str, build: Callable[[], PooledClient]
+    ) -> PooledClient:
+        """
+        Get pooled client for given endpoint and credential, building it on first use
+
+        Parameters
+        ----------
+        endpoint: str
+            service endpoint
+        credential: str
+            API key or token
+        build: Callable
+            function building client
+
+        Returns
+        -------
+        PooledClient: client
+        """
+        key = (endpoint, credential_fingerprint(credential))
+        with self._lock:
+            # Step 1: Return pooled client, marking it as most recently used
+            pooled = self._clients.get(key)
+            if pooled is not None:
+                self._clients.move_to_end(key)
+                return pooled
+
+            # Step 2: Build client
+            # NOTE: Building a client does not involve network calls, hence it is done while holding the lock
+            pooled = build()
+            self._clients[key] = pooled
+            Metrics.increment(f"{self.name}_clients_built")
+
+            # Step 3: Evict least recently used clients
+            while len(self._clients) > self.max_clients:
+                (evicted_endpoint, _), evicted = self._clients.popitem(last=False)
+                evicted.close()
+                Metrics.increment(f"{self.name}_clients_evicted")
+                _logger.info("Evicted idle client for %s", evicted_endpoint)
+
+            Metrics.set(f"{self.name}_clients", len(self._clients))
+            return pooled
+
+    def clear(self):
+        with self._lock:
+            for pooled in self._clients.values():
+                pooled.close()
+            self._clients.clear()
+            Metrics.set(f"{self.name}_clients", 0)
+
+    def abandon(self) -> "ClientPool":
+        """
+        Drop pooled clients after fork, stopping their token prefetching
+
+        Clients are not closed, since their connections are shared with (and bound to) parent
+        process. Pool's lock is not taken either, since it may have been held by another thread
+        at fork, hence a new, empty pool is returned to replace this one.
+
+        Returns
+        -------
+        ClientPool: empty pool, with the same settings
+        """
+        for pooled in list(self._clients.values()):
+            pooled.stop_prefetching()
+
+        return ClientPool(name=self.name, max_clients=self.max_clients)
+
+
+class DiscoveryClientManager:
+    """
+    Manage Watson Discovery clients, their HTTP connections and access tokens.
+
+    - Clients are pooled per endpoint and credential (see "ClientPool")
+    - Each client gets its own HTTP session, keeping up to `pool_size` connections alive
+    - IAM access tokens are fetched ahead of expiry on a background thread
+    - "warm_up" opens `warm_up_connections` connections ahead of first requests, so that
+      requests do not pay for TCP and TLS handshakes
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 32,
+        token_refresh_margin: float = 60.0,
+        warm_up_connections: int = 4,
+        max_clients: int = 16,
+    ):
+        self.pool_size = pool_size
+        self.token_refresh_margin = token_refresh_margin
+        self.warm_up_connections = warm_up_connections
+
+        self._pool = ClientPool(name="discovery", max_clients=max_clients)
+
+    def configure(
+        self,
+        pool_size: int,
+        token_refresh_margin: float,
+        warm_up_connections: int,
+        max_clients: int,
+    ):
+        self.pool_size = pool_size
+        self.token_refresh_margin = token_refresh_margin
+        self.warm_up_connections = warm_up_connections
+        self._pool.max_clients = max_clients
+
+    def _manage(
+        self, client, authenticator, disable_ssl_verification: bool = False
+    ) -> PooledClient:
+        # Step 1: Pool HTTP connections
+        session = build_http_session(self.pool_size, disable_ssl_verification)
+        client.set_http_client(session)
+
+        # Step 2: Prefetch access tokens, for authenticators fetching tokens (e.g. IAM)
+        prefetcher = None
+        token_manager = getattr(authenticator, "token_manager", None)
+        if token_manager is not None:
+            prefetcher = TokenPrefetcher(
+                token_manager, margin=self.token_refresh_margin
+            )
+            prefetcher.start()
+
+        # NOTE: Evicted clients' sessions are closed once their in-flight requests complete
+        return PooledClient(
+            client, authenticator, prefetcher, on_close=session.close_when_idle
+        )
+
+    def get(
+        self,
+        endpoint: str,
+        credential: str,
+        build: Callable[[], Tuple[Any, Any]],
+        disable_ssl_verification: bool = False,
+    ):
+        """
+        Get client for given endpoint and credential, building it on first use
+
+        Parameters
+        ----------
+        endpoint: str
+            service endpoint
+        credential: str
+            API key or token
+        build: Callable
+            function building client, returning client and its authenticator
+        disable_ssl_verification: bool
+            True to skip verification of server's certificate
+
+        Returns
+        -------
+        DiscoveryV2: client
+        """
+        return self._pool.get(
+            endpoint,
+            credential,
+            lambda: self._manage(*build(), disable_ssl_verification),
+        ).client
+
+    def warm_up(self, client) -> int:
+        """
+        Open pooled connections to client's service, in parallel
+
+        Parameters
+        ----------
+        client: DiscoveryV2
+            client, as returned by "get"
+
+        Returns
+        -------
+        int: number of connections opened
+        """
+        if client is None or not self.warm_up_connections:
+            return 0
+
+        # Step 1: Fetch access token, unless already prefetched
+        token_manager = getattr(client.authenticator, "token_manager", None)
+        if token_manager is not None:
+            token_manager.get_token()
+
+        # Step 2: Open connections
+        # NOTE: Unauthenticated HEAD requests are enough to complete handshakes, connections return to pool regardless of response status
+        def connect(_):
+            try:
+                client.get_http_client().head(client.service_url, timeout=10)
+                return True
+            except requests.RequestException:
+                _logger.warning(
+                    "Failed to open connection to %s", client.service_url, exc_info=True
+                )
+                return False
+
+        num_connections = min(self.warm_up_connections, self.pool_size)
+        with ThreadPoolExecutor(max_workers=num_connections) as executor:
+            opened = sum(executor.map(connect, range(num_connections)))
+
+        _logger.info(
+            "Opened %d connections to %s in advance", opened, client.service_url
+        )
+        return opened
+
+    def reset(self):
+        """
+        Forget pooled clients (e.g. after fork, since prefetching threads do not survive it)
+        """
+        self._pool = self._pool.abandon()
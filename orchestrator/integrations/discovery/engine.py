@@ -15,52 +15,150 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import functools
+import os
+from typing import List, Union
+
 from ibm_watson import DiscoveryV2, ApiException
+from ibm_watson.discovery_v2 import QueryLargePassages
 from ibm_cloud_sdk_core.authenticators import (
     IAMAuthenticator,
     BearerTokenAuthenticator,
 )
 
-# Configure IBM Watson discovery service connection
-ACTIVE_ENDPOINT = None
+from orchestrator.constants import LIMITER
+from orchestrator.integrations.discovery.clients import DiscoveryClientManager
+from orchestrator.integrations.limiter import limited
+
+# Configure IBM Watson discovery service connections
+# NOTE: Clients are pooled per endpoint and credentials, "WDS" only refers to the most recently connected client
 WDS = None
 
+# Manage pooled clients, their HTTP connections and prefetching of access tokens
+CLIENT_MANAGER = DiscoveryClientManager()
+
+
+def reset_discovery_service_connection():
+    """
+    Drop clients inherited from parent process, so that forked server workers do not share
+    pooled HTTP connections. Connections are re-established on next use.
+    """
+    global WDS
+    WDS = None
+    CLIENT_MANAGER.reset()
+
+
+os.register_at_fork(after_in_child=reset_discovery_service_connection)
+
 
-def connect_cloud_discovery_service_instance(endpoint: str, api_key: str):
-    global ACTIVE_ENDPOINT, WDS
-    if ACTIVE_ENDPOINT != endpoint:
-        WDS = DiscoveryV2(version="2020-08-30", authenticator=IAMAuthenticator(apikey=api_key))
-        WDS.set_service_url(endpoint)
+def _build_cloud_discovery_client(endpoint: str, api_key: str):
+    authenticator = IAMAuthenticator(apikey=api_key)
+    client = DiscoveryV2(version="2020-08-30", authenticator=authenticator)
+    client.set_service_url(endpoint)
+    return client, authenticator
 
-        # Set active endpoint
-        ACTIVE_ENDPOINT = endpoint
 
+def _build_cp4d_discovery_client(endpoint: str, token: str):
+    authenticator = BearerTokenAuthenticator(token)
+    client = DiscoveryV2(version="2020-08-30", authenticator=authenticator)
+    client.set_service_url(endpoint)
+    client.set_disable_ssl_verification(True)
+    return client, authenticator
 
-def connect_cp4d_discovery_service_instance(endpoint: str, token: str):
-    global ACTIVE_ENDPOINT, WDS
-    if ACTIVE_ENDPOINT != endpoint:
-        WDS = DiscoveryV2(version="2020-08-30", authenticator=BearerTokenAuthenticator(token))
-        WDS.set_service_url(endpoint)
-        WDS.set_disable_ssl_verification(True)
 
-        # Set active endpoint
-        ACTIVE_ENDPOINT = endpoint
+def connect_cloud_discovery_service_instance(
+    endpoint: str, api_key: str
+) -> DiscoveryV2:
+    global WDS
+    WDS = CLIENT_MANAGER.get(
+        endpoint,
+        api_key,
+        functools.partial(_build_cloud_discovery_client, endpoint, api_key),
+    )
+    return WDS
 
 
+def connect_cp4d_discovery_service_instance(endpoint: str, token: str) -> DiscoveryV2:
+    global WDS
+    WDS = CLIENT_MANAGER.get(
+        endpoint,
+        token,
+        functools.partial(_build_cp4d_discovery_client, endpoint, token),
+        disable_ssl_verification=True,
+    )
+    return WDS
+
+
+@limited(LIMITER.DISCOVERY_RETRIEVER.value)
+def retrieve(
+    project_id: str,
+    question: str,
+    collection_id: Union[str, List[str]],
+    limit: int = 3,
+    return_fields: List[str] = None,
+    passage_count: int = None,
+    passage_characters: int = None,
+    client: DiscoveryV2 = None,
+):
+    # Single query may span multiple collections
+    collection_ids = (
+        [collection_id] if isinstance(collection_id, str) else list(collection_id)
+    )
+
+    # Optionally, return only given document fields and/or passages from "text" field (in "document_passages" of each hit)
+    options = {}
+    if return_fields:
+        options["return_"] = return_fields
+    if passage_count:
+        options["passages"] = QueryLargePassages(
+            enabled=True,
+            per_document=True,
+            max_per_document=passage_count,
+            fields=["text"],
+            count=passage_count,
+            characters=passage_characters,
+        )
 
-def retrieve(project_id: str, question: str, collection_id: str, limit: int = 3):
     try:
-        hits = WDS.query(
-                    project_id=project_id,
-                    collection_ids=[collection_id],
-                    natural_language_query=question,
-                    count=limit,
-                ).get_result()["results"]
+        hits = (
+            (client or WDS)
+            .query(
+                project_id=project_id,
+                collection_ids=collection_ids,
+                natural_language_query=question,
+                count=limit,
+                **options,
+            )
+            .get_result()["results"]
+        )
         return hits
     except ApiException:
         return []
 
 
-def get_discovery_collections(project_id: str) -> list[dict]:
-    return WDS.list_collections(project_id=project_id).get_result()["collections"]
-        
\ No newline at end of file
+def configure_discovery_service_connections(
+    pool_size: int,
+    token_refresh_margin: float,
+    warm_up_connections: int,
+    max_clients: int = 16,
+):
+    CLIENT_MANAGER.configure(
+        pool_size=pool_size,
+        token_refresh_margin=token_refresh_margin,
+        warm_up_connections=warm_up_connections,
+        max_clients=max_clients,
+    )
+
+
+def warm_up_discovery_service_connection(client: DiscoveryV2 = None) -> int:
+    return CLIENT_MANAGER.warm_up(client or WDS)
+
+
+def get_discovery_collections(
+    project_id: str, client: DiscoveryV2 = None
+) -> List[dict]:
+    return (
+        (client or WDS)
+        .list_collections(project_id=project_id)
+        .get_result()["collections"]
+    )
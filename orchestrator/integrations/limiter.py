@@ -0,0 +1,439 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2022 PrimeQA Team
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Union
+import asyncio
+import functools
+import logging
+import math
+import threading
+import time
+
+from orchestrator.exceptions import ErrorMessages, OverloadedError
+from orchestrator.metrics import Metrics
+
+
+_logger = logging.getLogger(__name__)
+
+
+#############################################################################################
+#                       Adaptive limits
+#############################################################################################
+class AdaptiveLimit(ABC):
+    """
+    Base class for algorithms adjusting concurrency limit from observed call latencies
+    (see Netflix's "concurrency-limits" library).
+
+    Minimum latency is taken as the latency of an unloaded backend. It is re-learned every
+    `probe_interval` seconds, so that limit follows lasting changes in backend's speed
+    (e.g. a different model or context length).
+    """
+
+    def __init__(
+        self,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        tolerance: float = 1.5,
+        probe_interval: float = 60.0,
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.probe_interval = probe_interval
+
+        self._min_latency = None
+        self._probe_at = time.time() + probe_interval
+
+    def _observe(self, latency: float) -> float:
+        now = time.time()
+        if self._min_latency is None or now >= self._probe_at:
+            self._min_latency = latency
+            self._probe_at = now + self.probe_interval
+        else:
+            self._min_latency = min(self._min_latency, latency)
+
+        return self._min_latency
+
+    def _clamp(self, limit: float) -> float:
+        return min(max(limit, self.min_limit), self.max_limit)
+
+    @abstractmethod
+    def update(
+        self, limit: float, latency: float, in_flight: int, dropped: bool
+    ) -> float:
+        """
+        Compute new limit from a call sample
+
+        Parameters
+        ----------
+        limit: float
+            current limit
+        latency: float
+            call latency (in seconds)
+        in_flight: int
+            number of calls in flight when call completed (including the call)
+        dropped: bool
+            True if call failed
+
+        Returns
+        -------
+        float: new limit
+        """
+
+
+class AIMDLimit(AdaptiveLimit):
+    """
+    Additive increase, multiplicative decrease.
+
+    Limit grows by one while latency stays within `tolerance` times the minimum latency, and is
+    multiplied by `backoff_ratio` when latency rises beyond that or calls fail.
+    """
+
+    def __init__(self, backoff_ratio: float = 0.9, **kwargs):
+        super().__init__(**kwargs)
+        self.backoff_ratio = backoff_ratio
+
+    def update(
+        self, limit: float, latency: float, in_flight: int, dropped: bool
+    ) -> float:
+        min_latency = self._observe(latency)
+        if dropped or latency > self.tolerance * min_latency:
+            return self._clamp(limit * self.backoff_ratio)
+
+        # Grow only when limit is actually in use
+        if in_flight * 2 >= limit:
+            return self._clamp(limit + 1)
+
+        return limit
+
+
+class GradientLimit(AdaptiveLimit):
+    """
+    Gradient limit.
+
+    Limit is scaled by the ratio of (tolerated) minimum latency to observed latency, bounded to
+    [0.5, 1.0], plus a headroom of sqrt(limit) calls. Hence limit grows while latency stays near
+    its minimum and shrinks in proportion to rising latency. Changes are smoothed.
+    """
+
+    def __init__(self, smoothing: float = 0.2, **kwargs):
+        super().__init__(**kwargs)
+        self.smoothing = smoothing
+
+    def update(
+        self, limit: float, latency: float, in_flight: int, dropped: bool
+    ) -> float:
+        min_latency = self._observe(latency)
+
+        # Do not grow when limit is not in use
+        if not dropped and in_flight * 2 < limit:
+            return limit
+
+        gradient = (
+            0.5
+            if dropped
+            else max(0.5, min(1.0, self.tolerance * min_latency / max(latency, 1e-6)))
+        )
+        new_limit = limit * gradient + math.sqrt(limit)
+        return self._clamp(limit * (1 - self.smoothing) + new_limit * self.smoothing)
+
+
+#############################################################################################
+#                       Limiter
+#############################################################################################
+class ConcurrencyLimiter:
+    """
+    Admission control for calls to a backend.
+
+    At most `max_concurrency` calls run at once. Further calls wait in a queue bounded by
+    `max_queue_size`; calls arriving to a full queue are rejected right away (429).
+
+    Waiting calls are shed (503) based on queueing delay, following CoDel
+    (Nichols and Jacobson, "Controlling Queue Delay"): while the queue drains regularly, calls
+    may wait up to `queue_interval` seconds to absorb bursts. Once the queue has not been empty
+    for `queue_interval` seconds (i.e. a standing queue has formed), calls wait at most
+    `queue_target` seconds.
+
+    If an adaptive limit is provided, `max_concurrency` is only the initial limit, which is then
+    adjusted after every call from its latency and outcome.
+
+    Metrics (prefixed with limiter name):
+    - "_limiter_limit" (gauge): current concurrency limit
+    - "_limiter_in_flight" (gauge): calls running
+    - "_limiter_queue_length" (gauge): calls waiting
+    - "_limiter_admitted" (counter): calls admitted
+    - "_limiter_rejected" (counter): calls rejected on full queue
+    - "_limiter_shed" (counter): calls shed after waiting too long
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int,
+        max_queue_size: int = 64,
+        queue_target: float = 0.5,
+        queue_interval: float = 5.0,
+        retry_after: int = 1,
+        adaptive_limit: AdaptiveLimit = None,
+    ):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue_size = max_queue_size
+        self.queue_target = queue_target
+        self.queue_interval = queue_interval
+        self.retry_after = retry_after
+        self.adaptive_limit = adaptive_limit
+
+        self._limit = float(max_concurrency)
+        self._in_flight = 0
+        self._queue_length = 0
+        self._last_empty = time.time()
+        self._condition = threading.Condition()
+        Metrics.set(f"{self.name}_limiter_limit", self.max_concurrency)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queue_length(self) -> int:
+        return self._queue_length
+
+    def _update_gauges(self):
+        Metrics.set(f"{self.name}_limiter_in_flight", self._in_flight)
+        Metrics.set(f"{self.name}_limiter_queue_length", self._queue_length)
+
+    def _try_admit(self) -> bool:
+        # NOTE: Caller must hold the condition's lock
+        if self._in_flight < self.max_concurrency and not self._queue_length:
+            self._in_flight += 1
+            self._update_gauges()
+            Metrics.increment(f"{self.name}_limiter_admitted")
+            return True
+
+        return False
+
+    def acquire(self):
+        """
+        Wait for a free slot
+
+        Raises
+        ------
+        OverloadedError
+            if wait queue is full or call waited for too long
+        """
+        with self._condition:
+            # Step 1: Admit right away, if there is a free slot and nobody is waiting
+            if self._try_admit():
+                return
+
+            # Step 2: Reject, if wait queue is full
+            if self._queue_length >= self.max_queue_size:
+                Metrics.increment(f"{self.name}_limiter_rejected")
+                raise OverloadedError(
+                    ErrorMessages.BACKEND_OVERLOADED.value.format(self.name),
+                    status_code=429,
+                    retry_after=self.retry_after,
+                )
+
+            # Step 3: Wait for a free slot, with a short deadline when a standing queue has formed
+            now = time.time()
+            if now - self._last_empty > self.queue_interval:
+                deadline = now + self.queue_target
+            else:
+                deadline = now + self.queue_interval
+
+            self._queue_length += 1
+            self._update_gauges()
+            try:
+                while self._in_flight >= self.max_concurrency:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        Metrics.increment(f"{self.name}_limiter_shed")
+                        raise OverloadedError(
+                            ErrorMessages.BACKEND_QUEUE_TIMEOUT.value.format(self.name),
+                            status_code=503,
+                            retry_after=self.retry_after,
+                        )
+                    self._condition.wait(remaining)
+            finally:
+                self._queue_length -= 1
+                if not self._queue_length:
+                    self._last_empty = time.time()
+                self._update_gauges()
+
+            self._in_flight += 1
+            self._update_gauges()
+            Metrics.increment(f"{self.name}_limiter_admitted")
+
+    def _update_limit(self, latency: float, dropped: bool):
+        self._limit = self.adaptive_limit.update(
+            self._limit, latency, self._in_flight, dropped
+        )
+        limit = max(1, int(self._limit))
+        if limit != self.max_concurrency:
+            _logger.info(
+                "%s concurrency limit changed from %d to %d (latency: %.3fs, dropped: %s)",
+                self.name,
+                self.max_concurrency,
+                limit,
+                latency,
+                dropped,
+            )
+            Metrics.set(f"{self.name}_limiter_limit", limit)
+            self.max_concurrency = limit
+
+    def release(self, latency: float = None, dropped: bool = False):
+        """
+        Free slot taken by a completed call
+
+        Parameters
+        ----------
+        latency: float
+            call latency (in seconds), to adjust adaptive limit
+        dropped: bool
+            True if call failed
+        """
+        with self._condition:
+            if self.adaptive_limit is not None and latency is not None:
+                self._update_limit(latency, dropped)
+
+            self._in_flight -= 1
+            self._update_gauges()
+
+            # Limit may have grown, hence wake up as many waiting calls as there are free slots
+            for _ in range(max(self.max_concurrency - self._in_flight, 0)):
+                self._condition.notify()
+
+    def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Run function once admitted
+
+        Parameters
+        ----------
+        fn: Callable
+            function calling the backend
+
+        Returns
+        -------
+        function's result
+        """
+        self.acquire()
+        start_t = time.time()
+        dropped = False
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            dropped = True
+            raise
+        finally:
+            self.release(latency=time.time() - start_t, dropped=dropped)
+
+    def _release_acquired(self, acquiring: asyncio.Future):
+        # Release slot acquired on behalf of a cancelled call
+        if not acquiring.cancelled() and acquiring.exception() is None:
+            self.release()
+
+    async def run_async(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Run coroutine function once admitted
+
+        Parameters
+        ----------
+        fn: Callable
+            coroutine function calling the backend
+
+        Returns
+        -------
+        function's result
+        """
+        with self._condition:
+            admitted = self._try_admit()
+
+        # Waiting for a free slot blocks, hence wait on a thread to keep event loop running
+        if not admitted:
+            acquiring = asyncio.ensure_future(asyncio.to_thread(self.acquire))
+            try:
+                await asyncio.shield(acquiring)
+            except asyncio.CancelledError:
+                # NOTE: Waiting thread can not be interrupted and may still take a slot, release it then
+                acquiring.add_done_callback(self._release_acquired)
+                raise
+
+        start_t = time.time()
+        dropped = False
+        try:
+            return await fn(*args, **kwargs)
+        except Exception:
+            dropped = True
+            raise
+        finally:
+            self.release(latency=time.time() - start_t, dropped=dropped)
+
+
+class LimitersRegistry:
+    _limiters = {}
+
+    @classmethod
+    def register(cls, limiter: ConcurrencyLimiter):
+        cls._limiters[limiter.name] = limiter
+
+    @classmethod
+    def get(cls, name: str) -> Union[ConcurrencyLimiter, None]:
+        return cls._limiters.get(name, None)
+
+
+def limited(name: str) -> Callable:
+    """
+    Decorator running backend call (function or coroutine function) through limiter registered
+    under given name. Calls run unrestricted, if no such limiter is registered.
+
+    Parameters
+    ----------
+    name: str
+        limiter name
+
+    Returns
+    -------
+    Callable: decorator
+    """
+
+    def decorator(fn: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                limiter = LimitersRegistry.get(name)
+                if limiter is None:
+                    return await fn(*args, **kwargs)
+
+                return await limiter.run_async(fn, *args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            limiter = LimitersRegistry.get(name)
+            if limiter is None:
+                return fn(*args, **kwargs)
+
+            return limiter.run(fn, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
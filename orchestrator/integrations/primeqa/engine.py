@@ -16,6 +16,7 @@
 # limitations under the License.
 
 import logging
+import os
 from typing import List
 
 import grpc
@@ -33,8 +34,10 @@ from orchestrator.constants import (
     ATTR_NAME,
     ATTR_DESCRIPTION,
     ATTR_CONTEXT_INDEX,
+    LIMITER,
 )
 from orchestrator.exceptions import Error, ErrorMessages
+from orchestrator.integrations.limiter import limited
 
 # PrimeQA-service gRPC connection
 from orchestrator.integrations.primeqa.grpc_generated.parameter_pb2 import Parameter
@@ -80,6 +83,22 @@ INDEXER_STUB = None
 READER_STUB = None
 
 
+def reset_primeqa_service_connection():
+    """
+    Drop gRPC channel inherited from parent process, as gRPC channels can not be used across fork.
+    Channel is re-opened on next use.
+    """
+    global ACTIVE_ENDPOINT, CHANNEL, RETRIEVER_STUB, READER_STUB, INDEXER_STUB
+    ACTIVE_ENDPOINT = None
+    CHANNEL = None
+    RETRIEVER_STUB = None
+    READER_STUB = None
+    INDEXER_STUB = None
+
+
+os.register_at_fork(after_in_child=reset_primeqa_service_connection)
+
+
 def build_grpc_parameters(parameters: list) -> List[Parameter]:
     grpc_parameters = []
     for parameter in parameters:
@@ -169,6 +188,7 @@ def get_readers():
             raise Error(ErrorMessages.PRIMEQA_GENERIC_RPC_ERROR.value) from rpc_error
 
 
+@limited(LIMITER.PRIMEQA_READER.value)
 def get_answers(reader: dict, query: str, documents: List[dict]):
     answers = []
     try:
@@ -254,6 +274,7 @@ def get_retrievers():
             raise Error(ErrorMessages.PRIMEQA_GENERIC_RPC_ERROR.value) from rpc_error
 
 
+@limited(LIMITER.PRIMEQA_RETRIEVER.value)
 def retrieve(retriever: dict, index_id: str, query: str):
     documents = list()
     try:
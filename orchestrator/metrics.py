@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2022 PrimeQA Team
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import Union
+import os
+import threading
+
+
+class Metrics:
+    """
+    Process wide registry of counters and gauges
+    """
+
+    _counters = {}
+    _gauges = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def increment(cls, name: str, value: Union[int, float] = 1):
+        with cls._lock:
+            cls._counters[name] = cls._counters.get(name, 0) + value
+
+    @classmethod
+    def set(cls, name: str, value: Union[int, float]):
+        with cls._lock:
+            cls._gauges[name] = value
+
+    @classmethod
+    def value(cls, name: str) -> Union[int, float, None]:
+        if name in cls._counters:
+            return cls._counters[name]
+
+        return cls._gauges.get(name, None)
+
+    @classmethod
+    def get(cls) -> dict:
+        with cls._lock:
+            return {"counters": dict(cls._counters), "gauges": dict(cls._gauges)}
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._counters.clear()
+            cls._gauges.clear()
+
+
+# Forked server workers start with empty metrics, rather than copies of parent's metrics
+os.register_at_fork(after_in_child=Metrics.reset)
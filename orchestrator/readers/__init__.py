@@ -1,8 +1,10 @@
 from typing import List, Union
-from datetime import datetime, timedelta, timezone
 from copy import deepcopy
+import functools
+import json
 
 from orchestrator.store import StoreFactory
+from orchestrator.cache import LoadingCache, build_cache_key
 from orchestrator.constants import (
     GENERIC,
     PRIMEQA,
@@ -17,17 +19,9 @@ from orchestrator.exceptions import Error, ErrorMessages
 class ReadersRegistry:
     _readers = {}
     _registry_ttl = 60 * 5
-    _last_refreshed = None
-
-    @classmethod
-    def is_stale(cls) -> bool:
-        # If retrievers are recently fetched
-        if cls._last_refreshed and cls._last_refreshed + timedelta(
-            seconds=cls._registry_ttl
-        ) < datetime.now(timezone.utc):
-            return False
-
-        return True
+    _registry_cache = LoadingCache(
+        name="readers_registry", ttl=_registry_ttl, max_size=1
+    )
 
     @classmethod
     def has(cls, reader_id: str) -> bool:
@@ -50,6 +44,16 @@ class ReadersRegistry:
             GENERIC.ATTR_READERS.value
         ],
     ):
+        # NOTE: Registry is refreshed only when cached one is due for refresh or settings have changed
+        cls._readers = cls._registry_cache.get(
+            build_cache_key(json.dumps(settings, sort_keys=True)),
+            functools.partial(cls._fetch, settings),
+        )
+
+    @staticmethod
+    def _fetch(settings: dict) -> dict:
+        readers = {}
+
         # Step 1: Load PrimeQA readers, only if integrated
         if (
             PRIMEQA.ATTR_INTEGRATION_ID.value in settings
@@ -59,10 +63,9 @@ class ReadersRegistry:
                 settings=settings[PRIMEQA.ATTR_INTEGRATION_ID.value]
             ):
                 reader[ATTR_PROVENANCE] = PRIMEQA.ATTR_INTEGRATION_ID.value
-                cls._readers[reader["reader_id"]] = reader
+                readers[reader["reader_id"]] = reader
 
-        # Update last_refreshed
-        cls._last_refreshed = datetime.now(timezone.utc)
+        return readers
 
 
 def read(
@@ -85,9 +88,8 @@ def read(
         GENERIC.ATTR_READERS.value
     ]
     try:
-        # Step 2.a: Check reader registry's health
-        if ReadersRegistry.is_stale():
-            ReadersRegistry.load(settings=reader_settings)
+        # Step 2.a: Refresh reader registry, if necessary
+        ReadersRegistry.load(settings=reader_settings)
 
         # Step 2.b: Get reader
         reader = ReadersRegistry.get(reader_id)
@@ -1,8 +1,12 @@
-from typing import List, Union
-from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, List, Tuple, Union
 from copy import deepcopy
+import asyncio
+import functools
+import json
 
 from orchestrator.store import StoreFactory
+from orchestrator.cache import LoadingCache, build_cache_key
 from orchestrator.constants import (
     GENERIC,
     PARAMETER,
@@ -12,13 +16,18 @@ from orchestrator.constants import (
     ATTR_PARAMETERS,
     ATTR_PROVENANCE,
     ATTR_SCORE,
+    FUSION,
 )
 from orchestrator.exceptions import Error, ErrorMessages
 from orchestrator.utils import normalize
+from orchestrator.retrievers.fusion import fuse
 from orchestrator.retrievers.discovery import (
+    configure_shards,
     get_discovery_retrievers,
     get_collections_for_discovery_retriever,
     retrieve_for_discovery_retrievers,
+    retrieve_for_discovery_retrievers_async,
+    warm_up_discovery_retriever,
 )
 from orchestrator.retrievers.primeqa import (
     get_primeqa_retrievers,
@@ -30,17 +39,9 @@ from orchestrator.retrievers.primeqa import (
 class RetrieversRegistry:
     _retrievers = {}
     _registry_ttl = 60 * 5
-    _last_refreshed = None
-
-    @classmethod
-    def is_stale(cls) -> bool:
-        # If retrievers are recently fetched
-        if cls._last_refreshed and cls._last_refreshed + timedelta(
-            seconds=cls._registry_ttl
-        ) < datetime.now(timezone.utc):
-            return False
-
-        return True
+    _registry_cache = LoadingCache(
+        name="retrievers_registry", ttl=_registry_ttl, max_size=1
+    )
 
     @classmethod
     def has(cls, retriever_id: str) -> bool:
@@ -63,6 +64,16 @@ class RetrieversRegistry:
             GENERIC.ATTR_RETRIEVERS.value
         ],
     ):
+        # NOTE: Registry is refreshed only when cached one is due for refresh or settings have changed
+        cls._retrievers = cls._registry_cache.get(
+            build_cache_key(json.dumps(settings, sort_keys=True)),
+            functools.partial(cls._fetch, settings),
+        )
+
+    @staticmethod
+    def _fetch(settings: dict) -> dict:
+        retrievers = {}
+
         # Step 1: Load Watson Discovery retrievers, only if integrated
         if (
             WATSON_DISCOVERY.ATTR_INTEGRATION_ID.value in settings
@@ -70,7 +81,7 @@ class RetrieversRegistry:
         ):
             for retriever in get_discovery_retrievers():
                 retriever[ATTR_PROVENANCE] = WATSON_DISCOVERY.ATTR_INTEGRATION_ID.value
-                cls._retrievers[retriever["retriever_id"]] = retriever
+                retrievers[retriever["retriever_id"]] = retriever
 
         # Step 2: Load PrimeQA retrievers, only if integrated
         if (
@@ -81,21 +92,30 @@ class RetrieversRegistry:
                 settings=settings[PRIMEQA.ATTR_INTEGRATION_ID.value]
             ):
                 retriever[ATTR_PROVENANCE] = PRIMEQA.ATTR_INTEGRATION_ID.value
-                cls._retrievers[retriever["retriever_id"]] = retriever
+                retrievers[retriever["retriever_id"]] = retriever
 
-        # Update last_refreshed
-        cls._last_refreshed = datetime.now(timezone.utc)
+        return retrievers
+
+
+_COLLECTIONS_CACHE = LoadingCache(name="collections", ttl=60, max_size=128)
 
 
 def fetch_collections(retriever_id: str):
     # Step 1: Fetch requested retriever from registry
     retriever = RetrieversRegistry.get(retriever_id=retriever_id)
 
-    # Step 2: Make appropriate get collections call based on provenance
+    # Step 2: Fetch collections through cache
     retriever_settings = StoreFactory.get_store().get_settings()[
         GENERIC.ATTR_RETRIEVERS.value
     ]
-    # Step 2.a: Watson Discovery retriever
+    return _COLLECTIONS_CACHE.get(
+        build_cache_key(retriever_id, json.dumps(retriever_settings, sort_keys=True)),
+        functools.partial(_fetch_collections, retriever, retriever_settings),
+    )
+
+
+def _fetch_collections(retriever: dict, retriever_settings: dict):
+    # Step 1: Watson Discovery retriever
     if (
         retriever[ATTR_PROVENANCE] == WATSON_DISCOVERY.ATTR_INTEGRATION_ID.value
         and WATSON_DISCOVERY.ATTR_INTEGRATION_ID.value in retriever_settings
@@ -105,7 +125,7 @@ def fetch_collections(retriever_id: str):
             settings=retriever_settings[WATSON_DISCOVERY.ATTR_INTEGRATION_ID.value]
         )
 
-    # Step 2.b: PrimeQA retriever
+    # Step 2: PrimeQA retriever
     elif (
         retriever[ATTR_PROVENANCE] == PRIMEQA.ATTR_INTEGRATION_ID.value
         and PRIMEQA.ATTR_INTEGRATION_ID.value in retriever_settings
@@ -121,13 +141,29 @@ def fetch_collections(retriever_id: str):
         return []
 
 
-def retrieve(
+def warm_up_retrievers():
+    """
+    Connect to integrated retrievers ahead of first requests
+    """
+    retriever_settings = StoreFactory.get_store().get_settings()[
+        GENERIC.ATTR_RETRIEVERS.value
+    ]
+
+    # Step 1: Watson Discovery retriever
+    if (
+        WATSON_DISCOVERY.ATTR_INTEGRATION_ID.value in retriever_settings
+        and retriever_settings[WATSON_DISCOVERY.ATTR_INTEGRATION_ID.value]
+    ):
+        warm_up_discovery_retriever(
+            settings=retriever_settings[WATSON_DISCOVERY.ATTR_INTEGRATION_ID.value]
+        )
+
+
+def _resolve_retriever(
     query: str,
     retriever_id: str,
-    collection_id: str,
     parameters_with_updates: Union[List[dict], None] = None,
-    should_normalize: bool = False,
-) -> List[dict]:
+) -> Tuple[dict, dict]:
     # Step 1: Verify non-empty query
     if not query:
         raise Error(
@@ -141,9 +177,8 @@ def retrieve(
         GENERIC.ATTR_RETRIEVERS.value
     ]
     try:
-        # Step 2.a: Check retriever registry's health
-        if RetrieversRegistry.is_stale():
-            RetrieversRegistry.load(settings=retriever_settings)
+        # Step 2.a: Refresh retriever registry, if necessary
+        RetrieversRegistry.load(settings=retriever_settings)
 
         # Step 2.b: Get retriever
         retriever = RetrieversRegistry.get(retriever_id=retriever_id)
@@ -168,6 +203,21 @@ def retrieve(
                         PARAMETER.ATTR_VALUE.value
                     ] = parameter_with_update.value
 
+    return retriever, retriever_settings
+
+
+def retrieve(
+    query: str,
+    retriever_id: str,
+    collection_id: str,
+    parameters_with_updates: Union[List[dict], None] = None,
+    should_normalize: bool = False,
+) -> List[dict]:
+    # Step 1-3: Fetch requested retriever, with updated parameters
+    retriever, retriever_settings = _resolve_retriever(
+        query, retriever_id, parameters_with_updates
+    )
+
     # Step 4: Call retriever's retrieve method
     if (
         retriever[ATTR_PROVENANCE] == WATSON_DISCOVERY.ATTR_INTEGRATION_ID.value
@@ -207,3 +257,173 @@ def retrieve(
         return documents
     else:
         return []
+
+
+async def retrieve_async(
+    query: str,
+    retriever_id: str,
+    collection_id: str,
+    parameters_with_updates: Union[List[dict], None] = None,
+    should_normalize: bool = False,
+    run_blocking: Callable[..., Awaitable] = asyncio.to_thread,
+) -> List[dict]:
+    """
+    Retrieve documents without blocking event loop.
+
+    Watson Discovery retrievers are queried with an asynchronous client; other retrievers
+    run with "run_blocking" (on a thread, by default).
+
+    Parameters
+    ----------
+    query: str
+        query
+    retriever_id: str
+        retriever
+    collection_id: str
+        collection
+    parameters_with_updates: list
+        retriever parameters to update
+    should_normalize: bool
+        True to normalize document scores
+    run_blocking: Callable
+        coroutine function running a blocking function with given arguments
+
+    Returns
+    -------
+    list: documents
+    """
+    # Step 1: Fetch requested retriever, with updated parameters
+    # NOTE: Loading retrievers (on cache miss or refresh) and settings blocks, hence it runs off the event loop
+    retriever, retriever_settings = await run_blocking(
+        _resolve_retriever, query, retriever_id, parameters_with_updates
+    )
+
+    # Step 2: Watson Discovery retriever, queried asynchronously
+    if (
+        retriever[ATTR_PROVENANCE] == WATSON_DISCOVERY.ATTR_INTEGRATION_ID.value
+        and WATSON_DISCOVERY.ATTR_INTEGRATION_ID.value in retriever_settings
+        and retriever_settings[WATSON_DISCOVERY.ATTR_INTEGRATION_ID.value]
+    ):
+        documents = await retrieve_for_discovery_retrievers_async(
+            query=query,
+            retriever=retriever,
+            collection_id=collection_id,
+            settings=retriever_settings[WATSON_DISCOVERY.ATTR_INTEGRATION_ID.value],
+        )
+        # Normalize document scores
+        if should_normalize:
+            normalize(
+                documents,
+                field=ATTR_SCORE,
+            )
+        return documents
+
+    # Step 3: Other retrievers
+    return await run_blocking(
+        retrieve,
+        query=query,
+        retriever_id=retriever_id,
+        collection_id=collection_id,
+        parameters_with_updates=parameters_with_updates,
+        should_normalize=should_normalize,
+    )
+
+
+# Thread pool running retrievals of multi-retriever requests concurrently
+_FAN_OUT_EXECUTOR = ThreadPoolExecutor(
+    max_workers=16, thread_name_prefix="retrievers-fan-out"
+)
+
+
+def configure_fan_out(num_threads: int, num_discovery_shard_threads: int = 16):
+    """
+    Size thread pools running retrievals of multi-retriever requests and sharded Watson Discovery
+    queries (one per collection) concurrently
+
+    NOTE: Sharded queries run on their own thread pool, since they are submitted from retrievals
+    running on fan-out thread pool
+
+    Parameters
+    ----------
+    num_threads: int
+        number of threads running retrievals
+    num_discovery_shard_threads: int
+        number of threads running sharded Watson Discovery queries
+    """
+    configure_shards(num_discovery_shard_threads)
+
+    global _FAN_OUT_EXECUTOR
+    previous_executor = _FAN_OUT_EXECUTOR
+    _FAN_OUT_EXECUTOR = ThreadPoolExecutor(
+        max_workers=num_threads, thread_name_prefix="retrievers-fan-out"
+    )
+
+    # NOTE: Retrievals already submitted to previous thread pool complete normally
+    previous_executor.shutdown(wait=False)
+
+
+def retrieve_from_sources(
+    query: str,
+    sources: List[dict],
+    fusion_method: str = FUSION.RECIPROCAL_RANK.value,
+    rrf_k: int = 60,
+    top_k: Union[int, None] = None,
+) -> List[dict]:
+    """
+    Retrieve documents from multiple retriever/collection pairs concurrently and fuse results
+
+    Parameters
+    ----------
+    query: str
+        query
+    sources: list
+        retrievers to query, each a dictionary with "retriever_id", "collection_id",
+        "parameters_with_updates" and "weight"
+    fusion_method: str
+        "rrf" (reciprocal rank fusion) or "weighted" (weighted score fusion)
+    rrf_k: int
+        reciprocal rank fusion constant
+    top_k: int
+        number of fused documents to return (all, if not provided)
+
+    Returns
+    -------
+    list: fused documents with normalized scores ("confidence")
+    """
+    # Step 1: Run retrievals concurrently
+    # NOTE: First retrieval runs in calling thread, so that latency is that of the slowest retriever
+    futures = [
+        _FAN_OUT_EXECUTOR.submit(
+            retrieve,
+            query=query,
+            retriever_id=source["retriever_id"],
+            collection_id=source["collection_id"],
+            parameters_with_updates=source.get("parameters_with_updates"),
+            should_normalize=True,
+        )
+        for source in sources[1:]
+    ]
+    ranked_lists = [
+        retrieve(
+            query=query,
+            retriever_id=sources[0]["retriever_id"],
+            collection_id=sources[0]["collection_id"],
+            parameters_with_updates=sources[0].get("parameters_with_updates"),
+            should_normalize=True,
+        )
+    ] + [future.result() for future in futures]
+
+    # Step 2: Fuse results
+    documents = fuse(
+        ranked_lists,
+        weights=[source.get("weight", 1.0) for source in sources],
+        method=fusion_method,
+        rrf_k=rrf_k,
+    )
+    if top_k is not None:
+        documents = documents[:top_k]
+
+    # Step 3: Normalize fused scores
+    normalize(documents, field=ATTR_SCORE)
+
+    return documents
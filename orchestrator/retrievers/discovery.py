@@ -15,15 +15,27 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Tuple, Union
+import asyncio
+import heapq
+import itertools
+import logging
+import random
 import re
+import threading
+import time
+
 from orchestrator.constants import (
     ATTR_DOCUMENT_ID,
     ATTR_PARAMETERS,
     ATTR_SCORE,
     ATTR_TEXT,
+    ATTR_TEXT_OFFSET,
     ATTR_TITLE,
     ATTR_CONFIDENCE,
     ATTR_URL,
+    COLLECTION_STRATEGY,
     GENERIC,
     PARAMETER,
     WATSON_DISCOVERY,
@@ -33,10 +45,14 @@ from orchestrator.integrations.discovery import (
     connect_cloud_discovery_service_instance,
     get_discovery_collections,
     retrieve,
+    warm_up_discovery_service_connection,
 )
+from orchestrator.integrations.discovery import async_engine
 from orchestrator.exceptions import Error, ErrorMessages
 
 
+_logger = logging.getLogger(__name__)
+
 PATTERN_WATSON_DISCOVEY_CP4D_ENDPOINT = re.compile(r"https?://(cpd.*)/discovery/.*")
 PATTERN_WATSON_DISCOVEY_CLOUD_ENDPOINT = re.compile(
     r"https://api.*.discovery.watson.cloud.ibm.com/.*"
@@ -55,67 +71,254 @@ def get_discovery_retrievers():
                     "type": "Numeric",
                     "value": 5,
                     "range": [1, 20, 1],
-                }
+                },
+                {
+                    "parameter_id": "collection_strategy",
+                    "name": "Collection strategy",
+                    "description": "How to query multiple (comma separated) collections: a single query spanning all collections, parallel queries per collection, or whichever is faster",
+                    "type": "String",
+                    "value": COLLECTION_STRATEGY.AUTO.value,
+                    "options": [
+                        COLLECTION_STRATEGY.AUTO.value,
+                        COLLECTION_STRATEGY.SINGLE.value,
+                        COLLECTION_STRATEGY.SHARDED.value,
+                    ],
+                },
+                {
+                    "parameter_id": "passages",
+                    "name": "Passages",
+                    "description": "Retrieve relevant passages instead of entire documents",
+                    "type": "Boolean",
+                    "value": False,
+                    "options": [True, False],
+                },
+                {
+                    "parameter_id": "passage_count",
+                    "name": "Passage count",
+                    "description": "Maximum number of passages, when retrieving passages",
+                    "type": "Numeric",
+                    "value": 10,
+                    "range": [1, 100, 1],
+                },
+                {
+                    "parameter_id": "passage_characters",
+                    "name": "Passage characters",
+                    "description": "Approximate number of characters per passage, when retrieving passages",
+                    "type": "Numeric",
+                    "value": 400,
+                    "range": [50, 2000, 50],
+                },
             ],
         }
     ]
 
 
-def get_collections_for_discovery_retriever(settings: dict):
-    try:
-        # Step 1: Identify Watson Discovery instance type (IBM Cloud, Cloud Pack for Data [CP4D])
-        # Step 1.a: Cloud Pack for Data [CP4D]
-        cp4d_endpoint_mobj = PATTERN_WATSON_DISCOVEY_CP4D_ENDPOINT.match(
-            settings[GENERIC.ATTR_SERVICE_ENDPOINT.value]
-        )
-        if cp4d_endpoint_mobj:
-            # Step 1.a.i: Verify availability of connection credentials and establish connection
-            if (
-                settings[GENERIC.ATTR_SERVICE_TOKEN.value]
-                and settings[WATSON_DISCOVERY.ATTR_SERVICE_PROJECT_ID.value]
-            ):
-                connect_cp4d_discovery_service_instance(
-                    endpoint=settings[GENERIC.ATTR_SERVICE_ENDPOINT.value],
-                    token=settings[GENERIC.ATTR_SERVICE_TOKEN.value],
-                )
-            else:
-                raise Error(
-                    ErrorMessages.DISCOVERY_MISSING_AUTHENTICATION_CREDENTIALS.value.strip()
-                )
-        # Step 1.b: IBM Cloud
-        elif PATTERN_WATSON_DISCOVEY_CLOUD_ENDPOINT.match(
-            settings[GENERIC.ATTR_SERVICE_ENDPOINT.value]
-        ):
-            # Step 1.b.i: Verify availability of connection credentials and establish connection
-            if (
-                settings[GENERIC.ATTR_SERVICE_API_KEY.value]
-                and settings[WATSON_DISCOVERY.ATTR_SERVICE_PROJECT_ID.value]
-            ):
-                connect_cloud_discovery_service_instance(
-                    endpoint=settings[GENERIC.ATTR_SERVICE_ENDPOINT.value],
-                    api_key=settings[GENERIC.ATTR_SERVICE_API_KEY.value],
+# Fields to return for each hit, leaving out fields (e.g. "extracted_metadata", "enriched_text") unused by readers.
+# In passage mode, document text is not needed either, since passages are returned separately.
+_RETURN_FIELDS = [ATTR_DOCUMENT_ID, ATTR_TITLE, ATTR_URL, ATTR_TEXT]
+_PASSAGE_MODE_RETURN_FIELDS = [ATTR_DOCUMENT_ID, ATTR_TITLE, ATTR_URL]
+
+
+class StrategySelector:
+    """
+    Choose the faster strategy for querying multiple collections, based on exponentially weighted
+    moving average (EWMA) of measured latencies per number of collections.
+
+    Strategies without measurements are tried first; afterwards the slower strategy is still
+    tried with `exploration` probability, to keep its estimate current.
+    """
+
+    def __init__(
+        self, strategies: List[str], alpha: float = 0.2, exploration: float = 0.05
+    ):
+        self.strategies = strategies
+        self.alpha = alpha
+        self.exploration = exploration
+
+        self._latencies = {}
+        self._lock = threading.Lock()
+
+    def choose(self, num_collections: int) -> str:
+        with self._lock:
+            latencies = {
+                strategy: self._latencies.get((strategy, num_collections))
+                for strategy in self.strategies
+            }
+
+        for strategy, latency in latencies.items():
+            if latency is None:
+                return strategy
+
+        if random.random() < self.exploration:
+            return random.choice(self.strategies)
+
+        return min(latencies, key=latencies.get)
+
+    def record(self, strategy: str, num_collections: int, latency: float):
+        key = (strategy, num_collections)
+        with self._lock:
+            if key in self._latencies:
+                self._latencies[key] = (
+                    self.alpha * latency + (1 - self.alpha) * self._latencies[key]
                 )
             else:
-                raise Error(
-                    ErrorMessages.DISCOVERY_MISSING_AUTHENTICATION_CREDENTIALS.value.strip()
-                )
-        else:
-            raise Error(
-                ErrorMessages.DISCOVERY_UNSUPPORTED_CONNECTION_TYPE.value.strip()
+                self._latencies[key] = latency
+
+
+# Selector of multi-collection query strategy, and thread pool for sharded queries
+STRATEGY_SELECTOR = StrategySelector(
+    strategies=[COLLECTION_STRATEGY.SINGLE.value, COLLECTION_STRATEGY.SHARDED.value]
+)
+_SHARDS_EXECUTOR = ThreadPoolExecutor(
+    max_workers=16, thread_name_prefix="discovery-shards"
+)
+
+
+def configure_shards(num_threads: int):
+    """
+    Size thread pool running sharded (per collection) queries concurrently
+
+    Parameters
+    ----------
+    num_threads: int
+        number of threads
+    """
+    global _SHARDS_EXECUTOR
+    previous_executor = _SHARDS_EXECUTOR
+    _SHARDS_EXECUTOR = ThreadPoolExecutor(
+        max_workers=num_threads, thread_name_prefix="discovery-shards"
+    )
+
+    # NOTE: Queries already submitted to previous thread pool complete normally
+    previous_executor.shutdown(wait=False)
+
+
+def _confidence(hit: dict) -> float:
+    return hit["result_metadata"][ATTR_CONFIDENCE]
+
+
+def retrieve_from_collections(
+    project_id: str,
+    query: str,
+    collection_ids: List[str],
+    limit: int,
+    strategy: str = COLLECTION_STRATEGY.AUTO.value,
+    client: Any = None,
+    **options,
+) -> List[dict]:
+    """
+    Query multiple collections
+
+    Parameters
+    ----------
+    project_id: str
+        Watson Discovery project id
+    query: str
+        query
+    collection_ids: list
+        collections to query
+    limit: int
+        number of hits to return
+    strategy: str
+        "single" (one query spanning all collections), "sharded" (parallel queries per collection,
+        merged by confidence) or "auto" (whichever has been faster)
+    client: DiscoveryV2
+        Watson Discovery client (most recently connected one, if not provided)
+    options:
+        additional query options (e.g. "return_fields", "passage_count"), passed on to each query
+
+    Returns
+    -------
+    list: top hits, in descending confidence order
+    """
+    # Step 1: Choose strategy
+    if strategy == COLLECTION_STRATEGY.AUTO.value:
+        strategy = STRATEGY_SELECTOR.choose(len(collection_ids))
+
+    # Step 2: Run queries
+    start_t = time.time()
+    if strategy == COLLECTION_STRATEGY.SHARDED.value:
+        shards = list(
+            _SHARDS_EXECUTOR.map(
+                lambda collection_id: retrieve(
+                    project_id=project_id,
+                    question=query,
+                    collection_id=collection_id,
+                    limit=limit,
+                    client=client,
+                    **options,
+                ),
+                collection_ids,
             )
+        )
 
-        return get_discovery_collections(
-            settings[WATSON_DISCOVERY.ATTR_SERVICE_PROJECT_ID.value]
+        # Each shard is ranked by confidence, hence merge them (with a heap) and take top hits
+        hits = list(
+            itertools.islice(
+                heapq.merge(*shards, key=_confidence, reverse=True),
+                limit,
+            )
+        )
+    else:
+        hits = retrieve(
+            project_id=project_id,
+            question=query,
+            collection_id=collection_ids,
+            limit=limit,
+            client=client,
+            **options,
         )
-    except KeyError as err:
-        raise Error(
-            ErrorMessages.DISCOVERY_MISSING_SERVICE_ENDPOINT.value.strip()
-        ) from err
 
+    # Step 3: Record latency
+    latency = time.time() - start_t
+    STRATEGY_SELECTOR.record(strategy, len(collection_ids), latency)
+    _logger.debug(
+        "Queried %d collections with %s strategy in %.3fs",
+        len(collection_ids),
+        strategy,
+        latency,
+    )
 
-def retrieve_for_discovery_retrievers(
-    query: str, retriever: dict, collection_id: str, settings: dict
-):
+    return hits
+
+
+def get_collections_for_discovery_retriever(settings: dict):
+    # Step 1: Connect to Watson Discovery instance
+    client = _connect(settings)
+
+    # Step 2: List collections
+    return get_discovery_collections(
+        settings[WATSON_DISCOVERY.ATTR_SERVICE_PROJECT_ID.value], client=client
+    )
+
+
+def warm_up_discovery_retriever(settings: dict) -> int:
+    """
+    Connect to Watson Discovery instance ahead of first query, fetching access token and
+    opening pooled connections
+
+    Parameters
+    ----------
+    settings: dict
+        Watson Discovery settings
+
+    Returns
+    -------
+    int: number of connections opened in advance
+    """
+    # Step 1: Connect and issue a first request
+    client = _connect(settings)
+    get_discovery_collections(
+        settings[WATSON_DISCOVERY.ATTR_SERVICE_PROJECT_ID.value], client=client
+    )
+
+    # Step 2: Open remaining pooled connections
+    return warm_up_discovery_service_connection(client)
+
+
+def _connect(
+    settings: dict, connect_cp4d: Callable = None, connect_cloud: Callable = None
+) -> Any:
     # Step 1: Identify Watson Discovery instance type (IBM Cloud, Cloud Pack for Data [CP4D])
     try:
         # Step 1.a: Cloud Pack for Data [CP4D]
@@ -128,7 +331,7 @@ def retrieve_for_discovery_retrievers(
                 settings[GENERIC.ATTR_SERVICE_TOKEN.value]
                 and settings[WATSON_DISCOVERY.ATTR_SERVICE_PROJECT_ID.value]
             ):
-                connect_cp4d_discovery_service_instance(
+                return (connect_cp4d or connect_cp4d_discovery_service_instance)(
                     endpoint=settings[GENERIC.ATTR_SERVICE_ENDPOINT.value],
                     token=settings[GENERIC.ATTR_SERVICE_TOKEN.value],
                 )
@@ -145,7 +348,7 @@ def retrieve_for_discovery_retrievers(
                 settings[GENERIC.ATTR_SERVICE_API_KEY.value]
                 and settings[WATSON_DISCOVERY.ATTR_SERVICE_PROJECT_ID.value]
             ):
-                connect_cloud_discovery_service_instance(
+                return (connect_cloud or connect_cloud_discovery_service_instance)(
                     endpoint=settings[GENERIC.ATTR_SERVICE_ENDPOINT.value],
                     api_key=settings[GENERIC.ATTR_SERVICE_API_KEY.value],
                 )
@@ -162,14 +365,64 @@ def retrieve_for_discovery_retrievers(
             ErrorMessages.DISCOVERY_MISSING_SERVICE_ENDPOINT.value.strip()
         ) from err
 
-    # Step 2: Read parameters
+
+def _read_parameters(retriever: dict) -> Tuple[int, str, bool, dict]:
     limit = 10
+    strategy = COLLECTION_STRATEGY.AUTO.value
+    passages = False
+    passage_count = 10
+    passage_characters = 400
     if ATTR_PARAMETERS in retriever:
         for parameter in retriever[ATTR_PARAMETERS]:
             if parameter[PARAMETER.ATTR_ID.value] == "count":
                 limit = parameter[PARAMETER.ATTR_VALUE.value]
+            elif parameter[PARAMETER.ATTR_ID.value] == "collection_strategy":
+                strategy = parameter[PARAMETER.ATTR_VALUE.value]
+            elif parameter[PARAMETER.ATTR_ID.value] == "passages":
+                passages = parameter[PARAMETER.ATTR_VALUE.value]
+            elif parameter[PARAMETER.ATTR_ID.value] == "passage_count":
+                passage_count = parameter[PARAMETER.ATTR_VALUE.value]
+            elif parameter[PARAMETER.ATTR_ID.value] == "passage_characters":
+                passage_characters = parameter[PARAMETER.ATTR_VALUE.value]
+
+    if passages:
+        options = {
+            "return_fields": _PASSAGE_MODE_RETURN_FIELDS,
+            "passage_count": passage_count,
+            "passage_characters": passage_characters,
+        }
+    else:
+        options = {"return_fields": _RETURN_FIELDS}
+
+    return limit, strategy, passages, options
+
+
+def _split_collection_ids(collection_id: Union[str, List[str]]) -> List[str]:
+    # Collections are provided as a list or as comma separated ids
+    if isinstance(collection_id, str):
+        return [entry.strip() for entry in collection_id.split(",") if entry.strip()]
+
+    return list(collection_id)
+
+
+def _build_documents(hits: List[dict], passages: bool) -> List[dict]:
+    # One document per passage in passage mode
+    if passages:
+        return [
+            {
+                ATTR_TEXT: passage["passage_text"],
+                ATTR_SCORE: hit["result_metadata"][ATTR_CONFIDENCE],
+                ATTR_DOCUMENT_ID: hit[ATTR_DOCUMENT_ID]
+                if ATTR_DOCUMENT_ID in hit
+                else None,
+                ATTR_TITLE: hit[ATTR_TITLE] if ATTR_TITLE in hit else None,
+                ATTR_URL: hit[ATTR_URL] if ATTR_URL in hit else None,
+                ATTR_TEXT_OFFSET: passage.get("start_offset"),
+            }
+            for hit in hits
+            for passage in hit.get("document_passages", [])
+        ]
 
-    # Step 3: Run
     return [
         {
             ATTR_TEXT: " ".join(hit[ATTR_TEXT]),
@@ -180,10 +433,158 @@ def retrieve_for_discovery_retrievers(
             ATTR_TITLE: hit[ATTR_TITLE] if ATTR_TITLE in hit else None,
             ATTR_URL: hit[ATTR_URL] if ATTR_URL in hit else None,
         }
-        for hit in retrieve(
+        for hit in hits
+    ]
+
+
+def retrieve_for_discovery_retrievers(
+    query: str, retriever: dict, collection_id: Union[str, List[str]], settings: dict
+):
+    # Step 1: Connect to Watson Discovery instance
+    client = _connect(settings)
+
+    # Step 2: Read parameters
+    limit, strategy, passages, options = _read_parameters(retriever)
+
+    # Step 3: Identify collections
+    collection_ids = _split_collection_ids(collection_id)
+
+    # Step 4: Run
+    if len(collection_ids) > 1:
+        hits = retrieve_from_collections(
+            project_id=settings[WATSON_DISCOVERY.ATTR_SERVICE_PROJECT_ID.value],
+            query=query,
+            collection_ids=collection_ids,
+            limit=limit,
+            strategy=strategy,
+            client=client,
+            **options,
+        )
+    else:
+        hits = retrieve(
             project_id=settings[WATSON_DISCOVERY.ATTR_SERVICE_PROJECT_ID.value],
             question=query,
-            collection_id=collection_id,
+            collection_id=collection_ids[0] if collection_ids else collection_id,
             limit=limit,
+            client=client,
+            **options,
         )
-    ]
+
+    # Step 5: Build documents
+    return _build_documents(hits, passages)
+
+
+#############################################################################################
+#                       Non-blocking retrieval
+#############################################################################################
+async def retrieve_from_collections_async(
+    project_id: str,
+    query: str,
+    collection_ids: List[str],
+    limit: int,
+    strategy: str = COLLECTION_STRATEGY.AUTO.value,
+    client: Any = None,
+    **options,
+) -> List[dict]:
+    """
+    Query multiple collections without blocking, see "retrieve_from_collections"
+    """
+    # Step 1: Choose strategy
+    if strategy == COLLECTION_STRATEGY.AUTO.value:
+        strategy = STRATEGY_SELECTOR.choose(len(collection_ids))
+
+    # Step 2: Run queries (concurrently, in sharded strategy)
+    start_t = time.time()
+    if strategy == COLLECTION_STRATEGY.SHARDED.value:
+        shards = await asyncio.gather(
+            *(
+                async_engine.retrieve(
+                    project_id=project_id,
+                    question=query,
+                    collection_id=collection_id,
+                    limit=limit,
+                    client=client,
+                    **options,
+                )
+                for collection_id in collection_ids
+            )
+        )
+        hits = list(
+            itertools.islice(
+                heapq.merge(*shards, key=_confidence, reverse=True),
+                limit,
+            )
+        )
+    else:
+        hits = await async_engine.retrieve(
+            project_id=project_id,
+            question=query,
+            collection_id=collection_ids,
+            limit=limit,
+            client=client,
+            **options,
+        )
+
+    # Step 3: Record latency
+    STRATEGY_SELECTOR.record(strategy, len(collection_ids), time.time() - start_t)
+
+    return hits
+
+
+async def retrieve_for_discovery_retrievers_async(
+    query: str, retriever: dict, collection_id: Union[str, List[str]], settings: dict
+) -> List[dict]:
+    """
+    Retrieve documents without blocking, using asynchronous Watson Discovery client
+
+    Parameters
+    ----------
+    query: str
+        query
+    retriever: dict
+        retriever, with parameters
+    collection_id: str or list
+        collection(s) to query
+    settings: dict
+        Watson Discovery settings
+
+    Returns
+    -------
+    list: documents
+    """
+    # Step 1: Connect to Watson Discovery instance
+    client = _connect(
+        settings,
+        connect_cp4d=async_engine.connect_cp4d_discovery_service_instance,
+        connect_cloud=async_engine.connect_cloud_discovery_service_instance,
+    )
+
+    # Step 2: Read parameters
+    limit, strategy, passages, options = _read_parameters(retriever)
+
+    # Step 3: Identify collections
+    collection_ids = _split_collection_ids(collection_id)
+
+    # Step 4: Run
+    if len(collection_ids) > 1:
+        hits = await retrieve_from_collections_async(
+            project_id=settings[WATSON_DISCOVERY.ATTR_SERVICE_PROJECT_ID.value],
+            query=query,
+            collection_ids=collection_ids,
+            limit=limit,
+            strategy=strategy,
+            client=client,
+            **options,
+        )
+    else:
+        hits = await async_engine.retrieve(
+            project_id=settings[WATSON_DISCOVERY.ATTR_SERVICE_PROJECT_ID.value],
+            question=query,
+            collection_id=collection_ids[0] if collection_ids else collection_id,
+            limit=limit,
+            client=client,
+            **options,
+        )
+
+    # Step 5: Build documents
+    return _build_documents(hits, passages)
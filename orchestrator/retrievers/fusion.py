@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2022 PrimeQA Team
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import List
+import hashlib
+
+from orchestrator.constants import (
+    FUSION,
+    ATTR_CONFIDENCE,
+    ATTR_DOCUMENT_ID,
+    ATTR_SCORE,
+    ATTR_TEXT,
+    ATTR_TEXT_OFFSET,
+)
+
+
+def document_key(document: dict) -> str:
+    """
+    Identify document across retrievers, by its id or, if missing, by hash of its text.
+    Passages of the same document are told apart by their offset in document's text.
+
+    Parameters
+    ----------
+    document: dict
+        document returned by retriever
+
+    Returns
+    -------
+    str: document key
+    """
+    if document.get(ATTR_DOCUMENT_ID):
+        if document.get(ATTR_TEXT_OFFSET) is not None:
+            return f"id:{document[ATTR_DOCUMENT_ID]}@{document[ATTR_TEXT_OFFSET]}"
+        return f"id:{document[ATTR_DOCUMENT_ID]}"
+
+    return f"text:{hashlib.sha1(document[ATTR_TEXT].encode('utf-8')).hexdigest()}"
+
+
+def fuse(
+    ranked_lists: List[List[dict]],
+    weights: List[float],
+    method: str = FUSION.RECIPROCAL_RANK.value,
+    rrf_k: int = 60,
+) -> List[dict]:
+    """
+    Fuse ranked document lists from multiple retrievers into a single ranked list, with duplicate
+    documents merged
+
+    - "rrf": reciprocal rank fusion (Cormack et al.), score = sum of weight / (rrf_k + rank)
+    - "weighted": weighted score fusion, score = sum of weight * confidence (normalized retriever score)
+
+    Parameters
+    ----------
+    ranked_lists: list
+        documents returned by each retriever, in rank order
+    weights: list
+        weight of each retriever
+    method: str
+        fusion method ("rrf" or "weighted")
+    rrf_k: int
+        reciprocal rank fusion constant, dampening the impact of top ranks
+
+    Returns
+    -------
+    list: fused documents with fused "score", in descending score order
+    """
+    documents = {}
+    scores = {}
+    for ranked_list, weight in zip(ranked_lists, weights):
+        seen = set()
+        for rank, document in enumerate(ranked_list, start=1):
+            key = document_key(document)
+
+            # Count each document once per retriever, at its best rank
+            if key in seen:
+                continue
+            seen.add(key)
+
+            if method == FUSION.RECIPROCAL_RANK.value:
+                contribution = weight / (rrf_k + rank)
+            else:
+                contribution = weight * document.get(ATTR_CONFIDENCE, 0.0)
+
+            scores[key] = scores.get(key, 0.0) + contribution
+
+            # Keep document as returned by the first retriever
+            if key not in documents:
+                documents[key] = document
+
+    return [
+        {**documents[key], ATTR_SCORE: scores[key]}
+        for key in sorted(documents, key=scores.get, reverse=True)
+    ]
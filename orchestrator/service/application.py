@@ -15,22 +15,75 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import base64
+import functools
+import json
 import logging
-from typing import List, Literal, Union
+import os
+from typing import List, Literal, Sequence, Tuple, Union
+import threading
 import time
 
+import orjson
 import uvicorn
-from fastapi import FastAPI, status, Query, HTTPException
+from fastapi import FastAPI, status, Query, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 
 from orchestrator.configurations import Settings
 from orchestrator.store import StoreFactory
-from orchestrator.retrievers import RetrieversRegistry, fetch_collections, retrieve
+from orchestrator.cache import (
+    LoadingCache,
+    PersistentCache,
+    SingleFlight,
+    TieredCache,
+    build_cache_key,
+)
+from orchestrator.metrics import Metrics
+from orchestrator.integrations.discovery import (
+    async_engine,
+    configure_discovery_service_connections,
+)
+from orchestrator.integrations.limiter import (
+    AIMDLimit,
+    ConcurrencyLimiter,
+    GradientLimit,
+    LimitersRegistry,
+)
+from orchestrator.service.executors import (
+    EndpointExecutor,
+    EndpointExecutorRoute,
+    run_in,
+)
+from orchestrator.service.feedback_export import (
+    iter_feedbacks_in_format,
+    positive_feedbacks_only,
+    to_primeqa_format,
+)
+from orchestrator.service.feedback_ingestion import (
+    FeedbackIngestion,
+    ingest_feedbacks,
+    iter_lines,
+    parse_feedbacks,
+    parse_ndjson,
+)
+from orchestrator.service.supervisor import Supervisor
+from orchestrator.retrievers import (
+    RetrieversRegistry,
+    configure_fan_out,
+    fetch_collections,
+    retrieve,
+    retrieve_async,
+    retrieve_from_sources,
+    warm_up_retrievers,
+)
 from orchestrator.readers import ReadersRegistry, read
 
 from orchestrator.constants import (
     FEEDBACK,
     FEEDBACK_RESPONSE_FORMAT,
+    LIMITER,
+    LIMIT_ALGORITHM,
     GENERIC,
     ANSWER,
     EVIDENCE,
@@ -38,7 +91,8 @@ from orchestrator.constants import (
     EVIDENCE_TYPES,
     TEXT_EVIDENCE,
     DOCUMENT_EVIDENCE,
-    ATTR_ID,
+    DOCUMENT_REFERENCE_EVIDENCE,
+    RESPONSE_MODE,
     ATTR_TEXT,
     ATTR_SCORE,
     ATTR_CONFIDENCE,
@@ -46,9 +100,10 @@ from orchestrator.constants import (
     ATTR_TITLE,
     ATTR_URL,
     ATTR_ANSWERS,
-    ATTR_ANSWER_START,
     ATTR_DOCUMENTS,
+    ATTR_TEXT_OFFSET,
 )
+from orchestrator.utils import get_snippet_bounds
 from orchestrator.service.data_models import (
     Reader,
     GetAnswersRequest,
@@ -61,8 +116,14 @@ from orchestrator.service.data_models import (
     Document,
     Feedback,
     FeedbackInPrimeQAFormat,
+    FeedbackIngestionResponse,
+)
+from orchestrator.exceptions import (
+    PATTERN_ERROR_MESSAGE,
+    ErrorMessages,
+    Error,
+    OverloadedError,
 )
-from orchestrator.exceptions import PATTERN_ERROR_MESSAGE, ErrorMessages, Error
 
 # Initialize logger
 _logger = logging.getLogger(__name__)
@@ -70,6 +131,104 @@ _logger = logging.getLogger(__name__)
 # Initialize configuration and store
 config = Settings()
 STORE = StoreFactory.get_store()
+if config.enable_feedback_write_behind:
+    STORE.enable_write_behind(
+        flush_interval=config.feedback_write_behind_flush_interval,
+        batch_size=config.feedback_write_behind_batch_size,
+        max_queue_size=config.feedback_write_behind_max_queue_size,
+    )
+
+# Initialize answer cache (in-memory, optionally backed by on-disk cache in store directory)
+ANSWER_CACHE = (
+    TieredCache(
+        memory=LoadingCache(
+            name="ask",
+            ttl=config.answer_cache_ttl,
+            max_size=config.answer_cache_size,
+        ),
+        persistent=PersistentCache(
+            db_file=os.path.join(STORE.root_dir, "cache_db.db"),
+            ttl=config.persistent_answer_cache_ttl,
+            compaction_interval=config.persistent_answer_cache_compaction_interval,
+        )
+        if config.enable_persistent_answer_cache
+        else None,
+    )
+    if config.enable_answer_cache
+    else None
+)
+
+# Initialize coalescing of identical in-flight question answering requests (when answer cache is disabled)
+ASK_REQUESTS = SingleFlight(name="ask")
+
+# Initialize dedicated thread pools for blocking endpoints, so that slow question answering calls
+# can not starve metadata and feedback endpoints
+QA_EXECUTOR = EndpointExecutor(name="qa", max_workers=config.num_qa_endpoint_threads)
+METADATA_EXECUTOR = EndpointExecutor(
+    name="metadata", max_workers=config.num_metadata_endpoint_threads
+)
+FEEDBACK_EXECUTOR = EndpointExecutor(
+    name="feedback", max_workers=config.num_feedback_endpoint_threads
+)
+
+# Initialize admission control for backend calls, so that bursts are queued (or rejected) instead of
+# overwhelming the backends
+# NOTE: Concurrency limits adapt to backend latency, unless "fixed" limit algorithm is configured. Adaptive
+# limits never exceed configured per-backend limits, they back off below them on rising latency or failures.
+def build_adaptive_limit(max_concurrency: int):
+    if config.backend_limit_algorithm == LIMIT_ALGORITHM.FIXED.value:
+        return None
+
+    limit_algorithms = {
+        LIMIT_ALGORITHM.AIMD.value: AIMDLimit,
+        LIMIT_ALGORITHM.GRADIENT.value: GradientLimit,
+    }
+    if config.backend_limit_algorithm not in limit_algorithms:
+        raise ValueError(
+            f"Unsupported backend limit algorithm: {config.backend_limit_algorithm}"
+        )
+
+    return limit_algorithms[config.backend_limit_algorithm](
+        min_limit=min(config.backend_min_concurrency, max_concurrency),
+        max_limit=max_concurrency,
+        tolerance=config.backend_latency_tolerance,
+    )
+
+
+for limiter_name, max_concurrency in (
+    (LIMITER.PRIMEQA_RETRIEVER.value, config.primeqa_retriever_max_concurrency),
+    (LIMITER.PRIMEQA_READER.value, config.primeqa_reader_max_concurrency),
+    (LIMITER.DISCOVERY_RETRIEVER.value, config.discovery_retriever_max_concurrency),
+):
+    LimitersRegistry.register(
+        ConcurrencyLimiter(
+            name=limiter_name,
+            max_concurrency=max_concurrency,
+            max_queue_size=config.backend_max_queue_size,
+            queue_target=config.backend_queue_target,
+            queue_interval=config.backend_queue_interval,
+            retry_after=config.backend_retry_after,
+            adaptive_limit=build_adaptive_limit(max_concurrency),
+        )
+    )
+
+# Initialize pooled, pre-authenticated connections to Watson Discovery (per instance and credentials)
+configure_discovery_service_connections(
+    pool_size=config.discovery_connection_pool_size,
+    token_refresh_margin=config.discovery_token_refresh_margin,
+    warm_up_connections=config.discovery_warm_up_connections,
+    max_clients=config.discovery_max_clients,
+)
+async_engine.configure_discovery_service_connections(
+    pool_size=config.discovery_connection_pool_size,
+    max_clients=config.discovery_max_clients,
+)
+
+# Initialize thread pools running retrievals of multi-retriever requests and sharded Watson Discovery queries concurrently
+configure_fan_out(
+    num_threads=config.num_retriever_fan_out_threads,
+    num_discovery_shard_threads=config.num_discovery_shard_threads,
+)
 
 # Start tracking time for initialization
 start_t = time.time()
@@ -91,6 +250,8 @@ app = FastAPI(
         "url": "https://www.apache.org/licenses/LICENSE-2.0.html",
     },
 )
+# NOTE: Endpoints running on dedicated executors have their responses serialized there too
+app.router.route_class = EndpointExecutorRoute
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -100,6 +261,26 @@ app.add_middleware(
 )
 
 
+def _warm_up_retrievers():
+    try:
+        warm_up_retrievers()
+    except Exception:
+        _logger.warning("Failed to warm up retriever connections", exc_info=True)
+
+
+@app.on_event("startup")
+def warm_up():
+    # NOTE: Runs in every server worker (after fork), in the background so that startup is not delayed
+    threading.Thread(target=_warm_up_retrievers, name="warm-up", daemon=True).start()
+
+
+@app.on_event("shutdown")
+def close_store():
+    # NOTE: Queued feedback writes are applied first, closing the last connection then checkpoints feedback
+    # database's write-ahead log
+    STORE.close()
+
+
 #############################################################################################
 #                       Setttings APIs
 #############################################################################################
@@ -109,6 +290,7 @@ app.add_middleware(
     response_model=dict,
     tags=["Settings"],
 )
+@run_in(METADATA_EXECUTOR)
 def get_settings():
     """
     Retrieve PrimeQA application settings.
@@ -130,6 +312,7 @@ def get_settings():
     response_model=Union[List[Retriever], List[dict]],
     tags=["Retrieval"],
 )
+@run_in(METADATA_EXECUTOR)
 def get_retrievers():
     """
     Get retrievers
@@ -146,9 +329,8 @@ def get_retrievers():
         # Step 1: Load settings
         settings = STORE.get_settings()
 
-        # Step 2: If retriever's registry is stale, reload it
-        if RetrieversRegistry.is_stale():
-            RetrieversRegistry.load(settings[GENERIC.ATTR_RETRIEVERS.value])
+        # Step 2: Refresh retriever's registry, if necessary
+        RetrieversRegistry.load(settings[GENERIC.ATTR_RETRIEVERS.value])
 
         # Step 3: Return
         return RetrieversRegistry.get()
@@ -175,6 +357,7 @@ def get_retrievers():
     response_model=Union[List[Collection], List[dict]],
     tags=["Retrieval"],
 )
+@run_in(METADATA_EXECUTOR)
 def get_retriever_collections(retriever_id: str):
     try:
         return fetch_collections(retriever_id)
@@ -197,40 +380,71 @@ def get_retriever_collections(retriever_id: str):
         ) from err
 
 
+# Document fields returned by retrieval API, unless requested otherwise
+_RETRIEVAL_DOCUMENT_FIELDS = (
+    ATTR_TEXT,
+    ATTR_SCORE,
+    ATTR_DOCUMENT_ID,
+    ATTR_TITLE,
+    ATTR_URL,
+    ATTR_TEXT_OFFSET,
+)
+
+
 @app.post(
     "/GetDocumentsRequest",
     status_code=status.HTTP_201_CREATED,
     response_model=List[Document],
+    response_class=ORJSONResponse,
     tags=["Retrieval"],
     response_model_exclude_none=True,
 )
-def get_documents_for_question(gd_request: GetDocumentsRequest):
+async def get_documents_for_question(gd_request: GetDocumentsRequest):
     try:
-        documents = retrieve(
-            query=gd_request.question,
-            retriever_id=gd_request.retriever.retriever_id,
-            collection_id=gd_request.collection.collection_id,
-            parameters_with_updates=gd_request.retriever.parameters,
-            should_normalize=False,
+        # NOTE: Watson Discovery retrievers are optionally queried with a non-blocking client, without holding a thread
+        if config.enable_async_discovery_retriever:
+            documents = await retrieve_async(
+                query=gd_request.question,
+                retriever_id=gd_request.retriever.retriever_id,
+                collection_id=gd_request.collection.collection_id,
+                parameters_with_updates=gd_request.retriever.parameters,
+                should_normalize=False,
+                run_blocking=QA_EXECUTOR.run,
+            )
+        else:
+            documents = await QA_EXECUTOR.run(
+                retrieve,
+                query=gd_request.question,
+                retriever_id=gd_request.retriever.retriever_id,
+                collection_id=gd_request.collection.collection_id,
+                parameters_with_updates=gd_request.retriever.parameters,
+                should_normalize=False,
+            )
+
+        # Trim documents to maximum length, if requested
+        if documents and gd_request.max_document_chars is not None:
+            documents, _ = trim_documents(
+                documents, [], max_chars=gd_request.max_document_chars
+            )
+
+        # Project documents to requested fields
+        # NOTE: Projected documents may omit mandatory "Document" fields, hence they are returned without re-validation
+        return ORJSONResponse(
+            content=build_documents(
+                documents or [],
+                fields=gd_request.fields or _RETRIEVAL_DOCUMENT_FIELDS,
+            ),
+            status_code=status.HTTP_201_CREATED,
         )
 
-        if documents:
-            return [
-                {
-                    ATTR_TEXT: document[ATTR_TEXT],
-                    ATTR_SCORE: document[ATTR_SCORE],
-                    ATTR_DOCUMENT_ID: document[ATTR_DOCUMENT_ID]
-                    if ATTR_DOCUMENT_ID in document
-                    else None,
-                    ATTR_TITLE: document[ATTR_TITLE]
-                    if ATTR_TITLE in document
-                    else None,
-                    ATTR_URL: document[ATTR_URL] if ATTR_URL in document else None,
-                }
-                for document in documents
-            ]
-        else:
-            return []
+    except OverloadedError as err:
+        # Backend is at capacity, ask client to retry later
+        mobj = PATTERN_ERROR_MESSAGE.match(err.args[0])
+        raise HTTPException(
+            status_code=err.status_code,
+            detail={"code": mobj.group(1).strip(), "message": mobj.group(2).strip()},
+            headers={"Retry-After": str(err.retry_after)},
+        ) from err
 
     except Error as err:
         error_message = err.args[0]
@@ -258,6 +472,7 @@ def get_documents_for_question(gd_request: GetDocumentsRequest):
     response_model=Union[List[Reader], List[dict]],
     tags=["Reading"],
 )
+@run_in(METADATA_EXECUTOR)
 def get_readers():
     """
     Get readers
@@ -275,9 +490,8 @@ def get_readers():
         # Step 1: Load settings
         settings = STORE.get_settings()
 
-        # Step 2: If reader's registry is stale, reload it
-        if ReadersRegistry.is_stale():
-            ReadersRegistry.load(settings[GENERIC.ATTR_READERS.value])
+        # Step 2: Refresh reader's registry, if necessary
+        ReadersRegistry.load(settings[GENERIC.ATTR_READERS.value])
 
         # Step 3: Return
         return ReadersRegistry.get()
@@ -306,6 +520,7 @@ def get_readers():
     tags=["Reading"],
     response_model_exclude_none=True,
 )
+@run_in(QA_EXECUTOR)
 def get_answers_for_contexts(ga_request: GetAnswersRequest):
     try:
         answers = read(
@@ -378,6 +593,15 @@ def get_answers_for_contexts(ga_request: GetAnswersRequest):
         else:
             return []
 
+    except OverloadedError as err:
+        # Backend is at capacity, ask client to retry later
+        mobj = PATTERN_ERROR_MESSAGE.match(err.args[0])
+        raise HTTPException(
+            status_code=err.status_code,
+            detail={"code": mobj.group(1).strip(), "message": mobj.group(2).strip()},
+            headers={"Retry-After": str(err.retry_after)},
+        ) from err
+
     except Error as err:
         error_message = err.args[0]
 
@@ -398,133 +622,289 @@ def get_answers_for_contexts(ga_request: GetAnswersRequest):
 #############################################################################################
 #                           Question Answering API
 #############################################################################################
+# Response keys, resolved once instead of on every response
+_KEY_ANSWERS = ATTR_ANSWERS
+_KEY_DOCUMENTS = ATTR_DOCUMENTS
+_KEY_ANSWER_TEXT = ANSWER.ATTR_TEXT.value
+_KEY_ANSWER_CONFIDENCE = ANSWER.ATTR_CONFIDENCE.value
+_KEY_ANSWER_EVIDENCES = ANSWER.ATTR_EVIDENCES.value
+_KEY_EVIDENCE_TYPE = DOCUMENT_EVIDENCE.ATTR_EVIDENCE_TYPE.value
+_KEY_EVIDENCE_TEXT = DOCUMENT_EVIDENCE.ATTR_TEXT.value
+_KEY_EVIDENCE_SCORE = DOCUMENT_EVIDENCE.ATTR_SCORE.value
+_KEY_EVIDENCE_OFFSETS = DOCUMENT_EVIDENCE.ATTR_OFFSETS.value
+_KEY_EVIDENCE_CONTEXT_INDEX = EVIDENCE.ATTR_CONTEXT_INDEX.value
+_KEY_EVIDENCE_DOCUMENT_INDEX = DOCUMENT_REFERENCE_EVIDENCE.ATTR_DOCUMENT_INDEX.value
+_KEY_OFFSET_START = OFFSET.ATTR_START.value
+_KEY_OFFSET_END = OFFSET.ATTR_END.value
+_EVIDENCE_TYPE_DOCUMENT = EVIDENCE_TYPES.DOCUMENT.value
+_EVIDENCE_TYPE_TEXT = EVIDENCE_TYPES.TEXT.value
+_EVIDENCE_TYPE_DOCUMENT_REFERENCE = EVIDENCE_TYPES.DOCUMENT_REFERENCE.value
+
+# Optional document fields copied into document evidence
+_DOCUMENT_EVIDENCE_OPTIONAL_FIELDS = (
+    (ATTR_DOCUMENT_ID, DOCUMENT_EVIDENCE.ATTR_DOCUMENT_ID.value),
+    (ATTR_TITLE, DOCUMENT_EVIDENCE.ATTR_TITLE.value),
+    (ATTR_URL, DOCUMENT_EVIDENCE.ATTR_URL.value),
+)
+
+# Document fields returned in response (as per "Document" data model)
+_DOCUMENT_FIELDS = tuple(Document.__fields__.keys())
+
+
+def build_documents(
+    documents: List[dict], fields: Sequence[str] = _DOCUMENT_FIELDS
+) -> List[dict]:
+    """
+    Project documents to "Document" fields, dropping empty ones
+
+    Parameters
+    ----------
+    documents: list
+        documents returned by retriever
+    fields: list
+        "Document" fields to keep
+
+    Returns
+    -------
+    list: dict (Document)
+    """
+    return [
+        {field: document[field] for field in fields if document.get(field) is not None}
+        for document in documents
+    ]
+
+
+def build_evidence(entry: dict, documents: List[dict], compact: bool = False) -> dict:
+    """
+    Build "DocumentEvidence" or "TextEvidence" from reader's evidence in a single pass
+
+    Parameters
+    ----------
+    entry: dict
+        evidence returned by reader
+    documents: list
+        documents used as contexts by reader
+    compact: bool
+        if True, refer to evidence document by its index in response documents ("DocumentReferenceEvidence")
+        instead of copying document into evidence
+
+    Returns
+    -------
+    evidence: dict (DocumentEvidence, DocumentReferenceEvidence or TextEvidence), empty if evidence has no content
+    """
+    evidence = {}
+
+    # If "context_index" is present, form "DocumentReferenceEvidence" object in compact mode
+    context_index = entry.get(_KEY_EVIDENCE_CONTEXT_INDEX)
+    if context_index is not None and compact:
+        evidence[_KEY_EVIDENCE_TYPE] = _EVIDENCE_TYPE_DOCUMENT_REFERENCE
+        evidence[_KEY_EVIDENCE_DOCUMENT_INDEX] = context_index
+
+    # Otherwise, form "DocumentEvidence" object
+    elif context_index is not None:
+        evidence_document = documents[context_index]
+
+        # Add mandatory fields
+        evidence[_KEY_EVIDENCE_TYPE] = _EVIDENCE_TYPE_DOCUMENT
+        evidence[_KEY_EVIDENCE_TEXT] = evidence_document[ATTR_TEXT]
+        evidence[_KEY_EVIDENCE_SCORE] = evidence_document[ATTR_SCORE]
+
+        # Add optional fields
+        for document_field, evidence_field in _DOCUMENT_EVIDENCE_OPTIONAL_FIELDS:
+            value = evidence_document.get(document_field)
+            if value is not None:
+                evidence[evidence_field] = value
+
+    # Otherwise, if "text" is present, form "TextEvidence" object
+    elif entry.get(ATTR_TEXT):
+        evidence[_KEY_EVIDENCE_TYPE] = _EVIDENCE_TYPE_TEXT
+        evidence[_KEY_EVIDENCE_TEXT] = entry[ATTR_TEXT]
+
+    # Add optional field ("offsets") to evidence, if present
+    offsets = entry.get(_KEY_EVIDENCE_OFFSETS)
+    if offsets:
+        try:
+            evidence[_KEY_EVIDENCE_OFFSETS] = [
+                {
+                    _KEY_OFFSET_START: offset[_KEY_OFFSET_START],
+                    _KEY_OFFSET_END: offset[_KEY_OFFSET_END],
+                }
+                for offset in offsets
+            ]
+        except KeyError:
+            _logger.warning(
+                "Failed to add all offset fields for evidence: %s",
+                entry,
+            )
+
+    return evidence
+
+
+def build_answer(answer: dict, documents: List[dict], compact: bool = False) -> dict:
+    # Populate mandatory fields
+    response_answer = {
+        _KEY_ANSWER_TEXT: answer[ATTR_TEXT],
+        _KEY_ANSWER_CONFIDENCE: answer[ATTR_CONFIDENCE],
+    }
+
+    # Add optional field ("evidences"), if present
+    if _KEY_ANSWER_EVIDENCES in answer:
+        evidences = [
+            evidence
+            for evidence in (
+                build_evidence(entry, documents, compact)
+                for entry in answer[_KEY_ANSWER_EVIDENCES]
+            )
+            if evidence
+        ]
+        if evidences:
+            response_answer[_KEY_ANSWER_EVIDENCES] = evidences
+
+    return response_answer
+
+
+def _rebase_offsets(offsets: List[dict], start: int, end: int) -> List[dict]:
+    # Offsets are shifted to snippet and clipped to its bounds
+    return [
+        {
+            **offset,
+            _KEY_OFFSET_START: min(
+                max(offset[_KEY_OFFSET_START] - start, 0), end - start
+            ),
+            _KEY_OFFSET_END: min(max(offset[_KEY_OFFSET_END] - start, 0), end - start),
+        }
+        if _KEY_OFFSET_START in offset and _KEY_OFFSET_END in offset
+        else offset
+        for offset in offsets
+    ]
+
+
+def trim_documents(
+    documents: List[dict],
+    answers: List[dict],
+    window: Union[int, None] = None,
+    max_chars: Union[int, None] = None,
+) -> Tuple[List[dict], List[dict]]:
+    """
+    Trim documents to snippets around offsets of reader's evidences referring to them.
+    Evidence offsets are re-based to snippets and each document trimmed at its start carries "text_offset",
+    the position of the snippet in the original document text (added to document's own offset,
+    e.g. for passages). Documents which are not trimmed are returned as is.
+
+    Parameters
+    ----------
+    documents: list
+        documents returned by retriever
+    answers: list
+        answers returned by reader
+    window: int
+        number of characters to keep around evidence offsets (entire text, if not provided)
+    max_chars: int
+        maximum number of characters to keep per document, centred on evidence offsets
+
+    Returns
+    -------
+    tuple: trimmed documents, answers with re-based evidence offsets
+    """
+    # Step 1: Collect evidence offsets per document
+    offsets_per_document = [[] for _ in documents]
+    for answer in answers:
+        for entry in answer.get(_KEY_ANSWER_EVIDENCES) or []:
+            context_index = entry.get(_KEY_EVIDENCE_CONTEXT_INDEX)
+            if context_index is not None:
+                offsets_per_document[context_index].extend(
+                    (offset[_KEY_OFFSET_START], offset[_KEY_OFFSET_END])
+                    for offset in entry.get(_KEY_EVIDENCE_OFFSETS) or []
+                    if _KEY_OFFSET_START in offset and _KEY_OFFSET_END in offset
+                )
+
+    # Step 2: Trim documents
+    bounds = [
+        get_snippet_bounds(len(document[ATTR_TEXT]), offsets, window, max_chars)
+        for document, offsets in zip(documents, offsets_per_document)
+    ]
+    trimmed_documents = []
+    for document, (start, end) in zip(documents, bounds):
+        if start == 0 and end >= len(document[ATTR_TEXT]):
+            trimmed_documents.append(document)
+            continue
+
+        trimmed_document = {**document, ATTR_TEXT: document[ATTR_TEXT][start:end]}
+        if start > 0 or ATTR_TEXT_OFFSET in document:
+            trimmed_document[ATTR_TEXT_OFFSET] = (
+                document.get(ATTR_TEXT_OFFSET) or 0
+            ) + start
+        trimmed_documents.append(trimmed_document)
+
+    # Step 3: Re-base offsets of evidences referring to trimmed documents
+    trimmed_answers = []
+    for answer in answers:
+        if not answer.get(_KEY_ANSWER_EVIDENCES):
+            trimmed_answers.append(answer)
+            continue
+
+        evidences = []
+        for entry in answer[_KEY_ANSWER_EVIDENCES]:
+            context_index = entry.get(_KEY_EVIDENCE_CONTEXT_INDEX)
+            if context_index is not None and entry.get(_KEY_EVIDENCE_OFFSETS):
+                entry = {
+                    **entry,
+                    _KEY_EVIDENCE_OFFSETS: _rebase_offsets(
+                        entry[_KEY_EVIDENCE_OFFSETS], *bounds[context_index]
+                    ),
+                }
+            evidences.append(entry)
+
+        trimmed_answers.append({**answer, _KEY_ANSWER_EVIDENCES: evidences})
+
+    return trimmed_documents, trimmed_answers
+
+
 @app.post(
     "/ask",
     status_code=status.HTTP_201_CREATED,
     response_model=QuestionAnsweringResponse,
+    response_class=ORJSONResponse,
     tags=["Question Answering (QA)"],
     response_model_exclude_none=True,
 )
+@run_in(QA_EXECUTOR)
 def ask(qa_request: QuestionAnsweringRequest):
     try:
-        # Step 1: Run retriever
-        documents = retrieve(
-            query=qa_request.question,
-            retriever_id=qa_request.retriever.retriever_id,
-            collection_id=qa_request.collection.collection_id,
-            parameters_with_updates=qa_request.retriever.parameters,
-            should_normalize=True,
-        )
+        # Step 1: Identify request
+        request_key = build_cache_key(qa_request.json(sort_keys=True))
+
+        # Step 2: If answer cache is disabled, run question answering pipeline
+        # NOTE: Identical concurrent requests share a single pipeline execution
+        if ANSWER_CACHE is None:
+            response, _ = ASK_REQUESTS.do(
+                request_key, run_question_answering, qa_request
+            )
 
-        # Step 2: Run reader
-        if documents:
-            answers = read(
-                query=qa_request.question,
-                reader_id=qa_request.reader.reader_id,
-                contexts=documents,
-                parameters_with_updates=qa_request.reader.parameters,
-                apply_score_combination=True,
+        # Step 3: Otherwise, run question answering pipeline through answer cache (which coalesces requests as well)
+        # NOTE: Cached answers are tagged with current settings, so that settings change invalidates them
+        else:
+            response = ANSWER_CACHE.get(
+                request_key,
+                functools.partial(run_question_answering, qa_request),
+                version=build_cache_key(
+                    app.version, json.dumps(STORE.get_settings(), sort_keys=True)
+                ),
             )
 
-            if answers:
-                response = {ATTR_ANSWERS: [], ATTR_DOCUMENTS: documents}
-                for answer in answers:
-                    # Populate mandatory fields
-                    response[ATTR_ANSWERS].append(
-                        {
-                            ANSWER.ATTR_TEXT.value: answer[ATTR_TEXT],
-                            ANSWER.ATTR_CONFIDENCE.value: answer[ATTR_CONFIDENCE],
-                        }
-                    )
-
-                    # Add optional field ("evidences"), if present
-                    if ANSWER.ATTR_EVIDENCES.value in answer:
-                        evidences = []
-                        for entry in answer[ANSWER.ATTR_EVIDENCES.value]:
-                            # Create single "evidence" instance
-                            evidence = {}
-
-                            # If "context_index" is present, form "DocumentEvidence" object
-                            if EVIDENCE.ATTR_CONTEXT_INDEX.value in entry:
-                                evidence_document = documents[
-                                    entry[EVIDENCE.ATTR_CONTEXT_INDEX.value]
-                                ]
-
-                                # Add mandatory fields
-                                evidence[
-                                    DOCUMENT_EVIDENCE.ATTR_EVIDENCE_TYPE.value
-                                ] = EVIDENCE_TYPES.DOCUMENT.value
-                                evidence[
-                                    DOCUMENT_EVIDENCE.ATTR_TEXT.value
-                                ] = evidence_document[ATTR_TEXT]
-                                evidence[
-                                    DOCUMENT_EVIDENCE.ATTR_SCORE.value
-                                ] = evidence_document[ATTR_SCORE]
-
-                                # Add optional fields
-                                if ATTR_DOCUMENT_ID in evidence_document:
-                                    evidence[
-                                        DOCUMENT_EVIDENCE.ATTR_DOCUMENT_ID.value
-                                    ] = evidence_document[ATTR_DOCUMENT_ID]
-
-                                if ATTR_TITLE in evidence_document:
-                                    evidence[
-                                        DOCUMENT_EVIDENCE.ATTR_TITLE.value
-                                    ] = evidence_document[ATTR_TITLE]
-
-                                if ATTR_URL in evidence_document:
-                                    evidence[
-                                        DOCUMENT_EVIDENCE.ATTR_URL.value
-                                    ] = evidence_document[ATTR_URL]
-                            elif (
-                                EVIDENCE.ATTR_TEXT.value in entry
-                                and entry[EVIDENCE.ATTR_TEXT.value]
-                            ):
-                                # Add mandatory fields
-                                evidence[
-                                    TEXT_EVIDENCE.ATTR_EVIDENCE_TYPE.value
-                                ] = EVIDENCE_TYPES.TEXT.value
-                                evidence[TEXT_EVIDENCE.ATTR_TEXT.value] = entry[
-                                    ATTR_TEXT
-                                ]
-
-                            # Add optional field ("offsets") to evidence, if present
-                            try:
-                                if (
-                                    EVIDENCE.ATTR_OFFSETS.value in entry
-                                    and entry[EVIDENCE.ATTR_OFFSETS.value]
-                                ):
-                                    evidence[EVIDENCE.ATTR_OFFSETS.value] = [
-                                        {
-                                            OFFSET.ATTR_START.value: offset[
-                                                OFFSET.ATTR_START.value
-                                            ],
-                                            OFFSET.ATTR_END.value: offset[
-                                                OFFSET.ATTR_END.value
-                                            ],
-                                        }
-                                        for offset in entry[EVIDENCE.ATTR_OFFSETS.value]
-                                    ]
-                            except KeyError:
-                                _logger.warning(
-                                    "Failed to add all offset fields for evidence: %s",
-                                    entry,
-                                )
-
-                            # Add filled "evidence" instance to list of "evidences"
-                            if evidence:
-                                evidences.append(evidence)
-
-                        if evidences:
-                            response[ATTR_ANSWERS][-1][
-                                ANSWER.ATTR_EVIDENCES.value
-                            ] = evidences
-
-                return response
-
-            else:
-                return {ATTR_DOCUMENTS: documents}
-        return {}
+        # Step 4: Return serialized response
+        # NOTE: Response is built from trusted internal data in "QuestionAnsweringResponse" shape without empty fields,
+        # hence it is returned directly to skip re-validation against response model
+        return ORJSONResponse(content=response, status_code=status.HTTP_201_CREATED)
+
+    except OverloadedError as err:
+        # Backend is at capacity, ask client to retry later
+        mobj = PATTERN_ERROR_MESSAGE.match(err.args[0])
+        raise HTTPException(
+            status_code=err.status_code,
+            detail={"code": mobj.group(1).strip(), "message": mobj.group(2).strip()},
+            headers={"Retry-After": str(err.retry_after)},
+        ) from err
 
     except Error as err:
         error_message = err.args[0]
@@ -543,15 +923,122 @@ def ask(qa_request: QuestionAnsweringRequest):
         ) from err
 
 
+def run_question_answering(qa_request: QuestionAnsweringRequest) -> dict:
+    # Step 1: Run retriever(s)
+    # NOTE: Multiple retrievers run concurrently and their results are fused
+    if qa_request.sources:
+        documents = retrieve_from_sources(
+            query=qa_request.question,
+            sources=[
+                {
+                    "retriever_id": source.retriever.retriever_id,
+                    "collection_id": source.collection.collection_id,
+                    "parameters_with_updates": source.retriever.parameters,
+                    "weight": source.weight,
+                }
+                for source in qa_request.sources
+            ],
+            fusion_method=qa_request.fusion.method,
+            rrf_k=qa_request.fusion.rrf_k,
+            top_k=qa_request.fusion.top_k,
+        )
+    else:
+        documents = retrieve(
+            query=qa_request.question,
+            retriever_id=qa_request.retriever.retriever_id,
+            collection_id=qa_request.collection.collection_id,
+            parameters_with_updates=qa_request.retriever.parameters,
+            should_normalize=True,
+        )
+    if not documents:
+        return {}
+
+    # Step 2: Run reader
+    answers = read(
+        query=qa_request.question,
+        reader_id=qa_request.reader.reader_id,
+        contexts=documents,
+        parameters_with_updates=qa_request.reader.parameters,
+        apply_score_combination=True,
+    )
+
+    # Step 3: Trim documents to snippets around answers, if requested
+    if (
+        qa_request.snippet_window is not None
+        or qa_request.max_document_chars is not None
+    ):
+        documents, answers = trim_documents(
+            documents,
+            answers or [],
+            window=qa_request.snippet_window,
+            max_chars=qa_request.max_document_chars,
+        )
+
+    # Step 4: Build response
+    # NOTE: In compact mode, evidences refer to documents by index instead of repeating their text
+    response_documents = build_documents(
+        documents, fields=qa_request.fields or _DOCUMENT_FIELDS
+    )
+    if not answers:
+        return {_KEY_DOCUMENTS: response_documents}
+
+    compact = qa_request.response_mode == RESPONSE_MODE.COMPACT.value
+    return {
+        _KEY_ANSWERS: [build_answer(answer, documents, compact) for answer in answers],
+        _KEY_DOCUMENTS: response_documents,
+    }
+
+
 #############################################################################################
 #                       Feedback APIs
 #############################################################################################
+def _encode_cursor(position: int) -> str:
+    return base64.urlsafe_b64encode(str(position).encode("utf-8")).decode("utf-8")
+
+
+def _decode_cursor(cursor: str) -> int:
+    try:
+        return int(base64.urlsafe_b64decode(cursor.encode("utf-8")))
+    except (ValueError, TypeError) as err:
+        mobj = PATTERN_ERROR_MESSAGE.match(
+            ErrorMessages.INVALID_REQUEST.value.format(f"Invalid cursor: {cursor}")
+        )
+        raise HTTPException(
+            status_code=400,
+            detail={"code": mobj.group(1).strip(), "message": mobj.group(2).strip()},
+        ) from err
+
+
+def _iter_feedback_chunks(where_clauses: dict, response_format: str = None):
+    for feedbacks in iter_feedbacks_in_format(
+        STORE,
+        where_clauses=where_clauses,
+        response_format=response_format or FEEDBACK_RESPONSE_FORMAT.RAW.value,
+    ):
+        yield b"".join(orjson.dumps(feedback) + b"\n" for feedback in feedbacks)
+
+
+async def _stream_feedbacks(where_clauses: dict, response_format: str = None):
+    # NOTE: Chunks are read on feedback thread pool, rather than on Starlette's default thread pool
+    chunks = _iter_feedback_chunks(where_clauses, response_format)
+    try:
+        while True:
+            chunk = await FEEDBACK_EXECUTOR.run(next, chunks, None)
+            if chunk is None:
+                break
+            yield chunk
+    finally:
+        # NOTE: Closing iterator closes its dedicated database connection
+        await FEEDBACK_EXECUTOR.run(chunks.close)
+
+
 @app.get(
     "/feedbacks",
     status_code=status.HTTP_200_OK,
     response_model=Union[List[Feedback], List[FeedbackInPrimeQAFormat]],
     tags=["Feedback"],
 )
+@run_in(FEEDBACK_EXECUTOR)
 def get_feedbacks(
     feedback_id: Union[List[str], None] = Query(default=None),
     user_id: Union[List[str], None] = Query(default=None),
@@ -559,10 +1046,17 @@ def get_feedbacks(
     _format: Union[
         Literal[FEEDBACK_RESPONSE_FORMAT.RAW, FEEDBACK_RESPONSE_FORMAT.PRIMEQA], None
     ] = None,
+    limit: Union[int, None] = Query(default=None, ge=1, le=10000),
+    cursor: Union[str, None] = None,
+    stream: bool = False,
 ):
     """
     Retrieves feedback table data (/store/sqlite_db.db)
 
+    - With `limit`, feedbacks are returned a page at a time. If more feedbacks may follow, the
+      "X-Next-Cursor" response header holds the `cursor` to pass to get the next page.
+    - With `stream`, feedbacks are streamed as NDJSON (one feedback per line).
+
     Returns
     -------
     list: dict (FeedbackRequest)
@@ -578,37 +1072,77 @@ def get_feedbacks(
     if application:
         where_clauses[FEEDBACK.APPLICATION.value] = application
 
-    feedbacks = STORE.get_feedbacks(where_clauses=where_clauses)
+    # Stream feedbacks straight from database cursor
+    # NOTE: Feedbacks are read from a dedicated connection, as chunks are produced on any feedback thread
+    if stream:
+        return StreamingResponse(
+            _stream_feedbacks(where_clauses, _format), media_type="application/x-ndjson"
+        )
 
     if _format and _format == FEEDBACK_RESPONSE_FORMAT.PRIMEQA.value:
-        # *special case*: "primeqa" format assumes only positive feedback returns
-        return [
-            {
-                ATTR_ID: feedback_idx,
-                FEEDBACK.QUESTION.value: feedback[FEEDBACK.QUESTION.value],
-                FEEDBACK.CONTEXT.value: feedback[FEEDBACK.CONTEXT.value],
-                ATTR_ANSWERS: {
-                    ATTR_TEXT: [feedback[FEEDBACK.ANSWER.value]],
-                    ATTR_ANSWER_START: [feedback[FEEDBACK.START_CHAR_OFFSET.value]],
+        if limit or cursor:
+            mobj = PATTERN_ERROR_MESSAGE.match(
+                ErrorMessages.INVALID_REQUEST.value.format(
+                    "Pagination is not supported for primeqa format."
+                )
+            )
+            raise HTTPException(
+                status_code=400,
+                detail={
+                    "code": mobj.group(1).strip(),
+                    "message": mobj.group(2).strip(),
                 },
-            }
-            for feedback_idx, feedback in enumerate(feedbacks)
-            if feedback[FEEDBACK.THUMBS_UP] == 1
+            )
+
+        # *special case*: "primeqa" format only holds positive feedbacks
+        return [
+            to_primeqa_format(feedback_idx, feedback)
+            for feedback_idx, feedback in enumerate(
+                STORE.get_feedbacks(
+                    where_clauses=positive_feedbacks_only(where_clauses)
+                )
+            )
         ]
 
-    return feedbacks
+    # Return a page of feedbacks, along with cursor to next page
+    # NOTE: Feedbacks are read from the database as is, hence they are returned without re-validation
+    if limit or cursor:
+        feedbacks, last_position = STORE.get_feedbacks_page(
+            where_clauses=where_clauses,
+            limit=limit or 100,
+            after=_decode_cursor(cursor) if cursor else None,
+        )
+        return ORJSONResponse(
+            content=feedbacks,
+            headers=(
+                {"X-Next-Cursor": _encode_cursor(last_position)}
+                if last_position is not None
+                else None
+            ),
+        )
+
+    return STORE.get_feedbacks(where_clauses=where_clauses)
 
 
 @app.post(
     "/feedbacks",
     status_code=status.HTTP_201_CREATED,
     response_model=Feedback,
+    responses={
+        status.HTTP_202_ACCEPTED: {
+            "description": "Feedback queued, to be saved later (feedback write-behind)"
+        }
+    },
     tags=["Feedback"],
 )
+@run_in(FEEDBACK_EXECUTOR)
 def post_feedback(feedback: Feedback):
     """
     Save feedback data
 
+    With feedback write-behind enabled, feedback is queued and saved later, hence it is
+    acknowledged with "202 Accepted" and no body.
+
     Parameters
     ----------
     feedback: dict (Feedback)
@@ -618,15 +1152,101 @@ def post_feedback(feedback: Feedback):
     saved feedback: dict (Feedback)
 
     """
-    feedback = feedback.dict()
-    STORE.save_feedback(feedback)
+    saved_feedback = STORE.save_feedback(feedback.dict())
+    if saved_feedback is None:
+        mobj = PATTERN_ERROR_MESSAGE.match(
+            ErrorMessages.FAILED_TO_EXECUTE_COMMAND.value.format(
+                "Failed to save feedback."
+            )
+        )
+        raise HTTPException(
+            status_code=500,
+            detail={"code": mobj.group(1).strip(), "message": mobj.group(2).strip()},
+        )
 
-    return STORE.get_feedbacks(
-        where_clauses={
-            FEEDBACK.FEEDBACK_ID: feedback[FEEDBACK.FEEDBACK_ID.value],
-            FEEDBACK.USER_ID: feedback[FEEDBACK.USER_ID.value],
-        }
-    )[0]
+    # NOTE: With write-behind, returned feedback is the queued one, not the saved one
+    if config.enable_feedback_write_behind:
+        return Response(status_code=status.HTTP_202_ACCEPTED)
+
+    return saved_feedback
+
+
+@app.post(
+    "/feedbacks/bulk",
+    status_code=status.HTTP_200_OK,
+    response_model=FeedbackIngestionResponse,
+    response_class=ORJSONResponse,
+    tags=["Feedback"],
+)
+async def post_feedbacks_in_bulk(request: Request):
+    """
+    Save feedbacks in bulk, from a JSON array or NDJSON (one feedback per line) request body
+
+    Returns
+    -------
+    status of each feedback: dict (FeedbackIngestionResponse)
+
+    """
+    # Step 1: Read request body up to its first non-blank byte, to tell a JSON array from NDJSON
+    chunks = request.stream()
+    head = b""
+    async for chunk in chunks:
+        head += chunk
+        if head.strip():
+            break
+
+    # Step 2: Validate and save NDJSON feedbacks on feedback thread pool, a chunk at a time, as lines arrive
+    # NOTE: Response is built from validated feedbacks, hence it is returned without re-validation
+    if not head.lstrip().startswith(b"["):
+        ingestion = FeedbackIngestion(STORE, config.feedback_ingestion_chunk_size)
+        lines = []
+        async for line in iter_lines(chunks, head):
+            lines.append(line)
+            if len(lines) >= config.feedback_ingestion_chunk_size:
+                await FEEDBACK_EXECUTOR.run(ingestion.add, parse_ndjson(lines))
+                lines = []
+
+        await FEEDBACK_EXECUTOR.run(ingestion.add, parse_ndjson(lines))
+        return ORJSONResponse(content=await FEEDBACK_EXECUTOR.run(ingestion.finish))
+
+    # Step 3: Read and parse JSON array
+    # NOTE: JSON array is parsed as a whole, hence its size is capped
+    body = head
+    async for chunk in chunks:
+        body += chunk
+        if len(body) > config.feedback_ingestion_max_array_size:
+            mobj = PATTERN_ERROR_MESSAGE.match(
+                ErrorMessages.INVALID_REQUEST.value.format(
+                    f"JSON array exceeds {config.feedback_ingestion_max_array_size} bytes, send NDJSON instead"
+                )
+            )
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail={
+                    "code": mobj.group(1).strip(),
+                    "message": mobj.group(2).strip(),
+                },
+            )
+
+    try:
+        items = parse_feedbacks(body)
+        if not isinstance(items, list):
+            raise ValueError("Expected JSON array or NDJSON of feedbacks")
+    except ValueError as err:
+        mobj = PATTERN_ERROR_MESSAGE.match(
+            ErrorMessages.INVALID_REQUEST.value.format(err)
+        )
+        raise HTTPException(
+            status_code=400,
+            detail={"code": mobj.group(1).strip(), "message": mobj.group(2).strip()},
+        ) from err
+
+    # Step 4: Validate and save feedbacks on feedback thread pool
+    return ORJSONResponse(
+        content=await FEEDBACK_EXECUTOR.run(
+            ingest_feedbacks, STORE, items, config.feedback_ingestion_chunk_size
+        )
+    )
 
 
 @app.patch(
@@ -635,6 +1255,7 @@ def post_feedback(feedback: Feedback):
     response_model=Feedback,
     tags=["Feedback"],
 )
+@run_in(FEEDBACK_EXECUTOR)
 def update_feedback(
     feedback_id: str,
     update: dict,
@@ -667,6 +1288,7 @@ def update_feedback(
     response_model=dict,
     tags=["Feedback"],
 )
+@run_in(FEEDBACK_EXECUTOR)
 def delete_feedback(feedback_id: str, delete_request: dict):
     """
     Delete feedback data
@@ -683,6 +1305,30 @@ def delete_feedback(feedback_id: str, delete_request: dict):
     return STORE.delete_feedback(feedback_id, delete_request[FEEDBACK.USER_ID.value])
 
 
+#############################################################################################
+#                       Metrics APIs
+#############################################################################################
+@app.get(
+    "/metrics",
+    status_code=status.HTTP_200_OK,
+    response_model=dict,
+    tags=["Metrics"],
+)
+async def get_metrics():
+    """
+    Retrieve service metrics (e.g., number of coalesced "/ask" requests) for this process.
+
+    NOTE: Served directly on the event loop, so that metrics stay available while endpoint thread pools are saturated.
+
+    Returns
+    -------
+    metrics: dict
+        counters and gauges
+
+    """
+    return Metrics.get()
+
+
 _logger.info(
     "Server instance started on port %s - initialization took %.6f seconds",
     config.rest_port,
@@ -716,7 +1362,16 @@ def main() -> None:
         )
 
     # Run server
-    uvicorn.Server(server_config).run()
+    # NOTE: "uvicorn.Server" serves from a single process, irrespective of "workers" setting,
+    # hence multiple workers are forked by the supervisor
+    if config.num_rest_server_workers > 1:
+        Supervisor(
+            server_config,
+            num_workers=config.num_rest_server_workers,
+            graceful_timeout=config.rest_server_worker_graceful_timeout,
+        ).run()
+    else:
+        uvicorn.Server(server_config).run()
 
 
 if __name__ == "__main__":
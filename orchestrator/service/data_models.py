@@ -16,9 +16,21 @@
 # limitations under the License.
 
 from typing import List, Dict, Union, Literal
-from pydantic import BaseModel
+from pydantic import BaseModel, root_validator
 
-from orchestrator.constants import PARAMETER, EVIDENCE_TYPES
+from orchestrator.constants import (
+    PARAMETER,
+    EVIDENCE_TYPES,
+    RESPONSE_MODE,
+    FUSION,
+    ATTR_TEXT,
+    ATTR_SCORE,
+    ATTR_CONFIDENCE,
+    ATTR_DOCUMENT_ID,
+    ATTR_TITLE,
+    ATTR_URL,
+    ATTR_TEXT_OFFSET,
+)
 
 
 #############################################################################################
@@ -51,6 +63,18 @@ class Document(BaseModel):
     document_id: Union[str, None] = None
     title: Union[str, None] = None
     url: Union[str, None] = None
+    text_offset: Union[int, None] = None
+
+
+DocumentField = Literal[
+    ATTR_TEXT,
+    ATTR_SCORE,
+    ATTR_CONFIDENCE,
+    ATTR_DOCUMENT_ID,
+    ATTR_TITLE,
+    ATTR_URL,
+    ATTR_TEXT_OFFSET,
+]
 
 
 #############################################################################################
@@ -77,6 +101,12 @@ class TextEvidence(BaseModel):
     offsets: Union[List[Offset], None] = None
 
 
+class DocumentReferenceEvidence(BaseModel):
+    evidence_type: str = EVIDENCE_TYPES.DOCUMENT_REFERENCE.value
+    document_index: int
+    offsets: Union[List[Offset], None] = None
+
+
 #############################################################################################
 #                       Reader
 #############################################################################################
@@ -118,7 +148,12 @@ class GetAnswersRequest(BaseModel):
 class Answer(BaseModel):
     text: str
     confidence_score: float
-    evidences: Union[List[DocumentEvidence], List[TextEvidence], None] = None
+    evidences: Union[
+        List[DocumentEvidence],
+        List[TextEvidence],
+        List[DocumentReferenceEvidence],
+        None,
+    ] = None
 
 
 #############################################################################################
@@ -128,16 +163,51 @@ class GetDocumentsRequest(BaseModel):
     question: str
     retriever: Retriever
     collection: Collection
+    fields: Union[List[DocumentField], None] = None
+    max_document_chars: Union[int, None] = None
 
 
 #############################################################################################
 #                       Question Answering
 #############################################################################################
-class QuestionAnsweringRequest(BaseModel):
-    question: str
+class RetrievalSource(BaseModel):
     retriever: Retriever
     collection: Collection
+    weight: float = 1.0
+
+
+class Fusion(BaseModel):
+    method: Literal[
+        FUSION.RECIPROCAL_RANK, FUSION.WEIGHTED_SCORE
+    ] = FUSION.RECIPROCAL_RANK
+    rrf_k: int = 60
+    top_k: Union[int, None] = None
+
+
+class QuestionAnsweringRequest(BaseModel):
+    question: str
+    retriever: Union[Retriever, None] = None
+    collection: Union[Collection, None] = None
+    sources: Union[List[RetrievalSource], None] = None
+    fusion: Fusion = Fusion()
     reader: Reader
+    response_mode: Literal[
+        RESPONSE_MODE.FULL, RESPONSE_MODE.COMPACT
+    ] = RESPONSE_MODE.FULL
+    snippet_window: Union[int, None] = None
+    fields: Union[List[DocumentField], None] = None
+    max_document_chars: Union[int, None] = None
+
+    @root_validator(skip_on_failure=True)
+    def check_retrieval_sources(cls, values):
+        # Either a single retriever and collection, or multiple retrieval sources must be provided
+        if not values.get("sources") and (
+            values.get("retriever") is None or values.get("collection") is None
+        ):
+            raise ValueError(
+                'either "retriever" and "collection", or "sources" must be provided'
+            )
+        return values
 
 
 class QuestionAnsweringResponse(BaseModel):
@@ -161,6 +231,21 @@ class Feedback(BaseModel):
     application: Union[str, None] = None
 
 
+class FeedbackIngestionItem(BaseModel):
+    index: int
+    status: str
+    feedback_id: Union[str, None] = None
+    user_id: Union[str, None] = None
+    error: Union[str, None] = None
+
+
+class FeedbackIngestionResponse(BaseModel):
+    saved: int
+    invalid: int
+    failed: int
+    items: List[FeedbackIngestionItem]
+
+
 class FeedbackInPrimeQAFormat(BaseModel):
     id: str
     question: str
@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2022 PrimeQA Team
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.encoders import jsonable_encoder
+from fastapi.routing import APIRoute, _prepare_response_content
+from pydantic import ValidationError
+from starlette.responses import Response
+
+from orchestrator.metrics import Metrics
+
+
+class EndpointExecutor:
+    """
+    Dedicated thread pool for a class of blocking endpoints.
+
+    Endpoints of different classes run on separate pools, so that slow endpoints
+    (e.g. question answering) can not starve quick ones (e.g. settings).
+
+    Metrics (prefixed with executor name):
+    - "_executor_queue_depth" (gauge): calls waiting for a thread
+    - "_executor_active" (gauge): calls running on a thread
+    - "_executor_calls" (counter): calls started
+    - "_executor_wait_seconds" (counter): total time calls spent waiting for a thread
+    """
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max_workers
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=f"{name}-endpoint"
+        )
+        self._queued = 0
+        self._active = 0
+        self._lock = threading.Lock()
+
+    def _update_gauges(self):
+        Metrics.set(f"{self.name}_executor_queue_depth", self._queued)
+        Metrics.set(f"{self.name}_executor_active", self._active)
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Run blocking function on executor's thread pool
+
+        Parameters
+        ----------
+        fn: Callable
+            blocking function to run
+
+        Returns
+        -------
+        function's result
+        """
+        submitted_t = time.time()
+        with self._lock:
+            self._queued += 1
+            self._update_gauges()
+
+        def call():
+            with self._lock:
+                self._queued -= 1
+                self._active += 1
+                self._update_gauges()
+            Metrics.increment(f"{self.name}_executor_calls")
+            Metrics.increment(
+                f"{self.name}_executor_wait_seconds", time.time() - submitted_t
+            )
+
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._update_gauges()
+
+        def discard(future):
+            # NOTE: Calls cancelled before they start (e.g. cancelled requests) never leave the queue otherwise
+            if future.cancelled():
+                with self._lock:
+                    self._queued -= 1
+                    self._update_gauges()
+
+        # NOTE: Context variables are propagated, as is done by Starlette's default thread pool
+        context = contextvars.copy_context()
+        future = self._executor.submit(context.run, call)
+        future.add_done_callback(discard)
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+def run_in(executor: EndpointExecutor) -> Callable:
+    """
+    Decorator running a synchronous endpoint on given executor instead of the default thread pool
+
+    Parameters
+    ----------
+    executor: EndpointExecutor
+        executor to run endpoint on
+
+    Returns
+    -------
+    Callable: decorator
+    """
+
+    def decorator(fn: Callable) -> Callable:
+        # NOTE: "functools.wraps" preserves endpoint's signature, which FastAPI inspects for request parameters
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            return await executor.run(fn, *args, **kwargs)
+
+        # NOTE: Lets "EndpointExecutorRoute" serialize endpoint's responses on the same executor
+        wrapper.executor = executor
+        return wrapper
+
+    return decorator
+
+
+class EndpointExecutorRoute(APIRoute):
+    """
+    Route running endpoints decorated with "run_in" on their executor, along with validation and
+    serialization of their responses (per route's "response_model").
+
+    FastAPI validates and serializes responses of coroutine endpoints on the event loop, where
+    large responses would block all other requests.
+    """
+
+    def get_route_handler(self):
+        executor = getattr(self.endpoint, "executor", None)
+        if executor is not None:
+            endpoint = self.endpoint.__wrapped__
+
+            async def call(**values):
+                return await executor.run(self._respond, endpoint, values)
+
+            # NOTE: Endpoint returns a response, which FastAPI sends as is
+            self.dependant.call = call
+
+        return super().get_route_handler()
+
+    def _respond(self, endpoint: Callable, values: dict) -> Response:
+        # Step 1: Run endpoint
+        content = endpoint(**values)
+        if isinstance(content, Response):
+            return content
+
+        # Step 2: Validate and serialize response, as FastAPI does (see "fastapi.routing.serialize_response")
+        response_field = self.secure_cloned_response_field
+        if response_field:
+            value, errors = response_field.validate(
+                _prepare_response_content(
+                    content,
+                    exclude_unset=self.response_model_exclude_unset,
+                    exclude_defaults=self.response_model_exclude_defaults,
+                    exclude_none=self.response_model_exclude_none,
+                ),
+                {},
+                loc=("response",),
+            )
+            if errors:
+                raise ValidationError(
+                    errors if isinstance(errors, list) else [errors],
+                    response_field.type_,
+                )
+            content = jsonable_encoder(
+                value,
+                include=self.response_model_include,
+                exclude=self.response_model_exclude,
+                by_alias=self.response_model_by_alias,
+                exclude_unset=self.response_model_exclude_unset,
+                exclude_defaults=self.response_model_exclude_defaults,
+                exclude_none=self.response_model_exclude_none,
+            )
+        else:
+            content = jsonable_encoder(content)
+
+        # Step 3: Render response
+        response_class = (
+            self.response_class.value
+            if isinstance(self.response_class, DefaultPlaceholder)
+            else self.response_class
+        )
+        if self.status_code is not None:
+            return response_class(content, status_code=self.status_code)
+        return response_class(content)
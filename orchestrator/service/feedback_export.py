@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2022 PrimeQA Team
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Export feedbacks for training jobs, streamed from the feedback database to disk chunk by chunk.
+
+Output format is picked by file extension:
+- ".jsonl": JSON Lines
+- ".jsonl.gz": gzip compressed JSON Lines
+- ".parquet": Parquet, with a row group per chunk of feedbacks (requires "pyarrow")
+
+Usage: python -m orchestrator.service.feedback_export feedbacks.jsonl.gz [--format primeqa] [--application reading]
+"""
+
+from typing import Iterator, List
+import argparse
+import gzip
+
+import orjson
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+from orchestrator.constants import (
+    ATTR_ANSWER_START,
+    ATTR_ANSWERS,
+    ATTR_ID,
+    ATTR_TEXT,
+    FEEDBACK,
+    FEEDBACK_RESPONSE_FORMAT,
+)
+from orchestrator.exceptions import Error, ErrorMessages
+from orchestrator.store import Store, StoreFactory
+
+
+def to_primeqa_format(feedback_idx: int, feedback: dict) -> dict:
+    """
+    Convert feedback to PrimeQA training format (SQuAD-like)
+
+    Parameters
+    ----------
+    feedback_idx: int
+        feedback's index within export
+    feedback: dict
+        feedback (Feedback)
+
+    Returns
+    -------
+    dict: FeedbackInPrimeQAFormat
+    """
+    return {
+        ATTR_ID: str(feedback_idx),
+        FEEDBACK.QUESTION.value: feedback[FEEDBACK.QUESTION.value],
+        FEEDBACK.CONTEXT.value: feedback[FEEDBACK.CONTEXT.value],
+        ATTR_ANSWERS: {
+            ATTR_TEXT: [feedback[FEEDBACK.ANSWER.value]],
+            ATTR_ANSWER_START: [feedback[FEEDBACK.START_CHAR_OFFSET.value]],
+        },
+    }
+
+
+def positive_feedbacks_only(where_clauses: dict = None) -> dict:
+    """
+    Restrict filters to positive feedbacks, as "primeqa" format only holds positive feedbacks
+
+    Parameters
+    ----------
+    where_clauses: dict
+        filters
+
+    Returns
+    -------
+    dict: filters
+    """
+    return {**(where_clauses or {}), FEEDBACK.THUMBS_UP.value: 1}
+
+
+def iter_feedbacks_in_format(
+    store: Store,
+    where_clauses: dict = None,
+    response_format: str = FEEDBACK_RESPONSE_FORMAT.RAW.value,
+    chunk_size: int = 500,
+) -> Iterator[List[dict]]:
+    """
+    Iterate over feedbacks in chunks, in requested format
+
+    Parameters
+    ----------
+    store: Store
+        store
+    where_clauses: dict
+        filters
+    response_format: str
+        "raw" (Feedback) or "primeqa" (FeedbackInPrimeQAFormat, positive feedbacks only)
+    chunk_size: int
+        number of feedbacks per chunk
+
+    Returns
+    -------
+    Iterator: chunks of feedbacks
+    """
+    if response_format != FEEDBACK_RESPONSE_FORMAT.PRIMEQA.value:
+        yield from store.iter_feedbacks(
+            where_clauses=where_clauses, chunk_size=chunk_size
+        )
+        return
+
+    feedback_idx = 0
+    for feedbacks in store.iter_feedbacks(
+        where_clauses=positive_feedbacks_only(where_clauses), chunk_size=chunk_size
+    ):
+        yield [
+            to_primeqa_format(feedback_idx + idx, feedback)
+            for idx, feedback in enumerate(feedbacks)
+        ]
+        feedback_idx += len(feedbacks)
+
+
+def _parquet_schema(response_format: str):
+    if response_format == FEEDBACK_RESPONSE_FORMAT.PRIMEQA.value:
+        return pyarrow.schema(
+            [
+                (ATTR_ID, pyarrow.string()),
+                (FEEDBACK.QUESTION.value, pyarrow.string()),
+                (FEEDBACK.CONTEXT.value, pyarrow.string()),
+                (
+                    ATTR_ANSWERS,
+                    pyarrow.struct(
+                        [
+                            (ATTR_TEXT, pyarrow.list_(pyarrow.string())),
+                            (ATTR_ANSWER_START, pyarrow.list_(pyarrow.int64())),
+                        ]
+                    ),
+                ),
+            ]
+        )
+
+    return pyarrow.schema(
+        [
+            (FEEDBACK.FEEDBACK_ID.value, pyarrow.string()),
+            (FEEDBACK.USER_ID.value, pyarrow.string()),
+            (FEEDBACK.QUESTION.value, pyarrow.string()),
+            (FEEDBACK.ANSWER.value, pyarrow.string()),
+            (FEEDBACK.THUMBS_UP.value, pyarrow.bool_()),
+            (FEEDBACK.THUMBS_DOWN.value, pyarrow.bool_()),
+            (FEEDBACK.CONTEXT.value, pyarrow.string()),
+            (FEEDBACK.START_CHAR_OFFSET.value, pyarrow.int64()),
+            (FEEDBACK.END_CHAR_OFFSET.value, pyarrow.int64()),
+            (FEEDBACK.APPLICATION.value, pyarrow.string()),
+        ]
+    )
+
+
+def export_feedbacks(
+    store: Store,
+    path: str,
+    where_clauses: dict = None,
+    response_format: str = FEEDBACK_RESPONSE_FORMAT.RAW.value,
+    chunk_size: int = 1000,
+) -> int:
+    """
+    Export feedbacks to file, one chunk of feedbacks at a time
+
+    Parameters
+    ----------
+    store: Store
+        store
+    path: str
+        output file (".jsonl", ".jsonl.gz" or ".parquet")
+    where_clauses: dict
+        filters
+    response_format: str
+        "raw" or "primeqa"
+    chunk_size: int
+        number of feedbacks read and written at a time
+
+    Returns
+    -------
+    int: number of exported feedbacks
+    """
+    chunks = iter_feedbacks_in_format(
+        store, where_clauses, response_format, chunk_size=chunk_size
+    )
+    num_feedbacks = 0
+
+    # Parquet, each chunk written as a row group
+    if path.endswith(".parquet"):
+        if pyarrow is None:
+            raise Error(
+                ErrorMessages.UNSUPPORTED_EXPORT_FORMAT.value.format(
+                    'Parquet export requires "pyarrow" package.'
+                )
+            )
+
+        schema = _parquet_schema(response_format)
+        with pyarrow.parquet.ParquetWriter(path, schema) as writer:
+            for feedbacks in chunks:
+                writer.write_table(pyarrow.Table.from_pylist(feedbacks, schema=schema))
+                num_feedbacks += len(feedbacks)
+        return num_feedbacks
+
+    # JSON Lines, optionally gzip compressed
+    open_file = gzip.open if path.endswith(".gz") else open
+    with open_file(path, "wb") as output_file:
+        for feedbacks in chunks:
+            output_file.write(
+                b"".join(orjson.dumps(feedback) + b"\n" for feedback in feedbacks)
+            )
+            num_feedbacks += len(feedbacks)
+    return num_feedbacks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path", help="output file (.jsonl, .jsonl.gz or .parquet)")
+    parser.add_argument(
+        "--format",
+        choices=[response_format.value for response_format in FEEDBACK_RESPONSE_FORMAT],
+        default=FEEDBACK_RESPONSE_FORMAT.PRIMEQA.value,
+    )
+    parser.add_argument("--application", action="append")
+    parser.add_argument("--user-id", action="append")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    where_clauses = {}
+    if args.application:
+        where_clauses[FEEDBACK.APPLICATION.value] = args.application
+    if args.user_id:
+        where_clauses[FEEDBACK.USER_ID.value] = args.user_id
+
+    store = StoreFactory.get_store()
+    try:
+        num_feedbacks = export_feedbacks(
+            store,
+            args.path,
+            where_clauses=where_clauses,
+            response_format=args.format,
+            chunk_size=args.chunk_size,
+        )
+    finally:
+        store.close()
+
+    print(f"exported: {num_feedbacks}")
+
+
+if __name__ == "__main__":
+    main()
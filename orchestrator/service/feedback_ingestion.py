@@ -0,0 +1,268 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2022 PrimeQA Team
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Bulk feedback ingestion, shared by [POST] /feedbacks/bulk and the command line.
+
+Usage: python -m orchestrator.service.feedback_ingestion feedbacks.jsonl [--chunk-size 1000]
+"""
+
+from typing import Any, AsyncIterator, Iterable, Iterator, List
+import argparse
+import json
+import sys
+
+import orjson
+from pydantic import ValidationError
+
+from orchestrator.constants import FEEDBACK, FEEDBACK_INGESTION_STATUS
+from orchestrator.service.data_models import Feedback
+from orchestrator.store import Store, StoreFactory
+
+
+class InvalidLine:
+    """
+    NDJSON line which is not valid JSON
+    """
+
+    def __init__(self, error: str):
+        self.error = error
+
+
+def parse_ndjson(lines: Iterable[bytes]) -> Iterator[Any]:
+    """
+    Parse NDJSON (JSON Lines) lines, skipping blank lines
+
+    Parameters
+    ----------
+    lines: Iterable
+        lines
+
+    Returns
+    -------
+    Iterator: parsed objects, "InvalidLine" for lines which are not valid JSON
+    """
+    for line in lines:
+        if not line.strip():
+            continue
+
+        try:
+            yield orjson.loads(line)
+        except orjson.JSONDecodeError as err:
+            yield InvalidLine(str(err))
+
+
+def parse_feedbacks(body: bytes) -> List[Any]:
+    """
+    Parse request body, either a JSON array or NDJSON
+
+    Parameters
+    ----------
+    body: bytes
+        request body
+
+    Returns
+    -------
+    list: parsed objects
+
+    Raises
+    ------
+    ValueError: if body is neither a valid JSON array nor NDJSON
+    """
+    if body.lstrip().startswith(b"["):
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError as err:
+            raise ValueError(f"Invalid JSON array: {err}") from err
+
+    return list(parse_ndjson(body.splitlines()))
+
+
+async def iter_lines(
+    chunks: AsyncIterator[bytes], head: bytes = b""
+) -> AsyncIterator[bytes]:
+    """
+    Split streamed bytes into lines, as they arrive
+
+    Parameters
+    ----------
+    chunks: AsyncIterator
+        streamed bytes, e.g. request.stream()
+    head: bytes
+        bytes already read from the stream
+
+    Returns
+    -------
+    AsyncIterator: lines, without line breaks
+    """
+    pending = b""
+    chunk = head
+    while True:
+        lines = chunk.split(b"\n")
+        lines[0] = pending + lines[0]
+        pending = lines.pop()
+        for line in lines:
+            yield line
+
+        try:
+            chunk = await chunks.__anext__()
+        except StopAsyncIteration:
+            break
+
+    if pending:
+        yield pending
+
+
+class FeedbackIngestion:
+    """
+    Bulk feedback ingestion, validating feedbacks as they are parsed and saving them a chunk at a time
+
+    NOTE: Only the status of each item is kept, hence memory use does not grow with the size of the feedbacks
+    """
+
+    def __init__(self, store: Store, chunk_size: int):
+        self.store = store
+        self.chunk_size = chunk_size
+        self._num_items = 0
+        self._feedbacks = []
+        self._statuses = []
+
+    def add(self, items: Iterable[Any]):
+        """
+        Validate feedbacks, saving valid ones each time a chunk fills
+
+        Parameters
+        ----------
+        items: Iterable
+            parsed feedbacks
+        """
+        for item in items:
+            index = self._num_items
+            self._num_items += 1
+
+            if isinstance(item, InvalidLine):
+                error = item.error
+            else:
+                try:
+                    self._feedbacks.append((index, Feedback.parse_obj(item).dict()))
+                    if len(self._feedbacks) >= self.chunk_size:
+                        self._save()
+                    continue
+                except ValidationError as err:
+                    error = str(err).replace("\n", " ")
+
+            self._statuses.append(
+                {
+                    "index": index,
+                    "status": FEEDBACK_INGESTION_STATUS.INVALID.value,
+                    "error": error,
+                }
+            )
+
+    def _save(self):
+        feedbacks, self._feedbacks = self._feedbacks, []
+        errors = self.store.save_feedbacks(
+            [feedback for _, feedback in feedbacks], chunk_size=self.chunk_size
+        )
+        for (index, feedback), error in zip(feedbacks, errors):
+            status = {
+                "index": index,
+                "status": FEEDBACK_INGESTION_STATUS.SAVED.value,
+                FEEDBACK.FEEDBACK_ID.value: feedback[FEEDBACK.FEEDBACK_ID.value],
+                FEEDBACK.USER_ID.value: feedback[FEEDBACK.USER_ID.value],
+            }
+            if error is not None:
+                status["status"] = FEEDBACK_INGESTION_STATUS.FAILED.value
+                status["error"] = error
+            self._statuses.append(status)
+
+    def finish(self) -> dict:
+        """
+        Save remaining valid feedbacks
+
+        Returns
+        -------
+        dict: FeedbackIngestionResponse, with the status of each item
+        """
+        if self._feedbacks:
+            self._save()
+
+        # Report status of each item, in input order
+        self._statuses.sort(key=lambda status: status["index"])
+        return {
+            **{
+                ingestion_status.value: sum(
+                    status["status"] == ingestion_status.value
+                    for status in self._statuses
+                )
+                for ingestion_status in FEEDBACK_INGESTION_STATUS
+            },
+            "items": self._statuses,
+        }
+
+
+def ingest_feedbacks(store: Store, items: Iterable[Any], chunk_size: int) -> dict:
+    """
+    Validate and save feedbacks in bulk
+
+    Parameters
+    ----------
+    store: Store
+        store
+    items: Iterable
+        parsed feedbacks
+    chunk_size: int
+        number of feedbacks saved per transaction
+
+    Returns
+    -------
+    dict: FeedbackIngestionResponse, with the status of each item
+    """
+    ingestion = FeedbackIngestion(store, chunk_size)
+    ingestion.add(items)
+    return ingestion.finish()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("file", help="JSONL file with a feedback per line")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    store = StoreFactory.get_store()
+    try:
+        with open(args.file, "rb") as feedbacks_file:
+            result = ingest_feedbacks(
+                store, parse_ndjson(feedbacks_file), args.chunk_size
+            )
+    finally:
+        store.close()
+
+    # Report items which were not saved
+    # NOTE: Item index counts non-blank lines
+    for status in result["items"]:
+        if status["status"] != FEEDBACK_INGESTION_STATUS.SAVED.value:
+            print(json.dumps(status), file=sys.stderr)
+
+    print(
+        f"saved: {result['saved']}, invalid: {result['invalid']}, failed: {result['failed']}"
+    )
+    sys.exit(1 if result["invalid"] or result["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2022 PrimeQA Team
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import Dict, List
+import logging
+import os
+import signal
+import socket
+import time
+
+import uvicorn
+
+
+_logger = logging.getLogger(__name__)
+
+# Workers exiting sooner than this after start are considered to be crash looping
+_MIN_WORKER_LIFETIME = 1.0
+_MAX_RESPAWN_DELAY = 30.0
+
+
+class Supervisor:
+    """
+    Pre-forking process supervisor for the REST server.
+
+    The application is imported once in the supervisor process and the listening socket is bound
+    once, before forking. Workers then share copy-on-write memory and accept connections from the
+    shared socket, while opening their own gRPC channels and SQLite connections after the fork.
+
+    Signals (to supervisor process):
+    - SIGHUP: rolling reload, each worker is replaced by a fresh one, one at a time
+    - SIGINT, SIGTERM: graceful shutdown
+
+    Workers which exit unexpectedly are restarted, with exponential back-off when crash looping.
+
+    NOTE: Since application is preloaded, rolling reload refreshes worker processes (and their
+    connections and caches) but does not pick up code changes. Those require a restart.
+    """
+
+    def __init__(
+        self,
+        server_config: uvicorn.Config,
+        num_workers: int,
+        graceful_timeout: float = 30.0,
+        poll_interval: float = 0.5,
+    ):
+        self.server_config = server_config
+        self.num_workers = num_workers
+        self.graceful_timeout = graceful_timeout
+        self.poll_interval = poll_interval
+
+        self.workers: Dict[int, float] = {}
+        self._socket = None
+        self._should_stop = False
+        self._should_reload = False
+        self._respawn_delay = 0.0
+
+    # ---------------------------------------------------------------------------------------------
+    #                               Worker lifecycle
+    # ---------------------------------------------------------------------------------------------
+    def _run_worker(self, sock: socket.socket):
+        uvicorn.Server(self.server_config).run(sockets=[sock])
+
+    def spawn_worker(self) -> int:
+        """
+        Fork a new worker serving from the shared socket
+
+        Returns
+        -------
+        int: worker's process id
+        """
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                # Workers leave reloads to supervisor, and handle SIGINT/SIGTERM gracefully on their own
+                signal.signal(signal.SIGHUP, signal.SIG_IGN)
+                signal.signal(signal.SIGINT, signal.SIG_DFL)
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                self._run_worker(self._socket)
+            except BaseException:
+                _logger.exception("Worker %d failed", os.getpid())
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+
+        self.workers[pid] = time.time()
+        _logger.info("Started worker %d", pid)
+        return pid
+
+    def _wait_worker(self, pid: int, deadline: float) -> bool:
+        while time.time() < deadline:
+            try:
+                waited_pid, _ = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                return True
+            if waited_pid == pid:
+                return True
+            time.sleep(0.05)
+
+        _logger.warning(
+            "Worker %d did not exit within %ss, killing it", pid, self.graceful_timeout
+        )
+        try:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        except (ProcessLookupError, ChildProcessError):
+            pass
+
+        return False
+
+    def terminate_worker(self, pid: int) -> bool:
+        """
+        Gracefully stop a worker, killing it if it does not exit within graceful timeout
+
+        Parameters
+        ----------
+        pid: int
+            worker's process id
+
+        Returns
+        -------
+        bool: True if worker exited gracefully
+        """
+        self.workers.pop(pid, None)
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+        return self._wait_worker(pid, time.time() + self.graceful_timeout)
+
+    def reap_workers(self) -> List[int]:
+        """
+        Collect exited workers and replace them, unless supervisor is stopping
+
+        Returns
+        -------
+        list: process ids of exited workers
+        """
+        exited = []
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+
+            started_at = self.workers.pop(pid, None)
+            if started_at is None:
+                continue
+
+            exited.append(pid)
+            _logger.warning(
+                "Worker %d exited unexpectedly (status: %d)",
+                pid,
+                os.waitstatus_to_exitcode(status),
+            )
+
+            # Back off, if worker died right after start
+            if time.time() - started_at < _MIN_WORKER_LIFETIME:
+                self._respawn_delay = min(
+                    max(self._respawn_delay * 2, _MIN_WORKER_LIFETIME),
+                    _MAX_RESPAWN_DELAY,
+                )
+            else:
+                self._respawn_delay = 0.0
+
+        if exited and not self._should_stop:
+            if self._respawn_delay:
+                time.sleep(self._respawn_delay)
+            for _ in range(self.num_workers - len(self.workers)):
+                self.spawn_worker()
+
+        return exited
+
+    def reload(self):
+        """
+        Replace workers one at a time, starting a new worker before stopping an old one,
+        so that serving capacity never drops below configured number of workers
+        """
+        _logger.info("Reloading %d workers", len(self.workers))
+        for pid in list(self.workers):
+            if self._should_stop:
+                break
+            self.spawn_worker()
+            self.terminate_worker(pid)
+
+    def stop(self):
+        """
+        Gracefully stop all workers
+        """
+        self._should_stop = True
+        pids = list(self.workers)
+        self.workers.clear()
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+        # Workers drain in parallel, sharing the same deadline
+        deadline = time.time() + self.graceful_timeout
+        for pid in pids:
+            self._wait_worker(pid, deadline)
+
+    # ---------------------------------------------------------------------------------------------
+    #                               Supervisor loop
+    # ---------------------------------------------------------------------------------------------
+    def start(self):
+        """
+        Bind shared listening socket and fork workers
+        """
+        self._socket = self.server_config.bind_socket()
+        for _ in range(self.num_workers):
+            self.spawn_worker()
+
+    def _handle_stop(self, signum, frame):
+        self._should_stop = True
+
+    def _handle_reload(self, signum, frame):
+        self._should_reload = True
+
+    def run(self):
+        """
+        Run supervisor until SIGINT or SIGTERM is received
+        """
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGHUP, self._handle_reload)
+
+        _logger.info("Supervisor %d starting %d workers", os.getpid(), self.num_workers)
+        self.start()
+        try:
+            while not self._should_stop:
+                self.reap_workers()
+                if self._should_reload:
+                    self._should_reload = False
+                    self.reload()
+                time.sleep(self.poll_interval)
+        finally:
+            self.stop()
+            self._socket.close()
+            _logger.info("Supervisor %d stopped", os.getpid())
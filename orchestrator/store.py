@@ -15,20 +15,783 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import List
+from typing import Callable, Iterator, List, Tuple, Union
+import functools
+import hashlib
 import logging
 import os
 from pathlib import Path
+import queue
 import shutil
 import sqlite3
+import threading
+import time
+import zlib
 
 from pkg_resources import resource_filename
+from orchestrator.cache import LoadingCache
 from orchestrator.exceptions import ErrorMessages
 from orchestrator.utils import update_dict, load_json, save_json
 from orchestrator.constants import ATTR_SETTINGS, FEEDBACK
 
 
 _PRIMEQA_APPLICATION_FILE = resource_filename("data", "primeqa.json")
+_SETTINGS_CACHE_TTL = 5
+_DB_BUSY_TIMEOUT = 5.0
+_DB_CACHED_STATEMENTS = 256
+
+# "INSERT ... ON CONFLICT" requires SQLite 3.24+, "INSERT ... RETURNING" requires SQLite 3.35+
+_SUPPORTS_UPSERT = sqlite3.sqlite_version_info >= (3, 24, 0)
+_SUPPORTS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+_BULK_CHUNK_SIZE = 1000
+_WRITE_BEHIND_FLUSH_INTERVAL = 0.05
+_WRITE_BEHIND_BATCH_SIZE = 500
+_WRITE_BEHIND_MAX_QUEUE_SIZE = 10000
+
+# Contexts of at least this many bytes are stored zlib compressed, if it makes them smaller
+_CONTEXT_COMPRESSION_MIN_SIZE = 512
+_CONTEXT_CACHE_SIZE = 1024
+
+# Feedback table columns, in table order
+_FEEDBACK_COLUMNS = [
+    FEEDBACK.FEEDBACK_ID.value,
+    FEEDBACK.USER_ID.value,
+    FEEDBACK.QUESTION.value,
+    FEEDBACK.ANSWER.value,
+    FEEDBACK.THUMBS_UP.value,
+    FEEDBACK.THUMBS_DOWN.value,
+    FEEDBACK.CONTEXT.value,
+    FEEDBACK.START_CHAR_OFFSET.value,
+    FEEDBACK.END_CHAR_OFFSET.value,
+    FEEDBACK.APPLICATION.value,
+]
+
+# Feedback table stores contexts by hash, in context table
+_CONTEXT_HASH_COLUMN = "context_hash"
+_FEEDBACK_TABLE_COLUMNS = [
+    _CONTEXT_HASH_COLUMN if column == FEEDBACK.CONTEXT.value else column
+    for column in _FEEDBACK_COLUMNS
+]
+_FEEDBACK_FROM_CLAUSE = "feedback_table LEFT JOIN context_table ON context_table.context_hash=feedback_table.context_hash"
+
+
+#############################################################################################
+#                       Schema migrations
+#############################################################################################
+def _create_feedback_table(conn: sqlite3.Connection):
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS feedback_table (feedback_id VARCHAR, user_id VARCHAR, question VARCHAR, answer VARCHAR, thumbs_up BOOLEAN, thumbs_down BOOLEAN, context VARCHAR, start_char_offset INTEGER, end_char_offset INTEGER, application VARCAR)"
+    )
+
+
+def _index_feedback_table(conn: sqlite3.Connection):
+    """
+    Index feedback table, with unique (feedback_id, user_id) pairs
+
+    Databases created before the unique index may hold duplicate feedbacks per (feedback_id, user_id).
+    Only the most recently saved one (highest rowid, i.e. MAX(rowid)) is kept, others are dropped
+    and their number is logged as a warning.
+
+    Parameters
+    ----------
+    conn: sqlite3.Connection
+        feedback database connection
+    """
+    # Step 1: Drop duplicate feedbacks per (feedback_id, user_id), keeping the most recently saved one (MAX(rowid))
+    cursor = conn.execute(
+        "DELETE FROM feedback_table WHERE rowid NOT IN (SELECT MAX(rowid) FROM feedback_table GROUP BY feedback_id, user_id)"
+    )
+    if cursor.rowcount > 0:
+        logging.getLogger(__name__).warning(
+            "Dropped %d duplicate feedback(s) per (feedback_id, user_id), keeping the most recently saved ones",
+            cursor.rowcount,
+        )
+
+    # Step 2: Index lookups by (feedback_id, user_id), which also serves lookups by feedback_id alone
+    conn.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS feedback_table_feedback_id_user_id ON feedback_table (feedback_id, user_id)"
+    )
+
+    # Step 3: Index filters on application and user_id
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS feedback_table_application ON feedback_table (application)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS feedback_table_user_id ON feedback_table (user_id)"
+    )
+
+
+def _store_contexts_by_hash(conn: sqlite3.Connection):
+    # Step 1: Create context table, with each distinct context stored once
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS context_table (context_hash BLOB PRIMARY KEY, context BLOB) WITHOUT ROWID"
+    )
+    _store_contexts(
+        conn,
+        (
+            row[0]
+            for row in conn.execute(
+                "SELECT DISTINCT context FROM feedback_table WHERE context IS NOT NULL"
+            )
+        ),
+    )
+
+    # Step 2: Rebuild feedback table with context hashes in place of contexts, keeping rowids (pagination cursors)
+    conn.create_function("context_hash", 1, _context_hash, deterministic=True)
+    conn.execute(
+        "CREATE TABLE feedback_table_v3 (feedback_id VARCHAR, user_id VARCHAR, question VARCHAR, answer VARCHAR, thumbs_up BOOLEAN, thumbs_down BOOLEAN, context_hash BLOB, start_char_offset INTEGER, end_char_offset INTEGER, application VARCHAR)"
+    )
+    conn.execute(
+        "INSERT INTO feedback_table_v3 (rowid, feedback_id, user_id, question, answer, thumbs_up, thumbs_down, context_hash, start_char_offset, end_char_offset, application) "
+        "SELECT rowid, feedback_id, user_id, question, answer, thumbs_up, thumbs_down, context_hash(context), start_char_offset, end_char_offset, application FROM feedback_table"
+    )
+    conn.execute("DROP TABLE feedback_table")
+    conn.execute("ALTER TABLE feedback_table_v3 RENAME TO feedback_table")
+
+    # Step 3: Re-create indexes dropped along with previous table, and index context hashes (context filters, pruning)
+    _index_feedback_table(conn)
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS feedback_table_context_hash ON feedback_table (context_hash)"
+    )
+
+
+def _add_feedback_row_id(conn: sqlite3.Connection):
+    # Step 1: Rebuild feedback table with an explicit row id, from rowids (pagination cursors)
+    # NOTE: Unlike implicit rowids, "INTEGER PRIMARY KEY" columns are preserved by VACUUM
+    conn.execute(
+        "CREATE TABLE feedback_table_v4 (feedback_row_id INTEGER PRIMARY KEY, feedback_id VARCHAR, user_id VARCHAR, question VARCHAR, answer VARCHAR, thumbs_up BOOLEAN, thumbs_down BOOLEAN, context_hash BLOB, start_char_offset INTEGER, end_char_offset INTEGER, application VARCHAR)"
+    )
+    conn.execute(
+        "INSERT INTO feedback_table_v4 (feedback_row_id, feedback_id, user_id, question, answer, thumbs_up, thumbs_down, context_hash, start_char_offset, end_char_offset, application) "
+        "SELECT rowid, feedback_id, user_id, question, answer, thumbs_up, thumbs_down, context_hash, start_char_offset, end_char_offset, application FROM feedback_table"
+    )
+    conn.execute("DROP TABLE feedback_table")
+    conn.execute("ALTER TABLE feedback_table_v4 RENAME TO feedback_table")
+
+    # Step 2: Re-create indexes dropped along with previous table
+    _index_feedback_table(conn)
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS feedback_table_context_hash ON feedback_table (context_hash)"
+    )
+
+
+# NOTE: Migrations are applied in order, database's schema version ("PRAGMA user_version") is the number
+# of applied migrations. Append new migrations, never modify or re-order existing ones.
+_MIGRATIONS: List[Callable[[sqlite3.Connection], None]] = [
+    _create_feedback_table,
+    _index_feedback_table,
+    _store_contexts_by_hash,
+    _add_feedback_row_id,
+]
+
+SCHEMA_VERSION = len(_MIGRATIONS)
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """
+    Upgrade feedback database to the latest schema version, in place.
+
+    Each migration runs in its own transaction, along with the schema version update. Write
+    lock is taken upfront, hence concurrently starting server workers apply each migration once.
+
+    Parameters
+    ----------
+    conn: sqlite3.Connection
+        feedback database connection
+
+    Returns
+    -------
+    int: schema version
+    """
+    logger = logging.getLogger(__name__)
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Step 1: Read schema version, under write lock
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version >= SCHEMA_VERSION:
+                conn.rollback()
+                if version > SCHEMA_VERSION:
+                    logger.warning(
+                        "Feedback database schema version %d is newer than supported version %d",
+                        version,
+                        SCHEMA_VERSION,
+                    )
+                return version
+
+            # Step 2: Apply next migration
+            _MIGRATIONS[version](conn)
+            conn.execute(f"PRAGMA user_version={version + 1}")
+            conn.commit()
+            logger.info("Migrated feedback database to schema version %d", version + 1)
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+
+
+def _to_bool(value) -> Union[bool, None]:
+    # SQLite stores booleans as integers
+    return None if value is None else bool(value)
+
+
+def _context_hash(context: Union[str, None]) -> Union[bytes, None]:
+    return None if context is None else hashlib.sha256(context.encode("utf-8")).digest()
+
+
+def _encode_context(context: str) -> Union[str, bytes]:
+    # Compressed contexts are stored as BLOB, others as TEXT
+    data = context.encode("utf-8")
+    if len(data) >= _CONTEXT_COMPRESSION_MIN_SIZE:
+        compressed = zlib.compress(data)
+        if len(compressed) < len(data):
+            return compressed
+    return context
+
+
+@functools.lru_cache(maxsize=_CONTEXT_CACHE_SIZE)
+def _decompress_context(context: bytes) -> str:
+    # NOTE: Popular contexts are shared by many feedbacks, hence read over and over
+    return zlib.decompress(context).decode("utf-8")
+
+
+def _decode_context(context: Union[str, bytes, None]) -> Union[str, None]:
+    if isinstance(context, bytes):
+        return _decompress_context(context)
+    return context
+
+
+def _store_contexts(conn: sqlite3.Connection, contexts: Iterator[str]):
+    # NOTE: Runs within caller's transaction, contexts already stored are left as is
+    conn.executemany(
+        "INSERT OR IGNORE INTO context_table (context_hash, context) VALUES (?, ?)",
+        ((_context_hash(context), _encode_context(context)) for context in contexts),
+    )
+
+
+def _with_context(conn: sqlite3.Connection, row: tuple) -> tuple:
+    # Replace context hash (feedback table row) with context
+    if row is None or row[6] is None:
+        return row
+
+    context = conn.execute(
+        "SELECT context FROM context_table WHERE context_hash=?", (row[6],)
+    ).fetchone()
+    return (*row[:6], None if context is None else context[0], *row[7:])
+
+
+def _to_table_values(feedback: dict) -> dict:
+    # Feedback fields to feedback table values, referencing context by hash
+    return {
+        column: (
+            _context_hash(feedback[field])
+            if field == FEEDBACK.CONTEXT.value
+            else feedback[field]
+        )
+        for field, column in zip(_FEEDBACK_COLUMNS, _FEEDBACK_TABLE_COLUMNS)
+        if field in feedback
+    }
+
+
+def _to_feedback(row: tuple) -> dict:
+    return {
+        FEEDBACK.FEEDBACK_ID.value: row[0],
+        FEEDBACK.USER_ID.value: row[1],
+        FEEDBACK.QUESTION.value: row[2],
+        FEEDBACK.ANSWER.value: row[3],
+        FEEDBACK.THUMBS_UP.value: _to_bool(row[4]),
+        FEEDBACK.THUMBS_DOWN.value: _to_bool(row[5]),
+        FEEDBACK.CONTEXT.value: _decode_context(row[6]),
+        FEEDBACK.START_CHAR_OFFSET.value: row[7],
+        FEEDBACK.END_CHAR_OFFSET.value: row[8],
+        FEEDBACK.APPLICATION.value: row[9] if len(row) > 9 else None,
+    }
+
+
+# Arities of "IN (?, ...)" lists, values are padded (by repeating the last one) to the next arity so that
+# filters with similar numbers of values share a prepared statement
+_IN_ARITIES = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+def _in_arity(num_values: int) -> int:
+    for arity in _IN_ARITIES:
+        if num_values <= arity:
+            return arity
+
+    # Beyond largest arity, round up to a multiple of it
+    return -(-num_values // _IN_ARITIES[-1]) * _IN_ARITIES[-1]
+
+
+def _column(field_name) -> str:
+    # Column names can not be parameterized, hence only feedback table columns are accepted
+    column = getattr(field_name, "value", field_name)
+    if column not in _FEEDBACK_COLUMNS:
+        raise ValueError(f"Unknown feedback field: {column}")
+    return column
+
+
+def build_select_clause(
+    select_clauses: List[str] = None, with_rowid: bool = False
+) -> str:
+    """
+    Build SELECT statement over feedback table, joined with context table for contexts
+
+    Parameters
+    ----------
+    select_clauses: list
+        columns to select, all columns if omitted
+    with_rowid: bool
+        whether to select feedback's row id (position, see "Store.get_feedbacks_page") first
+
+    Returns
+    -------
+    str: SELECT statement
+    """
+    columns = [
+        "context_table.context" if column == FEEDBACK.CONTEXT.value else column
+        for column in (
+            [_column(field_name) for field_name in select_clauses]
+            if select_clauses
+            else _FEEDBACK_COLUMNS
+        )
+    ]
+    if with_rowid:
+        columns.insert(0, "feedback_table.feedback_row_id")
+
+    return f"SELECT {', '.join(columns)} FROM {_FEEDBACK_FROM_CLAUSE}"
+
+
+def build_where_clause(
+    where_clauses: dict = None, conditions: List[str] = None, params: list = None
+) -> Tuple[str, list]:
+    """
+    Build parameterized WHERE clause with a stable shape, so that its prepared statement is reused
+
+    - Conditions are ordered by column, regardless of filters' order
+    - "IN (?, ...)" lists are padded to a few arities (see "_IN_ARITIES")
+
+    Parameters
+    ----------
+    where_clauses: dict
+        filters, each either a list of values (any of them matches) or a single value
+    conditions: list
+        additional conditions (e.g. "feedback_table.feedback_row_id>?"), placed first
+    params: list
+        parameters of additional conditions
+
+    Returns
+    -------
+    tuple: WHERE clause (empty if no conditions) and its parameters
+    """
+    conditions = list(conditions or [])
+    params = list(params or [])
+
+    filters = {
+        _column(field_name): field_value
+        for field_name, field_value in (where_clauses or {}).items()
+    }
+    for column in sorted(filters, key=_FEEDBACK_COLUMNS.index):
+        field_value = filters[column]
+
+        # NOTE: Contexts are matched by hash
+        if column == FEEDBACK.CONTEXT.value:
+            column = f"feedback_table.{_CONTEXT_HASH_COLUMN}"
+            field_value = (
+                [_context_hash(value) for value in field_value]
+                if isinstance(field_value, (list, tuple, set))
+                else _context_hash(field_value)
+            )
+
+        if isinstance(field_value, (list, tuple, set)):
+            values = list(field_value) or [None]
+            values += [values[-1]] * (_in_arity(len(values)) - len(values))
+            conditions.append(f"{column} IN ({', '.join(['?'] * len(values))})")
+            params.extend(values)
+        else:
+            conditions.append(f"{column}=?")
+            params.append(field_value)
+
+    return (f" WHERE {' AND '.join(conditions)}" if conditions else ""), params
+
+
+def _upsert_statement(fields: List[str], fields_to_be_updated: List[str]) -> str:
+    return (
+        f"INSERT INTO feedback_table ({', '.join(fields)}) VALUES ({', '.join(['?'] * len(fields))}) "
+        "ON CONFLICT(feedback_id, user_id) DO UPDATE SET "
+        + ", ".join(f"{field}=excluded.{field}" for field in fields_to_be_updated)
+    )
+
+
+def _upsert_feedback(conn: sqlite3.Connection, feedback: dict) -> tuple:
+    # NOTE: Runs within caller's transaction, caller commits
+    # Step 1: Store context, referenced by hash
+    if feedback.get(FEEDBACK.CONTEXT.value) is not None:
+        _store_contexts(conn, [feedback[FEEDBACK.CONTEXT.value]])
+
+    # Step 2: Collect provided fields, in table order
+    table_values = _to_table_values(feedback)
+    fields = list(table_values.keys())
+    values = list(table_values.values())
+    fields_to_be_updated = [
+        field
+        for field in fields
+        if field != FEEDBACK.FEEDBACK_ID.value and field != FEEDBACK.USER_ID.value
+    ] or [FEEDBACK.USER_ID.value]
+
+    # Step 3: Insert new feedback or update existing one, returning saved feedback
+    if _SUPPORTS_RETURNING:
+        return _with_context(
+            conn,
+            conn.execute(
+                _upsert_statement(fields, fields_to_be_updated)
+                + f" RETURNING {', '.join(_FEEDBACK_TABLE_COLUMNS)}",
+                values,
+            ).fetchone(),
+        )
+
+    cursor = conn.execute(
+        "UPDATE feedback_table SET "
+        + ", ".join(f"{field}=?" for field in fields_to_be_updated)
+        + " WHERE feedback_id=? AND user_id=?",
+        [
+            *[table_values[field] for field in fields_to_be_updated],
+            feedback[FEEDBACK.FEEDBACK_ID.value],
+            feedback[FEEDBACK.USER_ID.value],
+        ],
+    )
+    if cursor.rowcount == 0:
+        conn.execute(
+            f"INSERT INTO feedback_table ({', '.join(fields)}) VALUES ({', '.join(['?'] * len(fields))})",
+            values,
+        )
+    return conn.execute(
+        build_select_clause()
+        + " WHERE feedback_table.feedback_id=? AND feedback_table.user_id=?",
+        (
+            feedback[FEEDBACK.FEEDBACK_ID.value],
+            feedback[FEEDBACK.USER_ID.value],
+        ),
+    ).fetchone()
+
+
+def _update_feedback(
+    conn: sqlite3.Connection, feedback_id: str, user_id: str, fields_to_be_updated: dict
+):
+    # NOTE: Runs within caller's transaction, caller commits
+    if fields_to_be_updated.get(FEEDBACK.CONTEXT.value) is not None:
+        _store_contexts(conn, [fields_to_be_updated[FEEDBACK.CONTEXT.value]])
+
+    table_values = _to_table_values(fields_to_be_updated)
+    conn.execute(
+        "UPDATE feedback_table SET "
+        + "=?,".join(table_values.keys())
+        + "=?"
+        + " WHERE feedback_id=? AND user_id=?",
+        [*list(table_values.values()), feedback_id, user_id],
+    )
+
+
+def _delete_feedback(conn: sqlite3.Connection, feedback_id: str, user_id: str):
+    # NOTE: Runs within caller's transaction, caller commits
+    conn.execute(
+        "DELETE FROM feedback_table WHERE feedback_id=? AND user_id=?",
+        (
+            feedback_id,
+            user_id,
+        ),
+    )
+
+
+#############################################################################################
+#                       Connections
+#############################################################################################
+class ConnectionManager:
+    """
+    Long-lived SQLite connections, one per thread (and per process) as SQLite connections
+    can not be shared across threads.
+
+    - Database runs in WAL mode, so that readers do not block the writer (and vice versa)
+    - "synchronous=NORMAL" syncs to disk at WAL checkpoints only, rather than on every commit
+    - Writers wait up to `busy_timeout` seconds for a concurrent writer, instead of failing with "database is locked"
+    - Up to `cached_statements` prepared statements are kept per connection
+    """
+
+    def __init__(
+        self,
+        db_file: str,
+        busy_timeout: float = _DB_BUSY_TIMEOUT,
+        cached_statements: int = _DB_CACHED_STATEMENTS,
+    ):
+        self.db_file = db_file
+        self.busy_timeout = busy_timeout
+        self.cached_statements = cached_statements
+
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def open(self) -> sqlite3.Connection:
+        """
+        Open a new connection, owned by the caller (e.g. for long running reads spanning threads)
+
+        Returns
+        -------
+        sqlite3.Connection: connection
+        """
+        conn = sqlite3.connect(
+            self.db_file,
+            timeout=self.busy_timeout,
+            cached_statements=self.cached_statements,
+            # NOTE: Connections are used by a single thread at a time, but may be closed by another thread
+            check_same_thread=False,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout * 1000)}")
+        return conn
+
+    def get(self) -> sqlite3.Connection:
+        """
+        Get calling thread's connection, opening it on first use
+
+        Returns
+        -------
+        sqlite3.Connection: connection
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = self.open()
+
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+            with self._lock:
+                # NOTE: Connections inherited from parent process are left alone, they belong to it
+                self._connections = [
+                    (pid, connection)
+                    for pid, connection in self._connections
+                    if pid == os.getpid()
+                ]
+                self._connections.append((os.getpid(), conn))
+        return conn
+
+    def close(self):
+        """
+        Close all connections opened by this process
+        """
+        with self._lock:
+            for pid, conn in self._connections:
+                if pid == os.getpid():
+                    conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+
+#############################################################################################
+#                       Write-behind
+#############################################################################################
+# Queue markers, ending the current batch
+_FLUSH = object()
+_STOP = object()
+
+
+class WriteBehindQueue:
+    """
+    Feedback writes applied in the background by a single writer thread, so that callers do not
+    wait on SQLite's write lock nor on disk.
+
+    - Writes are applied in submission order, grouped into transactions of up to `batch_size` writes
+    - A batch is applied once full, `flush_interval` seconds after its first write, or on "flush"
+    - Up to `max_queue_size` writes are queued, beyond that callers wait for the writer
+    - If a batch fails, its writes are applied one by one, so that a failing write does not drop others
+    - Failing writes are dropped and logged as warnings, should writer thread stop nonetheless, it is
+      restarted on next submission
+    """
+
+    def __init__(
+        self,
+        connections: ConnectionManager,
+        flush_interval: float = _WRITE_BEHIND_FLUSH_INTERVAL,
+        batch_size: int = _WRITE_BEHIND_BATCH_SIZE,
+        max_queue_size: int = _WRITE_BEHIND_MAX_QUEUE_SIZE,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.connections = connections
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_queue_size = max_queue_size
+
+        self._put_lock = threading.Lock()
+        self._applied = threading.Condition()
+        self._writer = None
+        self._writer_pid = None
+        self._closed = False
+
+    def _ensure_writer(self):
+        # NOTE: Called under put lock. Writer thread is started lazily to make sure it runs in the
+        # serving process, writes queued by parent process before fork stay with it.
+        if self._writer_pid == os.getpid():
+            if self._writer.is_alive():
+                return
+
+            # NOTE: Queued writes are kept, so that restarted writer applies them
+            self.logger.warning(
+                "Feedback writer thread stopped unexpectedly, restarting it"
+            )
+        else:
+            self._queue = queue.Queue(maxsize=self.max_queue_size)
+            self._num_submitted = 0
+            self._num_applied = 0
+
+        self._writer = threading.Thread(
+            target=self._write_loop, name="feedback-writer", daemon=True
+        )
+        self._writer.start()
+        self._writer_pid = os.getpid()
+
+    def submit(self, write: Callable[[sqlite3.Connection], None]) -> bool:
+        """
+        Queue write, to be applied in the background
+
+        Parameters
+        ----------
+        write: Callable
+            function running the write's statements on given connection, without committing
+
+        Returns
+        -------
+        bool: whether write was queued, False once queue is closed
+        """
+        with self._put_lock:
+            if self._closed:
+                return False
+
+            self._ensure_writer()
+            self._queue.put(write)
+            self._num_submitted += 1
+        return True
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Wait until all writes submitted so far are applied
+
+        Parameters
+        ----------
+        timeout: float
+            maximum number of seconds to wait, no limit if omitted
+
+        Returns
+        -------
+        bool: whether all writes submitted so far are applied
+        """
+        with self._put_lock:
+            if self._writer_pid != os.getpid():
+                return True
+
+            num_submitted = self._num_submitted
+            if self._num_applied < num_submitted:
+                if not self._closed:
+                    self._ensure_writer()
+                if self._writer.is_alive():
+                    self._queue.put(_FLUSH)
+
+        with self._applied:
+            self._applied.wait_for(
+                lambda: self._num_applied >= num_submitted
+                or not self._writer.is_alive(),
+                timeout=timeout,
+            )
+            return self._num_applied >= num_submitted
+
+    def close(self, timeout: float = None):
+        """
+        Apply queued writes and stop writer thread. Writes submitted afterwards are rejected.
+
+        Parameters
+        ----------
+        timeout: float
+            maximum number of seconds to wait for queued writes, no limit if omitted
+        """
+        with self._put_lock:
+            self._closed = True
+            if self._writer_pid != os.getpid():
+                return
+
+            self._queue.put(_STOP)
+        self._writer.join(timeout)
+
+    def _write_loop(self):
+        conn = self.connections.open()
+        try:
+            while True:
+                # Step 1: Wait for a write
+                writes = []
+                item = self._queue.get()
+
+                # Step 2: Collect batch, until full, due or ended by a marker
+                deadline = time.monotonic() + self.flush_interval
+                while item is not _FLUSH and item is not _STOP:
+                    writes.append(item)
+                    if len(writes) >= self.batch_size:
+                        break
+
+                    try:
+                        item = self._queue.get(
+                            timeout=max(deadline - time.monotonic(), 0)
+                        )
+                    except queue.Empty:
+                        break
+
+                # Step 3: Apply batch
+                # NOTE: Writes are accounted for even if writer stops, so that flush does not wait for them
+                if writes:
+                    try:
+                        self._apply(conn, writes)
+                    finally:
+                        with self._applied:
+                            self._num_applied += len(writes)
+                            self._applied.notify_all()
+
+                if item is _STOP:
+                    return
+        finally:
+            conn.close()
+
+            # Wake up callers waiting on flush, should writer stop unexpectedly
+            with self._applied:
+                self._applied.notify_all()
+
+    def _apply(
+        self,
+        conn: sqlite3.Connection,
+        writes: List[Callable[[sqlite3.Connection], None]],
+    ):
+        # NOTE: Any error is caught (e.g. "OverflowError" binding too large integers), so that a
+        # failing write neither stops writer thread nor leaves its transaction open
+        # Step 1: Apply batch in a single transaction
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for write in writes:
+                write(conn)
+            conn.commit()
+            return
+        except Exception as error:
+            conn.rollback()
+            self.logger.warning(
+                ErrorMessages.FAILED_TO_EXECUTE_COMMAND.value.format(error).strip()
+            )
+
+        # Step 2: Otherwise, apply batch's writes one by one
+        if len(writes) == 1:
+            return
+
+        for write in writes:
+            try:
+                write(conn)
+                conn.commit()
+            except Exception as error:
+                conn.rollback()
+                self.logger.warning(
+                    ErrorMessages.FAILED_TO_EXECUTE_COMMAND.value.format(error).strip()
+                )
 
 
 #############################################################################################
@@ -50,6 +813,9 @@ class StoreFactory:
 class Store:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
+        self._settings_cache = LoadingCache(
+            name="settings", ttl=_SETTINGS_CACHE_TTL, max_size=1
+        )
 
         self.root_dir = os.getenv(
             "STORE_DIR", os.path.join(Path(__file__).parent.parent, "store")
@@ -62,15 +828,83 @@ class Store:
             # Copy over default primeqa application JSON
             shutil.copy(_PRIMEQA_APPLICATION_FILE, self.root_dir)
 
-        # if no db file, create and add feedback table
-        if not os.path.exists(os.path.join(self.root_dir, "sqlite_db.db")):
-            conn = sqlite3.connect(self.root_dir + "/sqlite_db.db")
-            cur = conn.cursor()
-            cur.execute(
-                "CREATE TABLE IF NOT EXISTS feedback_table (feedback_id VARCHAR, user_id VARCHAR, question VARCHAR, answer VARCHAR, thumbs_up BOOLEAN, thumbs_down BOOLEAN, context VARCHAR, start_char_offset INTEGER, end_char_offset INTEGER, application VARCAR)"
+        # Create feedback table or upgrade it to the latest schema, if necessary
+        self._connections = ConnectionManager(
+            os.path.join(self.root_dir, "sqlite_db.db")
+        )
+        migrate(self._connections.get())
+
+        # Feedback writes are applied synchronously, unless write-behind is enabled
+        self._write_behind = None
+
+    def enable_write_behind(
+        self,
+        flush_interval: float = _WRITE_BEHIND_FLUSH_INTERVAL,
+        batch_size: int = _WRITE_BEHIND_BATCH_SIZE,
+        max_queue_size: int = _WRITE_BEHIND_MAX_QUEUE_SIZE,
+    ):
+        """
+        Apply feedback writes ("save_feedback", "update_feedback" and "delete_feedback") in the background,
+        in batched transactions (see "WriteBehindQueue")
+
+        Reads and bulk writes first wait for queued writes, hence they see earlier writes made through
+        this store. Queued writes are applied on "close".
+
+        Parameters
+        ----------
+        flush_interval: float
+            maximum number of seconds a write is held back to be batched with later writes
+        batch_size: int
+            maximum number of writes per transaction
+        max_queue_size: int
+            maximum number of queued writes
+        """
+        self._write_behind = WriteBehindQueue(
+            self._connections,
+            flush_interval=flush_interval,
+            batch_size=batch_size,
+            max_queue_size=max_queue_size,
+        )
+
+    def flush(self):
+        """
+        Wait until queued feedback writes, if any, are applied
+        """
+        if self._write_behind is not None:
+            self._write_behind.flush()
+
+    def close(self):
+        """
+        Apply queued feedback writes, then close feedback database connections opened by this process
+        """
+        if self._write_behind is not None:
+            self._write_behind.close()
+        self.delete_unreferenced_contexts()
+        self._connections.close()
+
+    def delete_unreferenced_contexts(self) -> int:
+        """
+        Delete contexts no longer referenced by any feedback (e.g. after feedback updates and deletes)
+
+        Returns
+        -------
+        int: number of deleted contexts
+        """
+        conn = self._connections.get()
+        try:
+            cursor = conn.execute(
+                "DELETE FROM context_table WHERE context_hash NOT IN (SELECT context_hash FROM feedback_table WHERE context_hash IS NOT NULL)"
             )
             conn.commit()
-            conn.close()
+            return cursor.rowcount
+        except sqlite3.Error as error:
+            conn.rollback()
+            self.logger.warning(
+                ErrorMessages.FAILED_TO_EXECUTE_COMMAND.value.format(
+                    error.args[0]
+                ).strip()
+            )
+            return 0
 
     #############################################################################################
     #                       Settings
@@ -84,6 +918,9 @@ class Store:
         list: dict
             applications associated with the playground
         """
+        return self._settings_cache.get(ATTR_SETTINGS, self._load_settings)
+
+    def _load_settings(self) -> dict:
         application = load_json(os.path.join(self.root_dir, "primeqa.json"))
         return application[ATTR_SETTINGS]
 
@@ -96,6 +933,7 @@ class Store:
 
         # Save updated settings
         save_json(application, os.path.join(self.root_dir, "primeqa.json"))
+        self._settings_cache.invalidate()
 
         return application[ATTR_SETTINGS]
 
@@ -114,112 +952,241 @@ class Store:
         list: dict (FeedbackRequest)
 
         """
-        # Step 1: Build where clause
-        sql_command = (
-            f"SELECT {', '.join(select_clauses)} FROM feedback_table"
-            if select_clauses
-            else "SELECT * FROM feedback_table"
-        )
-        if where_clauses:
-            where_clauses_in_str = " WHERE "
-            for field_name, field_value in where_clauses.items():
-                if isinstance(field_value, list):
-                    field_values_in_str = '"' + '","'.join(field_value) + '"'
-                    where_clauses_in_str += (
-                        f"{field_name} IN ({field_values_in_str}) AND "
-                    )
-                elif isinstance(field_value, str):
-                    field_value_in_str = '"' + field_value + '"'
-                    where_clauses_in_str += f"{field_name}={field_value_in_str} AND "
-                else:
-                    where_clauses_in_str += f"{field_name}={field_value} AND "
+        self.flush()
+        try:
+            # Step 1: Build parameterized query
+            where_clause, params = build_where_clause(where_clauses)
+            sql_command = build_select_clause(select_clauses) + where_clause
 
-            # Strip away last "AND" condition
-            where_clauses_in_str = where_clauses_in_str.rstrip(" AND ")
+            rows = self._connections.get().execute(sql_command, params).fetchall()
 
-            sql_command += where_clauses_in_str
+            # Step 2: Iterate over results
+            return [_to_feedback(row) for row in rows]
 
-        try:
-            conn = sqlite3.connect(self.root_dir + "/sqlite_db.db")
-            cur = conn.cursor()
-            cur.execute(sql_command)
-            rows = cur.fetchall()
+        except (sqlite3.Error, ValueError) as error:
+            self.logger.warning(
+                ErrorMessages.FAILED_TO_EXECUTE_COMMAND.value.format(
+                    error.args[0]
+                ).strip()
+            )
+            return []
 
-            # Step 2.d: Iterate over results
-            return [
-                {
-                    FEEDBACK.FEEDBACK_ID.value: row[0],
-                    FEEDBACK.USER_ID.value: row[1],
-                    FEEDBACK.QUESTION.value: row[2],
-                    FEEDBACK.ANSWER.value: row[3],
-                    FEEDBACK.THUMBS_UP.value: row[4],
-                    FEEDBACK.THUMBS_DOWN.value: row[5],
-                    FEEDBACK.CONTEXT.value: row[6],
-                    FEEDBACK.START_CHAR_OFFSET.value: row[7],
-                    FEEDBACK.END_CHAR_OFFSET.value: row[8],
-                    FEEDBACK.APPLICATION.value: row[9] if len(row) > 9 else None,
-                }
-                for row in rows
-            ]
+    def get_feedbacks_page(
+        self, where_clauses: dict = None, limit: int = 100, after: int = None
+    ) -> Tuple[list, Union[int, None]]:
+        """
+        Retrieves a page of feedback table data, in insertion order
+
+        Pages are identified by the position of the last feedback of previous page (keyset
+        pagination), hence each page is read straight from the table's primary key, however deep.
+        Positions are explicit row ids ("feedback_row_id"), hence they remain valid across VACUUM.
 
+        Parameters
+        ----------
+        where_clauses: dict
+            filters
+        limit: int
+            page size
+        after: int
+            position of the last feedback of previous page, as returned along with it
+
+        Returns
+        -------
+        tuple: feedbacks (Feedback) and position of the last one, if more may follow (None otherwise)
+        """
+        self.flush()
+        where_clause, params = build_where_clause(
+            where_clauses,
+            conditions=[] if after is None else ["feedback_table.feedback_row_id>?"],
+            params=[] if after is None else [after],
+        )
+        try:
+            rows = (
+                self._connections.get()
+                .execute(
+                    build_select_clause(with_rowid=True)
+                    + where_clause
+                    + " ORDER BY feedback_table.feedback_row_id LIMIT ?",
+                    [*params, limit],
+                )
+                .fetchall()
+            )
         except sqlite3.Error as error:
             self.logger.warning(
                 ErrorMessages.FAILED_TO_EXECUTE_COMMAND.value.format(
                     error.args[0]
                 ).strip()
             )
-            return []
+            return [], None
+
+        return [_to_feedback(row[1:]) for row in rows], (
+            rows[-1][0] if len(rows) == limit else None
+        )
+
+    def iter_feedbacks(
+        self, where_clauses: dict = None, chunk_size: int = 500
+    ) -> Iterator[List[dict]]:
+        """
+        Iterate over feedback table data in chunks, straight from the database cursor
+
+        Feedbacks are read on a dedicated connection, from a consistent snapshot of the table, hence
+        iteration can span threads and long-running writes do not affect it. The connection is
+        closed once iteration completes or the iterator is closed.
+
+        Parameters
+        ----------
+        where_clauses: dict
+            filters
+        chunk_size: int
+            number of feedbacks per chunk
+
+        Returns
+        -------
+        Iterator: chunks of feedbacks (Feedback)
+        """
+        self.flush()
+        where_clause, params = build_where_clause(where_clauses)
+        conn = self._connections.open()
+        try:
+            # NOTE: Explicit transaction keeps the same snapshot across chunks
+            conn.execute("BEGIN")
+            cursor = conn.execute(
+                build_select_clause()
+                + where_clause
+                + " ORDER BY feedback_table.feedback_row_id",
+                params,
+            )
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield [_to_feedback(row) for row in rows]
         finally:
-            if conn:
-                conn.close()
+            conn.close()
 
-    def save_feedback(self, feedback: dict) -> dict:
+    def save_feedback(self, feedback: dict) -> Union[dict, None]:
         """
         Save feedback data
 
+        If feedback for the same item already exists and it was saved by same user, it is updated
+        with provided fields, else feedback is saved as new item. Either way, it happens in a single
+        transaction.
+
+        With write-behind enabled, feedback is queued and returned as provided (missing fields set
+        to None), as it is saved later. Hence returned feedback is neither merged with an existing
+        one, nor guaranteed to be saved (failing writes are dropped and logged as warnings).
+
         Parameters
         ----------
         feedback: dict (Feedback)
 
         Returns
         -------
-        saved feedback: dict (Feedback)
+        saved feedback: dict (Feedback), None if feedback could not be saved
 
         """
+        if self._write_behind is not None and self._write_behind.submit(
+            functools.partial(_upsert_feedback, feedback=dict(feedback))
+        ):
+            return _to_feedback([feedback.get(field) for field in _FEEDBACK_COLUMNS])
+
+        conn = self._connections.get()
         try:
-            conn = sqlite3.connect(self.root_dir + "/sqlite_db.db")
-            cur = conn.cursor()
-            # check existing feedback associated to user request
-            cur.execute(
-                "SELECT * FROM feedback_table WHERE feedback_id=? AND user_id=?",
-                (
-                    feedback[FEEDBACK.FEEDBACK_ID.value],
-                    feedback[FEEDBACK.USER_ID.value],
-                ),
+            # NOTE: Without "RETURNING", write lock is taken upfront so that saved feedback is read back in the same transaction
+            if not _SUPPORTS_RETURNING:
+                conn.execute("BEGIN IMMEDIATE")
+            row = _upsert_feedback(conn, feedback)
+            conn.commit()
+            return _to_feedback(row)
+        except sqlite3.Error as error:
+            conn.rollback()
+            self.logger.warning(
+                ErrorMessages.FAILED_TO_EXECUTE_COMMAND.value.format(
+                    error.args[0]
+                ).strip()
             )
-            rows = cur.fetchall()
-            # if feedback for the same item & category already exists and it was saved by same user,
-            # update with new data (only thumbs props is updated)
-            # else, save as new item
-            if len(rows) > 0:
-                self.update_feedback(
-                    feedback[FEEDBACK.FEEDBACK_ID.value],
-                    feedback[FEEDBACK.USER_ID.value],
-                    feedback,
+            return None
+
+    def save_feedbacks(
+        self, feedbacks: List[dict], chunk_size: int = _BULK_CHUNK_SIZE
+    ) -> List[Union[str, None]]:
+        """
+        Save feedbacks in bulk, with the same semantics as "save_feedback" for each of them
+
+        Feedbacks are saved in chunks of `chunk_size` feedbacks, each in a single transaction. If a
+        chunk fails, its feedbacks are saved one by one to identify failing ones.
+
+        Parameters
+        ----------
+        feedbacks: list
+            feedbacks (Feedback), each with all feedback fields
+        chunk_size: int
+            number of feedbacks saved per transaction
+
+        Returns
+        -------
+        list: error message for each feedback, None if feedback was saved
+        """
+        # NOTE: Queued writes go first, so that they do not override bulk saved feedbacks
+        self.flush()
+
+        if not _SUPPORTS_UPSERT:
+            return [
+                None if self.save_feedback(feedback) is not None else "Failed to save"
+                for feedback in feedbacks
+            ]
+
+        # NOTE: All fields but feedback_id and user_id (first two columns) are updated for existing feedbacks
+        statement = _upsert_statement(
+            _FEEDBACK_TABLE_COLUMNS, _FEEDBACK_TABLE_COLUMNS[2:]
+        )
+        conn = self._connections.get()
+        errors = []
+        for start in range(0, len(feedbacks), chunk_size):
+            contexts = [
+                feedback.get(FEEDBACK.CONTEXT.value)
+                for feedback in feedbacks[start : start + chunk_size]
+            ]
+            rows = [
+                [
+                    _context_hash(feedback.get(field))
+                    if field == FEEDBACK.CONTEXT.value
+                    else feedback.get(field)
+                    for field in _FEEDBACK_COLUMNS
+                ]
+                for feedback in feedbacks[start : start + chunk_size]
+            ]
+
+            # Step 1: Save chunk in a single transaction, along with its distinct contexts
+            try:
+                _store_contexts(
+                    conn, {context for context in contexts if context is not None}
                 )
-            else:
-                cur.execute(
-                    "INSERT INTO feedback_table VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                    list(feedback.values()),
+                conn.executemany(statement, rows)
+                conn.commit()
+                errors.extend([None] * len(rows))
+                continue
+            except sqlite3.Error as error:
+                conn.rollback()
+                self.logger.warning(
+                    ErrorMessages.FAILED_TO_EXECUTE_COMMAND.value.format(
+                        error.args[0]
+                    ).strip()
                 )
-            conn.commit()
-            cur.close()
-        except sqlite3.Error as error:
-            print("Failed to save column of sqlite table", error)
-        finally:
-            if conn:
-                conn.close()
-                print("sqlite connection is closed")
+
+            # Step 2: Otherwise, save chunk's feedbacks one by one
+            for context, row in zip(contexts, rows):
+                try:
+                    if context is not None:
+                        _store_contexts(conn, [context])
+                    conn.execute(statement, row)
+                    conn.commit()
+                    errors.append(None)
+                except sqlite3.Error as error:
+                    conn.rollback()
+                    errors.append(error.args[0])
+
+        return errors
 
     def update_feedback(self, feedback_id: str, user_id: str, update: dict) -> dict:
         """
@@ -237,33 +1204,47 @@ class Store:
 
         """
         try:
-            conn = sqlite3.connect(self.root_dir + "/sqlite_db.db")
-            cur = conn.cursor()
-            # Step 2: Collect all field names with updates
+            # Step 1: Collect all field names with updates
             fields_to_be_updated = {
-                field: value
+                _column(field): value
                 for field, value in update.items()
                 if field != FEEDBACK.FEEDBACK_ID.value
                 and field != FEEDBACK.USER_ID.value
             }
-            # Step 3: If fields with updates exists,
-            if fields_to_be_updated:
-                cur.execute(
-                    "UPDATE feedback_table SET "
-                    + "=?,".join(fields_to_be_updated.keys())
-                    + "=?"
-                    + "WHERE feedback_id=? AND user_id=?",
-                    [*list(fields_to_be_updated.values()), feedback_id, user_id],
-                )
-                conn.commit()
-                cur.close()
+        except ValueError as error:
+            self.logger.warning(
+                ErrorMessages.FAILED_TO_EXECUTE_COMMAND.value.format(
+                    error.args[0]
+                ).strip()
+            )
+            return None
+
+        # Step 2: If fields with updates exists, update them
+        if not fields_to_be_updated:
+            return {"OK": True}
+
+        if self._write_behind is not None and self._write_behind.submit(
+            functools.partial(
+                _update_feedback,
+                feedback_id=feedback_id,
+                user_id=user_id,
+                fields_to_be_updated=fields_to_be_updated,
+            )
+        ):
+            return {"OK": True}
+
+        conn = self._connections.get()
+        try:
+            _update_feedback(conn, feedback_id, user_id, fields_to_be_updated)
+            conn.commit()
             return {"OK": True}
         except sqlite3.Error as error:
-            print("Failed to update multiple columns of sqlite table", error)
-        finally:
-            if conn:
-                conn.close()
-                print("sqlite connection is closed")
+            conn.rollback()
+            self.logger.warning(
+                ErrorMessages.FAILED_TO_EXECUTE_COMMAND.value.format(
+                    error.args[0]
+                ).strip()
+            )
 
     def delete_feedback(self, feedback_id: str, user_id: str) -> dict:
         """
@@ -278,21 +1259,22 @@ class Store:
         -------
 
         """
-        try:
-            conn = sqlite3.connect(self.root_dir + "/sqlite_db.db")
-            cur = conn.cursor()
-            cur.execute(
-                "DELETE FROM feedback_table WHERE feedback_id=? AND user_id=?",
-                (
-                    feedback_id,
-                    user_id,
-                ),
+        if self._write_behind is not None and self._write_behind.submit(
+            functools.partial(
+                _delete_feedback, feedback_id=feedback_id, user_id=user_id
             )
+        ):
+            return {"OK": True}
+
+        conn = self._connections.get()
+        try:
+            _delete_feedback(conn, feedback_id, user_id)
             conn.commit()
             return {"OK": True}
         except sqlite3.Error as error:
-            print("Failed to delete column of sqlite table", error)
-        finally:
-            if conn:
-                conn.close()
-                print("sqlite connection is closed")
+            conn.rollback()
+            self.logger.warning(
+                ErrorMessages.FAILED_TO_EXECUTE_COMMAND.value.format(
+                    error.args[0]
+                ).strip()
+            )
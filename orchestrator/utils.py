@@ -15,7 +15,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import List, Union
+from typing import List, Tuple, Union
 import json
 import os
 import collections.abc as abc
@@ -118,3 +118,62 @@ def normalize(hits: List[dict], field: str):
                 min_max_normalization([hit[field] for hit in hits])
             ):
                 hits[idx][ATTR_CONFIDENCE] = confidence
+
+
+def get_snippet_bounds(
+    text_length: int,
+    offsets: List[Tuple[int, int]],
+    window: Union[int, None] = None,
+    max_length: Union[int, None] = None,
+) -> Tuple[int, int]:
+    """
+    Compute snippet bounds covering all offsets, extended by window characters on either side.
+    If no offsets are provided, snippet covers leading 2 * window characters.
+    If no window is provided, snippet covers entire text.
+
+    Snippets longer than max length are shortened to max length, centred on the offsets
+    (or anchored at the start of the snippet, if no offsets are provided).
+
+    Parameters
+    ----------
+    text_length: int
+        length of text to take snippet from
+    offsets: list
+        (start, end) character offsets snippet must cover
+    window: int
+        number of characters to keep before first and after last offset
+    max_length: int
+        maximum length of snippet
+
+    Returns
+    -------
+    tuple: (start, end) character offsets of snippet
+    """
+    # Step 1: Extend offsets by window
+    if window is None:
+        start, end = 0, text_length
+    elif not offsets:
+        start, end = 0, min(text_length, 2 * max(window, 0))
+    else:
+        start = max(
+            0, min(offset_start for offset_start, _ in offsets) - max(window, 0)
+        )
+        end = min(
+            text_length, max(offset_end for _, offset_end in offsets) + max(window, 0)
+        )
+
+    # Step 2: Shorten to max length, if necessary
+    if max_length is not None and end - start > max_length:
+        max_length = max(max_length, 0)
+        if offsets:
+            centre = (
+                min(offset_start for offset_start, _ in offsets)
+                + max(offset_end for _, offset_end in offsets)
+            ) // 2
+        else:
+            centre = start + max_length // 2
+
+        start = max(start, min(centre - max_length // 2, end - max_length))
+        end = start + max_length
+
+    return start, end
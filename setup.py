@@ -65,7 +65,7 @@ setup(
     ],
     keywords="Question Answering (QA), Machine Reading Comprehension (MRC), Information Retrieval (IR), microservices",
     python_requires=">=3.9.0, <3.10.0",
-    packages=find_packages(exclude=["tests"]),
+    packages=find_packages(exclude=["tests", "tests.*", "benchmarks"]),
     install_requires=requirements,
     include_package_data=True,
     tests_require=requirements_test,
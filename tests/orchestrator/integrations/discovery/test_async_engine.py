@@ -0,0 +1,295 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2022 PrimeQA Team
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import asyncio
+import json
+import re
+import threading
+
+import pytest
+from ibm_cloud_sdk_core.authenticators import BearerTokenAuthenticator
+
+from orchestrator.integrations.discovery import async_engine
+from orchestrator.integrations.discovery.async_engine import AsyncDiscoveryClient
+
+
+class DiscoveryStandIn(BaseHTTPRequestHandler):
+    """
+    Stand-in for Watson Discovery (v2) REST API, answering queries and collection listings
+    in Watson Discovery's response format
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    PATTERN_QUERY = re.compile(r".*/v2/projects/([^/]+)/query")
+    PATTERN_COLLECTIONS = re.compile(r".*/v2/projects/([^/]+)/collections")
+
+    def _respond(self, status: int, body: dict):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _record(self, body: dict = None):
+        url = urlparse(self.path)
+        self.server.requests.append(
+            {
+                "method": self.command,
+                "path": url.path,
+                "params": parse_qs(url.query),
+                "authorization": self.headers.get("Authorization"),
+                "body": body,
+                "client": self.client_address,
+            }
+        )
+        return url.path
+
+    def do_GET(self):
+        path = self._record()
+        if self.PATTERN_COLLECTIONS.fullmatch(path):
+            self._respond(
+                200,
+                {
+                    "collections": [
+                        {"collection_id": "collection 1", "name": "Manuals"},
+                        {"collection_id": "collection 2", "name": "Notes"},
+                    ]
+                },
+            )
+        else:
+            self._respond(404, {"code": 404, "error": "Not found"})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        path = self._record(body)
+        if not self.PATTERN_QUERY.fullmatch(path):
+            self._respond(404, {"code": 404, "error": "Not found"})
+            return
+
+        if body["collection_ids"] == ["missing collection"]:
+            self._respond(400, {"code": 400, "error": "Collection not found"})
+            return
+
+        results = []
+        for idx in range(body["count"]):
+            result = {
+                "document_id": f"document {idx}",
+                "title": f"Title {idx}",
+                "text": [f"Text of document {idx}"],
+                "result_metadata": {"confidence": 1.0 - idx / 10},
+            }
+            if body.get("passages", {}).get("enabled"):
+                result["document_passages"] = [
+                    {
+                        "passage_text": f"Passage of document {idx}",
+                        "start_offset": 8,
+                        "end_offset": 28,
+                        "field": "text",
+                    }
+                ]
+            results.append(result)
+        self._respond(200, {"matching_results": len(results), "results": results})
+
+    def log_message(self, *args):
+        pass
+
+
+class TestAsyncDiscoveryIntegration:
+    @pytest.fixture()
+    def server(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), DiscoveryStandIn)
+        server.requests = []
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield server
+        server.shutdown()
+        server.server_close()
+
+    @pytest.fixture()
+    def endpoint(self, server) -> str:
+        return f"http://127.0.0.1:{server.server_address[1]}/instances/test"
+
+    @pytest.fixture()
+    def connected(self, mocker, endpoint):
+        # NOTE: Client is created within each test's event loop, since connections are bound to it
+        def connect():
+            mocker.patch.object(
+                async_engine,
+                "WDS",
+                AsyncDiscoveryClient(
+                    endpoint, BearerTokenAuthenticator("test token"), pool_size=4
+                ),
+            )
+
+        return connect
+
+    def test_query(self, server, endpoint):
+        async def run():
+            client = AsyncDiscoveryClient(
+                endpoint, BearerTokenAuthenticator("test token")
+            )
+            try:
+                return await client.query(
+                    project_id="test-project",
+                    collection_ids=["collection 1"],
+                    natural_language_query="test question",
+                    count=2,
+                    return_=["document_id", "title"],
+                )
+            finally:
+                await client.close()
+
+        result = asyncio.run(run())
+        assert [hit["document_id"] for hit in result["results"]] == [
+            "document 0",
+            "document 1",
+        ]
+
+        request = server.requests[0]
+        assert request["method"] == "POST"
+        assert request["path"] == "/instances/test/v2/projects/test-project/query"
+        assert request["params"] == {"version": ["2020-08-30"]}
+        assert request["authorization"] == "Bearer test token"
+        assert request["body"] == {
+            "collection_ids": ["collection 1"],
+            "natural_language_query": "test question",
+            "count": 2,
+            "return": ["document_id", "title"],
+        }
+
+    def test_retrieve(self, server, connected):
+        async def run():
+            connected()
+            return await async_engine.retrieve(
+                project_id="test-project",
+                question="test question",
+                collection_id=["collection 1", "collection 2"],
+                limit=3,
+                passage_count=5,
+                passage_characters=200,
+            )
+
+        hits = asyncio.run(run())
+        assert len(hits) == 3
+        assert hits[0]["document_passages"][0]["passage_text"] == (
+            "Passage of document 0"
+        )
+        assert server.requests[0]["body"]["collection_ids"] == [
+            "collection 1",
+            "collection 2",
+        ]
+        assert server.requests[0]["body"]["passages"] == {
+            "enabled": True,
+            "per_document": True,
+            "max_per_document": 5,
+            "fields": ["text"],
+            "count": 5,
+            "characters": 200,
+        }
+
+    def test_retrieve_with_failed_query(self, server, connected):
+        async def run():
+            connected()
+            return await async_engine.retrieve(
+                project_id="test-project",
+                question="test question",
+                collection_id="missing collection",
+            )
+
+        assert asyncio.run(run()) == []
+
+    def test_concurrent_retrieve_reuses_connections(self, server, connected):
+        async def run():
+            connected()
+            for _ in range(3):
+                await asyncio.gather(
+                    *(
+                        async_engine.retrieve(
+                            project_id="test-project",
+                            question=f"test question {idx}",
+                            collection_id="collection 1",
+                        )
+                        for idx in range(4)
+                    )
+                )
+
+        asyncio.run(run())
+        assert len(server.requests) == 12
+        assert len({request["client"] for request in server.requests}) <= 4
+
+    def test_get_discovery_collections(self, server, connected):
+        async def run():
+            connected()
+            return await async_engine.get_discovery_collections(
+                project_id="test-project"
+            )
+
+        collections = asyncio.run(run())
+        assert [collection["collection_id"] for collection in collections] == [
+            "collection 1",
+            "collection 2",
+        ]
+        assert server.requests[0]["method"] == "GET"
+        assert (
+            server.requests[0]["path"]
+            == "/instances/test/v2/projects/test-project/collections"
+        )
+
+    def test_close_when_idle_waits_for_in_flight_request(self, server, endpoint):
+        async def run():
+            client = AsyncDiscoveryClient(
+                endpoint, BearerTokenAuthenticator("test token")
+            )
+            request = asyncio.ensure_future(
+                client.list_collections(project_id="test-project")
+            )
+            while not client._in_flight:
+                await asyncio.sleep(0)
+
+            client.close_when_idle()
+            assert not client._http_client.is_closed
+
+            result = await request
+            assert client._http_client.is_closed
+            return result
+
+        result = asyncio.run(run())
+        assert [
+            collection["collection_id"] for collection in result["collections"]
+        ] == [
+            "collection 1",
+            "collection 2",
+        ]
+
+    def test_reset_drops_pooled_clients(self, mocker, endpoint):
+        mocker.patch.object(
+            async_engine, "CLIENT_POOL", async_engine.ClientPool(name="test")
+        )
+        pooled = async_engine.CLIENT_POOL.get(
+            endpoint,
+            "key",
+            lambda: async_engine._build_cp4d_discovery_client(endpoint, "token"),
+        )
+
+        # NOTE: Clients inherited from parent process are bound to its event loop, hence they are not closed
+        async_engine.reset_discovery_service_connection()
+        assert not pooled.client._http_client.is_closed
+        assert not async_engine.CLIENT_POOL._clients
@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2022 PrimeQA Team
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+import threading
+import time
+
+import pytest
+
+from orchestrator.integrations.discovery.clients import (
+    ClientPool,
+    DiscoveryClientManager,
+    PooledClient,
+    TokenPrefetcher,
+    build_http_session,
+    credential_fingerprint,
+)
+
+
+class FakeTokenManager:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.refresh_time = 0
+        self.fetches = 0
+
+    def request_token(self):
+        self.fetches += 1
+        return {"access_token": f"token {self.fetches}"}
+
+    def _save_token_info(self, token_response):
+        self.access_token = token_response["access_token"]
+        self.refresh_time = time.time() + self.ttl
+
+    def get_token(self):
+        if self.refresh_time < time.time():
+            self._save_token_info(self.request_token())
+        return self.access_token
+
+
+class TestDiscoveryClients:
+    @pytest.fixture()
+    def server(self):
+        connections = set()
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_HEAD(self):
+                connections.add(self.client_address)
+                time.sleep(0.05)
+                self.send_response(401)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        server.connections = connections
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield server
+        server.shutdown()
+        server.server_close()
+
+    def test_build_http_session(self):
+        session = build_http_session(pool_size=16, disable_ssl_verification=True)
+        adapter = session.get_adapter("https://example.com")
+        assert adapter._pool_maxsize == 16
+        assert not session.verify
+
+    def test_pooled_session_closes_when_idle(self, server):
+        session = build_http_session(pool_size=4)
+        session.close = MagicMock()
+        request = threading.Thread(
+            target=session.head,
+            args=(f"http://127.0.0.1:{server.server_address[1]}/",),
+        )
+        request.start()
+        deadline = time.time() + 5
+        while not session._in_flight and time.time() < deadline:
+            time.sleep(0.001)
+
+        # Session is closed once in-flight request completes
+        session.close_when_idle()
+        session.close.assert_not_called()
+        request.join()
+        session.close.assert_called_once_with()
+
+    def test_token_prefetcher(self):
+        token_manager = FakeTokenManager(ttl=0.3)
+        prefetcher = TokenPrefetcher(token_manager, margin=0.1, retry_interval=0.05)
+        prefetcher.start()
+        try:
+            time.sleep(0.5)
+        finally:
+            prefetcher.stop()
+
+        # Token is fetched right away, then ahead of every refresh
+        assert token_manager.fetches >= 2
+        assert token_manager.refresh_time > time.time()
+
+    def test_client_pool(self):
+        pool = ClientPool(name="test", max_clients=2)
+        builds = []
+
+        def build(name):
+            builds.append(name)
+            return PooledClient(client=name, authenticator=None)
+
+        # Clients are built once per endpoint and credential
+        assert pool.get("endpoint 1", "key 1", lambda: build("client 1")).client == (
+            "client 1"
+        )
+        assert pool.get("endpoint 1", "key 1", lambda: build("other")).client == (
+            "client 1"
+        )
+        assert pool.get("endpoint 1", "key 2", lambda: build("client 2")).client == (
+            "client 2"
+        )
+        assert builds == ["client 1", "client 2"]
+
+        # Least recently used client is evicted
+        pool.get("endpoint 1", "key 1", lambda: build("other"))
+        pool.get("endpoint 2", "key 1", lambda: build("client 3"))
+        assert len(pool) == 2
+        assert pool.get("endpoint 1", "key 1", lambda: build("other")).client == (
+            "client 1"
+        )
+        assert pool.get("endpoint 1", "key 2", lambda: build("client 4")).client == (
+            "client 4"
+        )
+
+    def test_client_pool_builds_once_under_concurrency(self):
+        pool = ClientPool(name="test")
+        builds = []
+
+        def build():
+            builds.append(threading.current_thread().name)
+            time.sleep(0.05)
+            return PooledClient(client=object(), authenticator=None)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            clients = list(
+                executor.map(
+                    lambda _: pool.get("endpoint", "key", build).client, range(8)
+                )
+            )
+
+        assert len(builds) == 1
+        assert all(client is clients[0] for client in clients)
+
+    def test_client_pool_stops_prefetcher_of_evicted_client(self):
+        pool = ClientPool(name="test", max_clients=1)
+        prefetcher = TokenPrefetcher(FakeTokenManager(ttl=3600))
+        pool.get(
+            "endpoint 1",
+            "key",
+            lambda: PooledClient(
+                client=object(), authenticator=None, prefetcher=prefetcher
+            ),
+        )
+        pool.get(
+            "endpoint 2",
+            "key",
+            lambda: PooledClient(client=object(), authenticator=None),
+        )
+        assert prefetcher._stopped.is_set()
+
+    def test_client_pool_closes_evicted_client(self):
+        pool = ClientPool(name="test", max_clients=1)
+        on_close = MagicMock()
+        pool.get(
+            "endpoint 1",
+            "key",
+            lambda: PooledClient(
+                client=object(), authenticator=None, on_close=on_close
+            ),
+        )
+        on_close.assert_not_called()
+        pool.get(
+            "endpoint 2",
+            "key",
+            lambda: PooledClient(client=object(), authenticator=None),
+        )
+        on_close.assert_called_once_with()
+
+    def test_credential_fingerprint(self):
+        assert credential_fingerprint("key 1") == credential_fingerprint("key 1")
+        assert credential_fingerprint("key 1") != credential_fingerprint("key 2")
+        assert "key 1" not in credential_fingerprint("key 1")
+
+    def test_get(self):
+        client = MagicMock()
+        authenticator = MagicMock(token_manager=FakeTokenManager(ttl=3600))
+        manager = DiscoveryClientManager(pool_size=8)
+        try:
+            assert (
+                manager.get("endpoint", "key", lambda: (client, authenticator))
+                is client
+            )
+            session = client.set_http_client.call_args.args[0]
+            assert session.get_adapter("https://example.com")._pool_maxsize == 8
+
+            deadline = time.time() + 5
+            while not authenticator.token_manager.fetches and time.time() < deadline:
+                time.sleep(0.01)
+            assert authenticator.token_manager.fetches == 1
+        finally:
+            manager._pool.clear()
+
+    def test_get_closes_session_of_evicted_client(self):
+        first_client, second_client = MagicMock(), MagicMock()
+        manager = DiscoveryClientManager(pool_size=8, max_clients=1)
+        manager.get("endpoint 1", "key", lambda: (first_client, object()))
+        session = first_client.set_http_client.call_args.args[0]
+        session.close = MagicMock()
+
+        manager.get("endpoint 2", "key", lambda: (second_client, object()))
+        session.close.assert_called_once_with()
+
+    def test_reset(self):
+        client = MagicMock()
+        authenticator = MagicMock(token_manager=FakeTokenManager(ttl=3600))
+        manager = DiscoveryClientManager(pool_size=8)
+        manager.get("endpoint", "key", lambda: (client, authenticator))
+        pooled = next(iter(manager._pool._clients.values()))
+        session = client.set_http_client.call_args.args[0]
+        session.close = MagicMock()
+
+        # Clients inherited from parent process are dropped, their connections are left untouched
+        manager.reset()
+        assert not len(manager._pool)
+        assert pooled.prefetcher._stopped.is_set()
+        session.close.assert_not_called()
+
+    def test_warm_up(self, server):
+        client = MagicMock()
+        client.service_url = f"http://127.0.0.1:{server.server_address[1]}/"
+        client.authenticator = object()
+        manager = DiscoveryClientManager(pool_size=8, warm_up_connections=4)
+        manager.get("endpoint", "key", lambda: (client, client.authenticator))
+        client.get_http_client.return_value = client.set_http_client.call_args.args[0]
+
+        assert manager.warm_up(client) == 4
+        assert len(server.connections) == 4
+
+    def test_warm_up_without_client(self):
+        assert DiscoveryClientManager().warm_up(None) == 0
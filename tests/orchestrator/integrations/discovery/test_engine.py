@@ -95,6 +95,37 @@ class TestDiscoveryIntegration:
             True
         )
 
+    def test_connect_to_multiple_discovery_service_instances(
+        self,
+        mock_ibm_cloud_sdk_core_authenticators_IAMAuthenticator,
+        mock_ibm_watson_DiscoveryV2,
+    ):
+        mock_ibm_watson_DiscoveryV2.side_effect = lambda **kwargs: MagicMock()
+        client_1 = connect_cloud_discovery_service_instance(
+            endpoint="test endpoint 3", api_key="test api key 1"
+        )
+        client_2 = connect_cloud_discovery_service_instance(
+            endpoint="test endpoint 4", api_key="test api key 2"
+        )
+
+        # Each instance has its own client, built once and reused afterwards
+        assert client_1 is not client_2
+        assert (
+            connect_cloud_discovery_service_instance(
+                endpoint="test endpoint 3", api_key="test api key 1"
+            )
+            is client_1
+        )
+        assert mock_ibm_watson_DiscoveryV2.call_count == 2
+
+        # Changed credentials get a new client
+        assert (
+            connect_cloud_discovery_service_instance(
+                endpoint="test endpoint 3", api_key="test api key 3"
+            )
+            is not client_1
+        )
+
     def test_get_discovery_collections(
         self,
         mock_WDS,
@@ -118,3 +149,40 @@ class TestDiscoveryIntegration:
             natural_language_query="test question",
             count=5,
         )
+
+    def test_retrieve_with_passages(
+        self,
+        mock_WDS,
+    ):
+        retrieve(
+            project_id="test project id",
+            question="test question",
+            collection_id="test collection id",
+            limit=5,
+            return_fields=["document_id", "title"],
+            passage_count=10,
+            passage_characters=400,
+        )
+        kwargs = mock_WDS.query.call_args.kwargs
+        assert kwargs["return_"] == ["document_id", "title"]
+        assert kwargs["passages"].enabled
+        assert kwargs["passages"].per_document
+        assert kwargs["passages"].count == 10
+        assert kwargs["passages"].characters == 400
+
+    def test_retrieve_from_multiple_collections(
+        self,
+        mock_WDS,
+    ):
+        retrieve(
+            project_id="test project id",
+            question="test question",
+            collection_id=["test collection id 1", "test collection id 2"],
+            limit=5,
+        )
+        mock_WDS.query.assert_called_once_with(
+            project_id="test project id",
+            collection_ids=["test collection id 1", "test collection id 2"],
+            natural_language_query="test question",
+            count=5,
+        )
@@ -0,0 +1,250 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2022 PrimeQA Team
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import threading
+import time
+import pytest
+
+from orchestrator.exceptions import OverloadedError
+from orchestrator.integrations.limiter import (
+    AdaptiveLimit,
+    AIMDLimit,
+    ConcurrencyLimiter,
+    GradientLimit,
+    LimitersRegistry,
+    limited,
+)
+from orchestrator.metrics import Metrics
+
+
+class TestLimiter:
+    @pytest.fixture()
+    def release(self):
+        release = threading.Event()
+        yield release
+        release.set()
+
+    def _wait_for(self, condition):
+        deadline = time.time() + 5
+        while not condition() and time.time() < deadline:
+            time.sleep(0.001)
+
+    def test_run(self):
+        Metrics.reset()
+        limiter = ConcurrencyLimiter(name="test", max_concurrency=1)
+        assert limiter.run(lambda value: value + 1, 1) == 2
+        assert limiter.in_flight == 0
+        assert Metrics.value("test_limiter_admitted") == 1
+
+    def test_rejects_on_full_queue(self, release):
+        Metrics.reset()
+        limiter = ConcurrencyLimiter(
+            name="test", max_concurrency=1, max_queue_size=1, retry_after=3
+        )
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            executor.submit(limiter.run, release.wait, 5)
+            self._wait_for(lambda: limiter.in_flight == 1)
+            executor.submit(limiter.run, lambda: None)
+            self._wait_for(lambda: limiter.queue_length == 1)
+
+            with pytest.raises(OverloadedError) as exc_info:
+                limiter.run(lambda: None)
+            assert exc_info.value.status_code == 429
+            assert exc_info.value.retry_after == 3
+            assert Metrics.value("test_limiter_rejected") == 1
+            assert Metrics.value("test_limiter_queue_length") == 1
+            release.set()
+
+        assert Metrics.value("test_limiter_admitted") == 2
+
+    def test_sheds_after_queue_interval(self, release):
+        Metrics.reset()
+        limiter = ConcurrencyLimiter(
+            name="test", max_concurrency=1, queue_target=0.01, queue_interval=0.05
+        )
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            executor.submit(limiter.run, release.wait, 5)
+            self._wait_for(lambda: limiter.in_flight == 1)
+
+            start_t = time.time()
+            with pytest.raises(OverloadedError) as exc_info:
+                limiter.run(lambda: None)
+            assert exc_info.value.status_code == 503
+            assert time.time() - start_t >= 0.05
+            release.set()
+
+        assert Metrics.value("test_limiter_shed") == 1
+        assert limiter.queue_length == 0
+
+    def test_sheds_after_queue_target_with_standing_queue(self, release):
+        limiter = ConcurrencyLimiter(
+            name="test", max_concurrency=1, queue_target=0.01, queue_interval=0.05
+        )
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            executor.submit(limiter.run, release.wait, 5)
+            self._wait_for(lambda: limiter.in_flight == 1)
+            executor.submit(limiter.run, lambda: None)
+            self._wait_for(lambda: limiter.queue_length == 1)
+
+            # Queue has not been empty for longer than queue interval
+            limiter._last_empty = time.time() - 1
+            start_t = time.time()
+            with pytest.raises(OverloadedError):
+                limiter.run(lambda: None)
+            assert time.time() - start_t < 0.05
+            release.set()
+
+    def test_waiting_call_is_admitted_on_release(self, release):
+        limiter = ConcurrencyLimiter(name="test", max_concurrency=1)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            executor.submit(limiter.run, release.wait, 5)
+            self._wait_for(lambda: limiter.in_flight == 1)
+            waiting = executor.submit(limiter.run, lambda: "admitted")
+            self._wait_for(lambda: limiter.queue_length == 1)
+            release.set()
+            assert waiting.result() == "admitted"
+
+    def test_limited(self):
+        limiter = ConcurrencyLimiter(name="test", max_concurrency=1)
+
+        @limited("test")
+        def call():
+            return limiter.in_flight
+
+        # Without registered limiter, call runs unrestricted
+        assert call() == 0
+
+        LimitersRegistry.register(limiter)
+        try:
+            assert call() == 1
+        finally:
+            LimitersRegistry._limiters.pop("test")
+
+    def test_limited_coroutine_function(self):
+        limiter = ConcurrencyLimiter(name="test", max_concurrency=1)
+
+        @limited("test")
+        async def call():
+            await asyncio.sleep(0.05)
+            return limiter.in_flight
+
+        async def run():
+            return await asyncio.gather(call(), call())
+
+        LimitersRegistry.register(limiter)
+        try:
+            # Second call waits for the first one to release its slot
+            start_t = time.time()
+            assert asyncio.run(run()) == [1, 1]
+            assert time.time() - start_t >= 0.1
+            assert limiter.in_flight == 0
+        finally:
+            LimitersRegistry._limiters.pop("test")
+
+    def test_cancelled_run_async_releases_slot(self):
+        limiter = ConcurrencyLimiter(name="test", max_concurrency=1)
+
+        async def call():
+            return "admitted"
+
+        async def run():
+            limiter.acquire()
+
+            # Cancel call waiting for a slot (e.g. client disconnected)
+            waiting = asyncio.create_task(limiter.run_async(call))
+            while limiter.queue_length == 0:
+                await asyncio.sleep(0.001)
+            waiting.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiting
+
+            # Slot taken by the waiting thread once freed is released in turn
+            limiter.release()
+            deadline = time.time() + 5
+            while (
+                limiter.queue_length or limiter.in_flight
+            ) and time.time() < deadline:
+                await asyncio.sleep(0.001)
+
+        asyncio.run(run())
+        assert limiter.in_flight == 0
+        assert limiter.run(lambda: "admitted") == "admitted"
+
+    def test_adaptive_limit_requires_update(self):
+        with pytest.raises(TypeError):
+            AdaptiveLimit()
+
+    def test_aimd_limit(self):
+        limit = AIMDLimit(min_limit=1, max_limit=10, backoff_ratio=0.5, tolerance=2.0)
+
+        # Limit grows while latency stays near minimum and limit is in use
+        assert limit.update(4, latency=0.1, in_flight=4, dropped=False) == 5
+        assert limit.update(5, latency=0.15, in_flight=5, dropped=False) == 6
+
+        # Limit does not grow when not in use
+        assert limit.update(6, latency=0.1, in_flight=1, dropped=False) == 6
+
+        # Limit backs off on rising latency and failures
+        assert limit.update(6, latency=0.5, in_flight=6, dropped=False) == 3
+        assert limit.update(3, latency=0.1, in_flight=3, dropped=True) == 1.5
+        assert limit.update(1.5, latency=0.1, in_flight=1, dropped=True) == 1
+
+    def test_gradient_limit(self):
+        limit = GradientLimit(min_limit=1, max_limit=100, smoothing=1.0, tolerance=1.0)
+
+        # Limit grows by sqrt(limit) at minimum latency
+        assert limit.update(16, latency=0.1, in_flight=16, dropped=False) == 20
+
+        # Limit shrinks as latency rises
+        assert limit.update(16, latency=0.2, in_flight=16, dropped=False) == 12
+        assert limit.update(16, latency=0.1, in_flight=16, dropped=True) == 12
+
+        # Limit does not grow when not in use
+        assert limit.update(16, latency=0.1, in_flight=2, dropped=False) == 16
+
+    def test_gradient_limit_relearns_minimum_latency(self):
+        limit = GradientLimit(tolerance=1.0, probe_interval=60)
+        limit.update(16, latency=0.1, in_flight=16, dropped=False)
+        limit.update(16, latency=0.5, in_flight=16, dropped=False)
+        assert limit._min_latency == 0.1
+
+        limit._probe_at = time.time() - 1
+        limit.update(16, latency=0.5, in_flight=16, dropped=False)
+        assert limit._min_latency == 0.5
+
+    def test_limiter_with_adaptive_limit(self):
+        Metrics.reset()
+        limiter = ConcurrencyLimiter(
+            name="test",
+            max_concurrency=2,
+            adaptive_limit=AIMDLimit(min_limit=1, max_limit=10, backoff_ratio=0.5),
+        )
+        assert Metrics.value("test_limiter_limit") == 2
+
+        limiter.run(lambda: None)
+        assert limiter.max_concurrency == 3
+        assert Metrics.value("test_limiter_limit") == 3
+
+        with pytest.raises(ValueError):
+            limiter.run(self._fail)
+        assert limiter.max_concurrency == 1
+        assert Metrics.value("test_limiter_limit") == 1
+
+    def _fail(self):
+        raise ValueError("backend failed")
@@ -15,14 +15,18 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
+import asyncio
 import pytest
 
 from orchestrator.constants import GENERIC, WATSON_DISCOVERY
 from orchestrator.retrievers.discovery import (
+    StrategySelector,
     get_discovery_retrievers,
     get_collections_for_discovery_retriever,
+    retrieve_from_collections,
     retrieve_for_discovery_retrievers,
+    retrieve_for_discovery_retrievers_async,
 )
 from orchestrator.exceptions import Error, ErrorMessages
 
@@ -132,7 +136,8 @@ class TestDiscoveryRetriever:
             "Test API Key",
         )
         mock_discovery_get_discovery_collections.assert_called_once_with(
-            "Test Project ID"
+            "Test Project ID",
+            client=mock_connect_cloud_discovery_service_instance.return_value,
         )
 
     def test_get_collections_for_discovery_retriever_for_cp4d_discovery_service_instance_with_missing_credentials(
@@ -163,7 +168,8 @@ class TestDiscoveryRetriever:
             "https://cpd-test/discovery/instance", "Test Token"
         )
         mock_discovery_get_discovery_collections.assert_called_once_with(
-            "Test Project ID"
+            "Test Project ID",
+            client=mock_connect_cp4d_discovery_service_instance.return_value,
         )
 
     def test_retrieve_for_discovery_retrievers_with_missing_service_endpoint(
@@ -233,6 +239,8 @@ class TestDiscoveryRetriever:
             question="test query",
             collection_id="test collection",
             limit=10,
+            return_fields=["document_id", "title", "url", "text"],
+            client=mock_connect_cloud_discovery_service_instance.return_value,
         )
 
     def test_retrieve_for_discovery_retrievers_for_cloud_discovery_service_instance_with_custom_parameter_value(
@@ -264,6 +272,8 @@ class TestDiscoveryRetriever:
             question="test query",
             collection_id="test collection",
             limit=5,
+            return_fields=["document_id", "title", "url", "text"],
+            client=mock_connect_cloud_discovery_service_instance.return_value,
         )
 
     def test_retrieve_for_discovery_retrievers_for_cp4d_discovery_service_instance_with_missing_credentials(
@@ -305,4 +315,259 @@ class TestDiscoveryRetriever:
             question="test query",
             collection_id="test collection",
             limit=10,
+            return_fields=["document_id", "title", "url", "text"],
+            client=mock_connect_cp4d_discovery_service_instance.return_value,
         )
+
+    def _hit(self, document_id: str, confidence: float) -> dict:
+        return {
+            "document_id": document_id,
+            "text": [document_id],
+            "result_metadata": {"confidence": confidence},
+        }
+
+    def test_retrieve_for_discovery_retrievers_for_multiple_collections(
+        self,
+        mocker,
+        mock_cloud_discovery_service_instance_settings,
+        mock_connect_cloud_discovery_service_instance,
+    ):
+        mock_cloud_discovery_service_instance_settings[
+            GENERIC.ATTR_SERVICE_API_KEY.value
+        ] = "Test API Key"
+        mock_retrieve_from_collections = mocker.patch(
+            "orchestrator.retrievers.discovery.retrieve_from_collections",
+            return_value=[self._hit("document 1", 0.9)],
+        )
+        documents = retrieve_for_discovery_retrievers(
+            query="test query",
+            retriever={
+                "retriever_id": "test retriever",
+                "parameters": [
+                    {"parameter_id": "collection_strategy", "value": "sharded"}
+                ],
+            },
+            collection_id="test collection 1, test collection 2",
+            settings=mock_cloud_discovery_service_instance_settings,
+        )
+        mock_retrieve_from_collections.assert_called_once_with(
+            project_id="Test Project ID",
+            query="test query",
+            collection_ids=["test collection 1", "test collection 2"],
+            limit=10,
+            strategy="sharded",
+            return_fields=["document_id", "title", "url", "text"],
+            client=mock_connect_cloud_discovery_service_instance.return_value,
+        )
+        assert documents[0]["document_id"] == "document 1"
+
+    def test_retrieve_for_discovery_retrievers_with_single_normalized_collection(
+        self,
+        mocker,
+        mock_cloud_discovery_service_instance_settings,
+        mock_connect_cloud_discovery_service_instance,
+        mock_discovery_retrieve,
+    ):
+        mock_cloud_discovery_service_instance_settings[
+            GENERIC.ATTR_SERVICE_API_KEY.value
+        ] = "Test API Key"
+        retrieve_for_discovery_retrievers(
+            query="test query",
+            retriever={"retriever_id": "test retriever"},
+            collection_id="test collection, ",
+            settings=mock_cloud_discovery_service_instance_settings,
+        )
+        assert (
+            mock_discovery_retrieve.call_args.kwargs["collection_id"]
+            == "test collection"
+        )
+
+        mock_async_retrieve = mocker.patch(
+            "orchestrator.integrations.discovery.async_engine.retrieve",
+            new_callable=AsyncMock,
+            return_value=[],
+        )
+        mocker.patch(
+            "orchestrator.integrations.discovery.async_engine.connect_cloud_discovery_service_instance"
+        )
+        asyncio.run(
+            retrieve_for_discovery_retrievers_async(
+                query="test query",
+                retriever={"retriever_id": "test retriever"},
+                collection_id=" test collection,",
+                settings=mock_cloud_discovery_service_instance_settings,
+            )
+        )
+        assert (
+            mock_async_retrieve.call_args.kwargs["collection_id"] == "test collection"
+        )
+
+    def test_retrieve_for_discovery_retrievers_with_passages(
+        self,
+        mock_cloud_discovery_service_instance_settings,
+        mock_connect_cloud_discovery_service_instance,
+        mock_discovery_retrieve,
+    ):
+        mock_cloud_discovery_service_instance_settings[
+            GENERIC.ATTR_SERVICE_API_KEY.value
+        ] = "Test API Key"
+        mock_discovery_retrieve.return_value = [
+            {
+                "document_id": "document 1",
+                "title": "Manual",
+                "result_metadata": {"confidence": 0.9},
+                "document_passages": [
+                    {"passage_text": "first passage", "start_offset": 120},
+                    {"passage_text": "second passage", "start_offset": 4000},
+                ],
+            },
+            {
+                "document_id": "document 2",
+                "result_metadata": {"confidence": 0.5},
+                "document_passages": [
+                    {"passage_text": "third passage", "start_offset": 0},
+                ],
+            },
+        ]
+        documents = retrieve_for_discovery_retrievers(
+            query="test query",
+            retriever={
+                "retriever_id": "test retriever",
+                "parameters": [
+                    {"parameter_id": "passages", "value": True},
+                    {"parameter_id": "passage_count", "value": 3},
+                    {"parameter_id": "passage_characters", "value": 200},
+                ],
+            },
+            collection_id="test collection",
+            settings=mock_cloud_discovery_service_instance_settings,
+        )
+        mock_discovery_retrieve.assert_called_once_with(
+            project_id="Test Project ID",
+            question="test query",
+            collection_id="test collection",
+            limit=10,
+            return_fields=["document_id", "title", "url"],
+            passage_count=3,
+            passage_characters=200,
+            client=mock_connect_cloud_discovery_service_instance.return_value,
+        )
+        assert [
+            (document["text"], document["document_id"], document["text_offset"])
+            for document in documents
+        ] == [
+            ("first passage", "document 1", 120),
+            ("second passage", "document 1", 4000),
+            ("third passage", "document 2", 0),
+        ]
+        assert documents[0]["title"] == "Manual"
+        assert documents[0]["score"] == 0.9
+
+    def test_retrieve_from_collections_with_sharded_strategy(self, mocker):
+        shards = {
+            "collection 1": [
+                self._hit("document 1", 0.9),
+                self._hit("document 2", 0.4),
+            ],
+            "collection 2": [
+                self._hit("document 3", 0.7),
+                self._hit("document 4", 0.6),
+            ],
+        }
+        mock_discovery_retrieve = mocker.patch(
+            "orchestrator.retrievers.discovery.retrieve",
+            side_effect=lambda project_id, question, collection_id, limit, **kwargs: shards[
+                collection_id
+            ],
+        )
+        hits = retrieve_from_collections(
+            project_id="test project",
+            query="test query",
+            collection_ids=["collection 1", "collection 2"],
+            limit=3,
+            strategy="sharded",
+        )
+        assert mock_discovery_retrieve.call_count == 2
+        assert [hit["document_id"] for hit in hits] == [
+            "document 1",
+            "document 3",
+            "document 4",
+        ]
+
+    def test_retrieve_from_collections_with_single_strategy(self, mocker):
+        mock_discovery_retrieve = mocker.patch(
+            "orchestrator.retrievers.discovery.retrieve",
+            return_value=[self._hit("document 1", 0.9)],
+        )
+        retrieve_from_collections(
+            project_id="test project",
+            query="test query",
+            collection_ids=["collection 1", "collection 2"],
+            limit=3,
+            strategy="single",
+        )
+        mock_discovery_retrieve.assert_called_once_with(
+            project_id="test project",
+            question="test query",
+            collection_id=["collection 1", "collection 2"],
+            limit=3,
+            client=None,
+        )
+
+    def test_strategy_selector(self):
+        selector = StrategySelector(
+            strategies=["single", "sharded"], alpha=0.5, exploration=0.0
+        )
+
+        # Strategies without measurements are tried first
+        assert selector.choose(2) == "single"
+        selector.record("single", 2, 1.0)
+        assert selector.choose(2) == "sharded"
+        selector.record("sharded", 2, 0.5)
+
+        # Afterwards, faster strategy is chosen
+        assert selector.choose(2) == "sharded"
+        selector.record("sharded", 2, 2.0)
+        assert selector.choose(2) == "single"
+
+        # Latencies are tracked per number of collections
+        assert selector.choose(3) == "single"
+
+    def test_retrieve_for_discovery_retrievers_async(
+        self, mocker, mock_cloud_discovery_service_instance_settings
+    ):
+        mock_cloud_discovery_service_instance_settings[
+            GENERIC.ATTR_SERVICE_API_KEY.value
+        ] = "Test API Key"
+        mock_connect = mocker.patch(
+            "orchestrator.integrations.discovery.async_engine.connect_cloud_discovery_service_instance"
+        )
+        mock_retrieve = mocker.patch(
+            "orchestrator.integrations.discovery.async_engine.retrieve",
+            new_callable=AsyncMock,
+            side_effect=lambda project_id, question, collection_id, limit, **kwargs: [
+                self._hit(f"{collection_id} document", 0.9)
+            ],
+        )
+        documents = asyncio.run(
+            retrieve_for_discovery_retrievers_async(
+                query="test query",
+                retriever={
+                    "retriever_id": "test retriever",
+                    "parameters": [
+                        {"parameter_id": "collection_strategy", "value": "sharded"}
+                    ],
+                },
+                collection_id="collection 1,collection 2",
+                settings=mock_cloud_discovery_service_instance_settings,
+            )
+        )
+        mock_connect.assert_called_once_with(
+            endpoint="https://api.us-south.discovery.watson.cloud.ibm.com/instances/",
+            api_key="Test API Key",
+        )
+        assert mock_retrieve.await_count == 2
+        assert [document["document_id"] for document in documents] == [
+            "collection 1 document",
+            "collection 2 document",
+        ]
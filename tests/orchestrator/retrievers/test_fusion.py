@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2022 PrimeQA Team
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import threading
+import pytest
+
+from orchestrator import retrievers
+from orchestrator.retrievers import (
+    configure_fan_out,
+    retrieve_async,
+    retrieve_from_sources,
+)
+from orchestrator.retrievers.fusion import document_key, fuse
+
+
+class TestFusion:
+    def test_document_key(self):
+        assert document_key({"document_id": "1", "text": "a"}) == "id:1"
+        assert document_key({"text": "a"}) == document_key({"text": "a"})
+        assert document_key({"text": "a"}) != document_key({"text": "b"})
+        assert document_key(
+            {"document_id": "1", "text": "a", "text_offset": 0}
+        ) != document_key({"document_id": "1", "text": "b", "text_offset": 400})
+
+    def test_reciprocal_rank_fusion(self):
+        documents = fuse(
+            [
+                [{"document_id": "1", "text": "a"}, {"document_id": "2", "text": "b"}],
+                [{"document_id": "2", "text": "b"}, {"document_id": "3", "text": "c"}],
+            ],
+            weights=[1.0, 1.0],
+            method="rrf",
+            rrf_k=60,
+        )
+        assert [document["document_id"] for document in documents] == ["2", "1", "3"]
+        assert documents[0]["score"] == pytest.approx(1 / 62 + 1 / 61)
+        assert documents[1]["score"] == pytest.approx(1 / 61)
+
+    def test_weighted_score_fusion(self):
+        documents = fuse(
+            [
+                [{"text": "a", "confidence": 1.0}, {"text": "b", "confidence": 0.5}],
+                [{"text": "b", "confidence": 1.0}, {"text": "b", "confidence": 0.2}],
+            ],
+            weights=[1.0, 0.2],
+            method="weighted",
+        )
+        assert [document["text"] for document in documents] == ["a", "b"]
+        assert documents[1]["score"] == pytest.approx(0.5 + 0.2)
+
+    def test_retrieve_from_sources(self, mocker):
+        started = threading.Barrier(2, timeout=5)
+
+        def retrieve(query, retriever_id, collection_id, **kwargs):
+            # Both retrievals must run at the same time to pass the barrier
+            started.wait()
+            return [
+                {"document_id": f"{retriever_id} document", "text": "a", "score": 1.0},
+                {"document_id": "shared document", "text": "b", "score": 0.5},
+            ]
+
+        mocker.patch("orchestrator.retrievers.retrieve", side_effect=retrieve)
+        documents = retrieve_from_sources(
+            query="test question",
+            sources=[
+                {"retriever_id": "retriever 1", "collection_id": "collection 1"},
+                {"retriever_id": "retriever 2", "collection_id": "collection 2"},
+            ],
+            top_k=2,
+        )
+        assert len(documents) == 2
+        assert documents[0]["document_id"] == "shared document"
+        assert documents[0]["confidence"] == 1.0
+
+    def test_configure_fan_out(self, mocker):
+        retrieving_threads = []
+
+        def retrieve(query, retriever_id, collection_id, **kwargs):
+            retrieving_threads.append(threading.current_thread().name)
+            return [{"document_id": retriever_id, "text": "a", "score": 1.0}]
+
+        mocker.patch("orchestrator.retrievers.retrieve", side_effect=retrieve)
+        configure_fan_out(num_threads=2, num_discovery_shard_threads=3)
+        try:
+            assert retrievers._FAN_OUT_EXECUTOR._max_workers == 2
+            assert retrievers.discovery._SHARDS_EXECUTOR._max_workers == 3
+            documents = retrieve_from_sources(
+                query="test question",
+                sources=[
+                    {"retriever_id": "retriever 1", "collection_id": "collection 1"},
+                    {"retriever_id": "retriever 2", "collection_id": "collection 2"},
+                ],
+            )
+        finally:
+            configure_fan_out(num_threads=16, num_discovery_shard_threads=16)
+
+        assert len(documents) == 2
+        assert any(name.startswith("retrievers-fan-out") for name in retrieving_threads)
+
+    def test_retrieve_async_resolves_retriever_off_event_loop(self, mocker):
+        resolving_threads = []
+
+        def resolve_retriever(query, retriever_id, parameters_with_updates):
+            resolving_threads.append(threading.current_thread())
+            return {"provenance": "PrimeQA"}, {}
+
+        mocker.patch(
+            "orchestrator.retrievers._resolve_retriever", side_effect=resolve_retriever
+        )
+        mocker.patch("orchestrator.retrievers.retrieve", return_value=[{"text": "a"}])
+
+        documents = asyncio.run(
+            retrieve_async(
+                query="test question",
+                retriever_id="retriever 1",
+                collection_id="collection 1",
+            )
+        )
+
+        assert documents == [{"text": "a"}]
+        assert resolving_threads[0] is not threading.main_thread()
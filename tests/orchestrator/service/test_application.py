@@ -15,12 +15,21 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from unittest.mock import MagicMock
+import json
+import threading
+from unittest.mock import AsyncMock, MagicMock, PropertyMock
 import pytest
 from fastapi.testclient import TestClient
 
-from orchestrator.service.application import app
+from orchestrator.cache import LoadingCache, TieredCache
+from orchestrator.configurations import Settings
+from orchestrator.service.application import (
+    app,
+    build_adaptive_limit,
+    trim_documents,
+)
 from orchestrator.constants import FEEDBACK
+from orchestrator.exceptions import ErrorMessages, OverloadedError
 
 
 class TestApplication:
@@ -35,6 +44,18 @@ class TestApplication:
             autospec=True,
         )
 
+    def test_build_adaptive_limit_is_bounded_by_backend_limit(self):
+        adaptive_limit = build_adaptive_limit(8)
+        assert adaptive_limit.max_limit == 8
+
+        # Limit does not grow beyond backend limit, however fast backend calls are
+        limit = 8.0
+        for _ in range(100):
+            limit = adaptive_limit.update(
+                limit, latency=0.01, in_flight=8, dropped=False
+            )
+        assert limit == 8
+
     def test_get_settings(self, client, mock_STORE):
         mock_settings = {"retrievers": {}, "readers": {"PrimeQA": {}}}
         mock_STORE.get_settings.return_value = mock_settings
@@ -114,6 +135,74 @@ class TestApplication:
         assert response.status_code == 201
         assert response.json() == [{"text": "test document text", "score": 0.5}]
 
+    def test_get_documents_for_question_with_async_discovery_retriever(
+        self, client, mocker
+    ):
+        mocker.patch.object(
+            Settings,
+            "enable_async_discovery_retriever",
+            new_callable=PropertyMock,
+            return_value=True,
+        )
+        mock_retrieve = mocker.patch("orchestrator.service.application.retrieve")
+        mock_retrieve_async = mocker.patch(
+            "orchestrator.service.application.retrieve_async",
+            new_callable=AsyncMock,
+            return_value=[{"text": "test document text", "score": 0.5}],
+        )
+        response = client.post(
+            "/GetDocumentsRequest",
+            json={
+                "question": "test question",
+                "retriever": {"retriever_id": "WatsonDiscovery"},
+                "collection": {"collection_id": "test collection"},
+            },
+        )
+        mock_retrieve.assert_not_called()
+        mock_retrieve_async.assert_awaited_once()
+        assert mock_retrieve_async.call_args.kwargs["query"] == "test question"
+        assert response.status_code == 201
+        assert response.json() == [{"text": "test document text", "score": 0.5}]
+
+    def test_get_documents_for_question_with_projection(self, client, mocker):
+        mocker.patch(
+            "orchestrator.service.application.retrieve",
+            return_value=[
+                {
+                    "text": "test document text",
+                    "score": 0.5,
+                    "document_id": "test document id",
+                    "title": "test title",
+                }
+            ],
+        )
+        response = client.post(
+            "/GetDocumentsRequest",
+            json={
+                "question": "test question",
+                "retriever": {"retriever_id": "test retriever"},
+                "collection": {"collection_id": "test collection"},
+                "fields": ["document_id", "title", "text"],
+                "max_document_chars": 4,
+            },
+        )
+        assert response.status_code == 201
+        assert response.json() == [
+            {"text": "test", "document_id": "test document id", "title": "test title"}
+        ]
+
+    def test_get_documents_for_question_with_invalid_field(self, client):
+        response = client.post(
+            "/GetDocumentsRequest",
+            json={
+                "question": "test question",
+                "retriever": {"retriever_id": "test retriever"},
+                "collection": {"collection_id": "test collection"},
+                "fields": ["body"],
+            },
+        )
+        assert response.status_code == 422
+
     def test_get_documents_for_question_with_empty_question(self, client):
         response = client.post(
             "/GetDocumentsRequest",
@@ -283,6 +372,28 @@ class TestApplication:
         assert response.status_code == 201
         assert response.json() == []
 
+    def test_ask_with_overloaded_backend(self, client, mocker):
+        mocker.patch(
+            "orchestrator.service.application.retrieve",
+            side_effect=OverloadedError(
+                ErrorMessages.BACKEND_QUEUE_TIMEOUT.value.format("primeqa_retriever"),
+                status_code=503,
+                retry_after=2,
+            ),
+        )
+        response = client.post(
+            "/ask",
+            json={
+                "question": "test question with overloaded backend",
+                "retriever": {"retriever_id": "test retriever"},
+                "collection": {"collection_id": "test collection"},
+                "reader": {"reader_id": "test reader"},
+            },
+        )
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "2"
+        assert response.json()["detail"]["code"] == "E3002"
+
     def test_ask_with_empty_question(self, client):
         response = client.post(
             "/ask",
@@ -443,6 +554,101 @@ class TestApplication:
         assert response.status_code == 200
         assert response.json() == []
 
+    def test_get_feedbacks_in_primeqa_format(self, client, mock_STORE):
+        mock_STORE.get_feedbacks.return_value = [
+            {
+                FEEDBACK.QUESTION.value: "test question",
+                FEEDBACK.CONTEXT.value: "test context",
+                FEEDBACK.ANSWER.value: "test answer",
+                FEEDBACK.START_CHAR_OFFSET.value: 5,
+            }
+        ]
+
+        response = client.get(
+            "/feedbacks", params={"application": "reading", "_format": "primeqa"}
+        )
+        assert response.status_code == 200
+        assert response.json() == [
+            {
+                "id": "0",
+                "question": "test question",
+                "context": "test context",
+                "answers": {"text": ["test answer"], "answer_start": [5]},
+            }
+        ]
+
+        # Positive feedbacks are selected by the database
+        mock_STORE.get_feedbacks.assert_called_once_with(
+            where_clauses={
+                FEEDBACK.APPLICATION.value: ["reading"],
+                FEEDBACK.THUMBS_UP.value: 1,
+            }
+        )
+
+    def test_get_feedbacks_page(self, client, mock_STORE):
+        mock_feedback = {
+            FEEDBACK.FEEDBACK_ID.value: "test feedback id",
+            FEEDBACK.USER_ID.value: "test user id",
+        }
+        mock_STORE.get_feedbacks_page.return_value = ([mock_feedback], 42)
+
+        response = client.get(
+            "/feedbacks", params={"limit": 1, "user_id": "test user id"}
+        )
+        assert response.status_code == 200
+        assert response.json() == [mock_feedback]
+        cursor = response.headers["X-Next-Cursor"]
+
+        mock_STORE.get_feedbacks_page.return_value = ([], None)
+        response = client.get("/feedbacks", params={"limit": 1, "cursor": cursor})
+        assert response.status_code == 200
+        assert "X-Next-Cursor" not in response.headers
+        assert mock_STORE.get_feedbacks_page.call_args.kwargs == {
+            "where_clauses": {},
+            "limit": 1,
+            "after": 42,
+        }
+
+    def test_get_feedbacks_page_with_invalid_cursor(self, client, mock_STORE):
+        response = client.get("/feedbacks", params={"cursor": "invalid"})
+        assert response.status_code == 400
+        assert response.json()["detail"]["code"] == "E1001"
+
+    def test_get_feedbacks_stream(self, client, mock_STORE):
+        mock_STORE.iter_feedbacks.return_value = iter(
+            [
+                [
+                    {FEEDBACK.FEEDBACK_ID.value: f"test feedback id {idx}"}
+                    for idx in range(2)
+                ],
+                [{FEEDBACK.FEEDBACK_ID.value: "test feedback id 2"}],
+            ]
+        )
+
+        response = client.get("/feedbacks", params={"stream": True})
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert [json.loads(line) for line in response.text.splitlines()] == [
+            {FEEDBACK.FEEDBACK_ID.value: f"test feedback id {idx}"} for idx in range(3)
+        ]
+
+    def test_get_feedbacks_stream_reads_on_feedback_executor(self, client, mock_STORE):
+        reading_threads = []
+
+        def iter_feedbacks(**kwargs):
+            for idx in range(2):
+                reading_threads.append(threading.current_thread().name)
+                yield [{FEEDBACK.FEEDBACK_ID.value: f"test feedback id {idx}"}]
+
+        mock_STORE.iter_feedbacks.side_effect = iter_feedbacks
+
+        response = client.get("/feedbacks", params={"stream": True})
+        assert response.status_code == 200
+        assert len(response.text.splitlines()) == 2
+        assert reading_threads and all(
+            name.startswith("feedback-endpoint") for name in reading_threads
+        )
+
     def test_post_feedback(self, client, mock_STORE):
         mock_feedback = {
             FEEDBACK.FEEDBACK_ID.value: "test feedback id",
@@ -452,10 +658,482 @@ class TestApplication:
             FEEDBACK.THUMBS_UP: True,
             FEEDBACK.THUMBS_DOWN: False,
         }
-        mock_STORE.get_feedbacks.return_value = [mock_feedback]
+        mock_STORE.save_feedback.return_value = mock_feedback
         response = client.post(
             "/feedbacks",
             json=mock_feedback,
         )
         mock_STORE.save_feedback.assert_called_once()
+        mock_STORE.get_feedbacks.assert_not_called()
         assert response.status_code == 201
+        assert response.json()[FEEDBACK.QUESTION.value] == "test question"
+
+    def test_post_feedback_with_write_behind(self, client, mock_STORE, mocker):
+        mocker.patch.object(
+            Settings,
+            "enable_feedback_write_behind",
+            new_callable=PropertyMock,
+            return_value=True,
+        )
+        mock_feedback = {
+            FEEDBACK.FEEDBACK_ID.value: "test feedback id",
+            FEEDBACK.USER_ID.value: "test user id",
+            FEEDBACK.QUESTION.value: "test question",
+            FEEDBACK.ANSWER.value: "test answer",
+            FEEDBACK.THUMBS_UP: True,
+            FEEDBACK.THUMBS_DOWN: False,
+        }
+        mock_STORE.save_feedback.return_value = mock_feedback
+        response = client.post(
+            "/feedbacks",
+            json=mock_feedback,
+        )
+        mock_STORE.save_feedback.assert_called_once()
+        assert response.status_code == 202
+        assert response.content == b""
+
+    def test_post_feedback_with_failed_save(self, client, mock_STORE):
+        mock_STORE.save_feedback.return_value = None
+        response = client.post(
+            "/feedbacks",
+            json={
+                FEEDBACK.FEEDBACK_ID.value: "test feedback id",
+                FEEDBACK.USER_ID.value: "test user id",
+                FEEDBACK.QUESTION.value: "test question",
+                FEEDBACK.ANSWER.value: "test answer",
+                FEEDBACK.THUMBS_UP.value: True,
+                FEEDBACK.THUMBS_DOWN.value: False,
+            },
+        )
+        assert response.status_code == 500
+        assert response.json()["detail"]["code"] == "E2001"
+
+    @pytest.mark.parametrize("ndjson", [True, False])
+    def test_post_feedbacks_in_bulk(self, client, mock_STORE, ndjson):
+        feedbacks = [
+            {
+                FEEDBACK.FEEDBACK_ID.value: f"test feedback id {idx}",
+                FEEDBACK.USER_ID.value: "test user id",
+                FEEDBACK.QUESTION.value: "test question",
+                FEEDBACK.ANSWER.value: "test answer",
+                FEEDBACK.THUMBS_UP.value: True,
+                FEEDBACK.THUMBS_DOWN.value: False,
+            }
+            for idx in range(2)
+        ] + [{FEEDBACK.FEEDBACK_ID.value: "incomplete feedback"}]
+        mock_STORE.save_feedbacks.return_value = [None, "test error"]
+
+        if ndjson:
+            response = client.post(
+                "/feedbacks/bulk",
+                data="\n".join(json.dumps(feedback) for feedback in feedbacks),
+                headers={"Content-Type": "application/x-ndjson"},
+            )
+        else:
+            response = client.post("/feedbacks/bulk", json=feedbacks)
+
+        assert response.status_code == 200
+        result = response.json()
+        assert (result["saved"], result["invalid"], result["failed"]) == (1, 1, 1)
+        assert [item["status"] for item in result["items"]] == [
+            "saved",
+            "failed",
+            "invalid",
+        ]
+        assert len(mock_STORE.save_feedbacks.call_args.args[0]) == 2
+
+    def test_post_feedbacks_in_bulk_streams_ndjson(self, client, mock_STORE, mocker):
+        mocker.patch.object(
+            Settings,
+            "feedback_ingestion_chunk_size",
+            new_callable=PropertyMock,
+            return_value=2,
+        )
+        body = "\n".join(
+            json.dumps(
+                {
+                    FEEDBACK.FEEDBACK_ID.value: f"test feedback id {idx}",
+                    FEEDBACK.USER_ID.value: "test user id",
+                    FEEDBACK.QUESTION.value: "test question",
+                    FEEDBACK.ANSWER.value: "test answer",
+                    FEEDBACK.THUMBS_UP.value: True,
+                    FEEDBACK.THUMBS_DOWN.value: False,
+                }
+            )
+            for idx in range(5)
+        ).encode("utf-8")
+        mock_STORE.save_feedbacks.side_effect = lambda feedbacks, chunk_size: [
+            None
+        ] * len(feedbacks)
+
+        # Body is sent in chunks splitting lines
+        response = client.post(
+            "/feedbacks/bulk",
+            data=(body[idx : idx + 50] for idx in range(0, len(body), 50)),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+
+        assert response.status_code == 200
+        result = response.json()
+        assert result["saved"] == 5
+        assert [item["index"] for item in result["items"]] == list(range(5))
+        assert [
+            len(call.args[0]) for call in mock_STORE.save_feedbacks.call_args_list
+        ] == [2, 2, 1]
+
+    def test_post_feedbacks_in_bulk_with_too_large_array(
+        self, client, mock_STORE, mocker
+    ):
+        mocker.patch.object(
+            Settings,
+            "feedback_ingestion_max_array_size",
+            new_callable=PropertyMock,
+            return_value=10,
+        )
+        response = client.post(
+            "/feedbacks/bulk",
+            data=(chunk for chunk in [b"[", b'{"feedback_id": "test feedback id"}]']),
+        )
+        assert response.status_code == 413
+        assert response.json()["detail"]["code"] == "E1001"
+        mock_STORE.save_feedbacks.assert_not_called()
+
+    def test_post_feedbacks_in_bulk_with_invalid_body(self, client, mock_STORE):
+        response = client.post("/feedbacks/bulk", data="[{")
+        assert response.status_code == 400
+        assert response.json()["detail"]["code"] == "E1001"
+        mock_STORE.save_feedbacks.assert_not_called()
+
+    def test_ask_with_answer_cache(self, client, mocker):
+        mocker.patch(
+            "orchestrator.service.application.ANSWER_CACHE",
+            TieredCache(memory=LoadingCache(name="test", ttl=60, beta=0.0)),
+        )
+        mock_retrieve = mocker.patch(
+            "orchestrator.service.application.retrieve",
+            return_value=[
+                {"text": "test document text", "score": 0.5, "confidence": 1.0}
+            ],
+        )
+        mock_read = mocker.patch(
+            "orchestrator.service.application.read",
+            return_value=[],
+        )
+        for _ in range(2):
+            response = client.post(
+                "/ask",
+                json={
+                    "question": "test question",
+                    "retriever": {"retriever_id": "test retriever"},
+                    "collection": {"collection_id": "test collection"},
+                    "reader": {"reader_id": "test reader"},
+                },
+            )
+            assert response.status_code == 201
+            assert response.json() == {
+                "documents": [
+                    {"text": "test document text", "score": 0.5, "confidence": 1.0}
+                ]
+            }
+        mock_retrieve.assert_called_once()
+        mock_read.assert_called_once()
+
+    def test_get_metrics(self, client):
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert set(response.json().keys()) == {"counters", "gauges"}
+
+    def test_ask_with_document_evidence(self, client, mocker):
+        mocker.patch(
+            "orchestrator.service.application.retrieve",
+            return_value=[
+                {
+                    "text": "test document text",
+                    "score": 0.5,
+                    "confidence": 1.0,
+                    "document_id": "test document id",
+                    "title": None,
+                    "url": None,
+                    "provenance": "test",
+                }
+            ],
+        )
+        mocker.patch(
+            "orchestrator.service.application.read",
+            return_value=[
+                {
+                    "text": "test answer text",
+                    "confidence": 0.9,
+                    "evidences": [
+                        {
+                            "context_index": 0,
+                            "offsets": [{"start": 5, "end": 13}],
+                        }
+                    ],
+                }
+            ],
+        )
+        response = client.post(
+            "/ask",
+            json={
+                "question": "test question with document evidence",
+                "retriever": {"retriever_id": "test retriever"},
+                "collection": {"collection_id": "test collection"},
+                "reader": {"reader_id": "test reader"},
+            },
+        )
+        assert response.status_code == 201
+        assert response.json() == {
+            "answers": [
+                {
+                    "text": "test answer text",
+                    "confidence_score": 0.9,
+                    "evidences": [
+                        {
+                            "evidence_type": "document",
+                            "text": "test document text",
+                            "score": 0.5,
+                            "document_id": "test document id",
+                            "offsets": [{"start": 5, "end": 13}],
+                        }
+                    ],
+                }
+            ],
+            "documents": [
+                {
+                    "text": "test document text",
+                    "score": 0.5,
+                    "confidence": 1.0,
+                    "document_id": "test document id",
+                }
+            ],
+        }
+
+    def test_ask_with_compact_response_mode(self, client, mocker):
+        mocker.patch(
+            "orchestrator.service.application.retrieve",
+            return_value=[
+                {
+                    "text": "0123456789 test document text 0123456789",
+                    "score": 0.5,
+                    "confidence": 1.0,
+                    "document_id": "test document id",
+                },
+                {
+                    "text": "second test document text",
+                    "score": 0.4,
+                    "confidence": 0.8,
+                    "document_id": "second test document id",
+                },
+            ],
+        )
+        mocker.patch(
+            "orchestrator.service.application.read",
+            return_value=[
+                {
+                    "text": "test answer text",
+                    "confidence": 0.9,
+                    "evidences": [
+                        {
+                            "context_index": 0,
+                            "offsets": [{"start": 16, "end": 24}],
+                        }
+                    ],
+                }
+            ],
+        )
+        response = client.post(
+            "/ask",
+            json={
+                "question": "test question with compact response",
+                "retriever": {"retriever_id": "test retriever"},
+                "collection": {"collection_id": "test collection"},
+                "reader": {"reader_id": "test reader"},
+                "response_mode": "compact",
+                "snippet_window": 5,
+            },
+        )
+        assert response.status_code == 201
+        assert response.json() == {
+            "answers": [
+                {
+                    "text": "test answer text",
+                    "confidence_score": 0.9,
+                    "evidences": [
+                        {
+                            "evidence_type": "document_reference",
+                            "document_index": 0,
+                            "offsets": [{"start": 5, "end": 13}],
+                        }
+                    ],
+                }
+            ],
+            "documents": [
+                {
+                    "text": "test document text",
+                    "score": 0.5,
+                    "confidence": 1.0,
+                    "document_id": "test document id",
+                    "text_offset": 11,
+                },
+                {
+                    "text": "second tes",
+                    "score": 0.4,
+                    "confidence": 0.8,
+                    "document_id": "second test document id",
+                },
+            ],
+        }
+
+    def test_trim_documents_leaves_untrimmed_documents_unchanged(self):
+        documents = [
+            {"text": "0123456789 test document text", "document_id": "1"},
+            {"text": "short text", "document_id": "2"},
+            {"text": "passage text", "document_id": "3", "text_offset": 40},
+        ]
+        answers = [
+            {
+                "text": "test answer text",
+                "evidences": [
+                    {"context_index": 0, "offsets": [{"start": 16, "end": 24}]},
+                    {"context_index": 2, "offsets": [{"start": 0, "end": 7}]},
+                ],
+            }
+        ]
+
+        trimmed_documents, _ = trim_documents(documents, answers, window=5)
+
+        assert trimmed_documents[0] == {
+            "text": "test document text",
+            "document_id": "1",
+            "text_offset": 11,
+        }
+        assert trimmed_documents[1:] == documents[1:]
+
+    def test_ask_with_max_document_chars(self, client, mocker):
+        mocker.patch(
+            "orchestrator.service.application.retrieve",
+            return_value=[
+                {
+                    "text": "0123456789 test document text 0123456789",
+                    "score": 0.5,
+                    "confidence": 1.0,
+                    "document_id": "test document id",
+                }
+            ],
+        )
+        mocker.patch(
+            "orchestrator.service.application.read",
+            return_value=[
+                {
+                    "text": "test answer text",
+                    "confidence": 0.9,
+                    "evidences": [
+                        {
+                            "context_index": 0,
+                            "offsets": [{"start": 16, "end": 24}],
+                        }
+                    ],
+                }
+            ],
+        )
+        response = client.post(
+            "/ask",
+            json={
+                "question": "test question with maximum document length",
+                "retriever": {"retriever_id": "test retriever"},
+                "collection": {"collection_id": "test collection"},
+                "reader": {"reader_id": "test reader"},
+                "fields": ["document_id", "text", "text_offset"],
+                "max_document_chars": 12,
+            },
+        )
+        assert response.status_code == 201
+        assert response.json() == {
+            "answers": [
+                {
+                    "text": "test answer text",
+                    "confidence_score": 0.9,
+                    "evidences": [
+                        {
+                            "evidence_type": "document",
+                            "text": "t document t",
+                            "score": 0.5,
+                            "document_id": "test document id",
+                            "offsets": [{"start": 2, "end": 10}],
+                        }
+                    ],
+                }
+            ],
+            "documents": [
+                {
+                    "text": "t document t",
+                    "document_id": "test document id",
+                    "text_offset": 14,
+                }
+            ],
+        }
+
+    def test_ask_with_multiple_retrievers(self, client, mocker):
+        mock_retrieve_from_sources = mocker.patch(
+            "orchestrator.service.application.retrieve_from_sources",
+            return_value=[
+                {"text": "test document text", "score": 0.03, "confidence": 1.0}
+            ],
+        )
+        mocker.patch("orchestrator.service.application.read", return_value=[])
+        response = client.post(
+            "/ask",
+            json={
+                "question": "test question with multiple retrievers",
+                "sources": [
+                    {
+                        "retriever": {"retriever_id": "test retriever 1"},
+                        "collection": {"collection_id": "test collection 1"},
+                    },
+                    {
+                        "retriever": {"retriever_id": "test retriever 2"},
+                        "collection": {"collection_id": "test collection 2"},
+                        "weight": 0.5,
+                    },
+                ],
+                "fusion": {"method": "weighted", "top_k": 5},
+                "reader": {"reader_id": "test reader"},
+            },
+        )
+        mock_retrieve_from_sources.assert_called_once_with(
+            query="test question with multiple retrievers",
+            sources=[
+                {
+                    "retriever_id": "test retriever 1",
+                    "collection_id": "test collection 1",
+                    "parameters_with_updates": None,
+                    "weight": 1.0,
+                },
+                {
+                    "retriever_id": "test retriever 2",
+                    "collection_id": "test collection 2",
+                    "parameters_with_updates": None,
+                    "weight": 0.5,
+                },
+            ],
+            fusion_method="weighted",
+            rrf_k=60,
+            top_k=5,
+        )
+        assert response.status_code == 201
+        assert response.json() == {
+            "documents": [
+                {"text": "test document text", "score": 0.03, "confidence": 1.0}
+            ]
+        }
+
+    def test_ask_without_retriever(self, client):
+        response = client.post(
+            "/ask",
+            json={
+                "question": "test question without retriever",
+                "reader": {"reader_id": "test reader"},
+            },
+        )
+        assert response.status_code == 422
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2022 PrimeQA Team
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import Union
+import asyncio
+import inspect
+import threading
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel, validator
+
+from orchestrator.metrics import Metrics
+from orchestrator.service.executors import (
+    EndpointExecutor,
+    EndpointExecutorRoute,
+    run_in,
+)
+
+
+class TestExecutors:
+    @pytest.fixture()
+    def executor(self) -> EndpointExecutor:
+        executor = EndpointExecutor(name="test", max_workers=1)
+        yield executor
+        executor.shutdown()
+
+    def test_run(self, executor):
+        Metrics.reset()
+        assert asyncio.run(executor.run(lambda value: value + 1, 1)) == 2
+        assert Metrics.value("test_executor_calls") == 1
+        assert Metrics.value("test_executor_queue_depth") == 0
+        assert Metrics.value("test_executor_active") == 0
+        assert Metrics.value("test_executor_wait_seconds") >= 0
+
+    def test_run_propagates_error(self, executor):
+        def failing_call():
+            raise ValueError("call failed")
+
+        with pytest.raises(ValueError, match="call failed"):
+            asyncio.run(executor.run(failing_call))
+
+    def test_run_reports_queue_depth(self, executor):
+        Metrics.reset()
+        release = threading.Event()
+
+        async def run_calls():
+            blocked = asyncio.ensure_future(executor.run(release.wait, 5))
+            queued = asyncio.ensure_future(executor.run(lambda: "queued"))
+            while Metrics.value("test_executor_queue_depth") != 1:
+                await asyncio.sleep(0.001)
+            assert Metrics.value("test_executor_active") == 1
+            release.set()
+            return await blocked, await queued
+
+        assert asyncio.run(run_calls()) == (True, "queued")
+
+    def test_run_cancelled_before_start(self, executor):
+        Metrics.reset()
+        release = threading.Event()
+
+        async def run_calls():
+            blocked = asyncio.ensure_future(executor.run(release.wait, 5))
+            queued = asyncio.ensure_future(executor.run(lambda: "queued"))
+            while Metrics.value("test_executor_queue_depth") != 1:
+                await asyncio.sleep(0.001)
+            queued.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await queued
+            release.set()
+            await blocked
+
+        asyncio.run(run_calls())
+        assert Metrics.value("test_executor_queue_depth") == 0
+
+    def test_run_in_preserves_signature(self, executor):
+        @run_in(executor)
+        def endpoint(question: str, limit: int = 3):
+            return question * limit
+
+        assert inspect.iscoroutinefunction(endpoint)
+        assert list(inspect.signature(endpoint).parameters) == ["question", "limit"]
+        assert asyncio.run(endpoint("a", limit=2)) == "aa"
+
+    def test_endpoint_executor_route_serializes_on_executor(self, executor):
+        serializing_threads = []
+
+        class Item(BaseModel):
+            name: str
+            description: Union[str, None] = None
+
+            @validator("name")
+            def record_thread(cls, value):
+                serializing_threads.append(threading.current_thread().name)
+                return value
+
+        app = FastAPI()
+        app.router.route_class = EndpointExecutorRoute
+
+        @app.post(
+            "/items",
+            status_code=201,
+            response_model=Item,
+            response_model_exclude_none=True,
+        )
+        @run_in(executor)
+        def create_item(name: str):
+            return {"name": name, "price": 1.0}
+
+        response = TestClient(app).post("/items", params={"name": "test item"})
+        assert response.status_code == 201
+        assert response.json() == {"name": "test item"}
+        assert serializing_threads == ["test-endpoint_0"]
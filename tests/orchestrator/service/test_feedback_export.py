@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2022 PrimeQA Team
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import gzip
+import json
+
+import pytest
+
+from orchestrator.exceptions import Error
+from orchestrator.service import feedback_export
+from orchestrator.service.feedback_export import (
+    export_feedbacks,
+    iter_feedbacks_in_format,
+)
+from orchestrator.store import Store
+
+
+class TestFeedbackExport:
+    @pytest.fixture()
+    def store(self, tmp_path, monkeypatch) -> Store:
+        monkeypatch.setenv("STORE_DIR", str(tmp_path / "store"))
+        store = Store()
+        store.save_feedbacks(
+            [
+                {
+                    "feedback_id": f"feedback {idx}",
+                    "user_id": "user 1",
+                    "question": f"question {idx}",
+                    "answer": "answer",
+                    "thumbs_up": idx % 2 == 0,
+                    "thumbs_down": idx % 2 == 1,
+                    "context": "context with answer",
+                    "start_char_offset": 13,
+                    "end_char_offset": 19,
+                    "application": "reading" if idx < 6 else "retrieval",
+                }
+                for idx in range(10)
+            ]
+        )
+        yield store
+        store.close()
+
+    def test_iter_feedbacks_in_primeqa_format(self, store):
+        chunks = list(
+            iter_feedbacks_in_format(
+                store,
+                where_clauses={"application": ["reading"]},
+                response_format="primeqa",
+                chunk_size=2,
+            )
+        )
+
+        # Only positive feedbacks, with ids consecutive across chunks
+        assert [len(chunk) for chunk in chunks] == [2, 1]
+        assert sum(chunks, []) == [
+            {
+                "id": str(idx),
+                "question": f"question {idx * 2}",
+                "context": "context with answer",
+                "answers": {"text": ["answer"], "answer_start": [13]},
+            }
+            for idx in range(3)
+        ]
+
+    @pytest.mark.parametrize("file_name", ["feedbacks.jsonl", "feedbacks.jsonl.gz"])
+    def test_export_feedbacks_to_jsonl(self, store, tmp_path, file_name):
+        path = str(tmp_path / file_name)
+        assert export_feedbacks(store, path, chunk_size=3) == 10
+
+        open_file = gzip.open if file_name.endswith(".gz") else open
+        with open_file(path, "rt") as feedbacks_file:
+            feedbacks = [json.loads(line) for line in feedbacks_file]
+        assert feedbacks == store.get_feedbacks()
+
+    def test_export_feedbacks_to_parquet(self, store, tmp_path):
+        pyarrow_parquet = pytest.importorskip("pyarrow.parquet")
+
+        path = str(tmp_path / "feedbacks.parquet")
+        assert export_feedbacks(store, path, response_format="primeqa") == 5
+
+        table = pyarrow_parquet.read_table(path)
+        assert table.column("id").to_pylist() == [str(idx) for idx in range(5)]
+
+    def test_export_feedbacks_to_parquet_without_pyarrow(self, store, tmp_path, mocker):
+        mocker.patch.object(feedback_export, "pyarrow", None)
+        with pytest.raises(Error) as error_info:
+            export_feedbacks(store, str(tmp_path / "feedbacks.parquet"))
+
+        assert error_info.value.args[0].startswith("E2002")
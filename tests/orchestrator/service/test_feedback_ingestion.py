@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2022 PrimeQA Team
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import json
+import sys
+
+import pytest
+
+from orchestrator.service import feedback_ingestion
+from orchestrator.service.feedback_ingestion import (
+    FeedbackIngestion,
+    InvalidLine,
+    ingest_feedbacks,
+    iter_lines,
+    parse_feedbacks,
+)
+from orchestrator.store import Store
+
+
+def build_feedback(feedback_id: str, **kwargs) -> dict:
+    return {
+        "feedback_id": feedback_id,
+        "user_id": "user 1",
+        "question": "test question",
+        "answer": "test answer",
+        "thumbs_up": True,
+        "thumbs_down": False,
+        **kwargs,
+    }
+
+
+class TestFeedbackIngestion:
+    @pytest.fixture()
+    def store(self, tmp_path, monkeypatch) -> Store:
+        monkeypatch.setenv("STORE_DIR", str(tmp_path))
+        store = Store()
+        yield store
+        store.close()
+
+    def test_parse_feedbacks(self):
+        feedbacks = [build_feedback("feedback 1"), build_feedback("feedback 2")]
+
+        assert parse_feedbacks(json.dumps(feedbacks).encode("utf-8")) == feedbacks
+        assert (
+            parse_feedbacks(
+                "\n".join(json.dumps(feedback) for feedback in feedbacks).encode(
+                    "utf-8"
+                )
+                + b"\n\n"
+            )
+            == feedbacks
+        )
+
+    def test_parse_feedbacks_with_invalid_lines(self):
+        items = parse_feedbacks(b'{"feedback_id": "feedback 1"}\n{"feedback_id"')
+        assert items[0] == {"feedback_id": "feedback 1"}
+        assert isinstance(items[1], InvalidLine)
+
+        with pytest.raises(ValueError):
+            parse_feedbacks(b'[{"feedback_id"')
+
+    def test_iter_lines(self):
+        async def chunks():
+            for chunk in [b'{"a": 1}\n{"b"', b": 2}\n", b"\n", b'{"c": 3}']:
+                yield chunk
+
+        async def collect():
+            return [line async for line in iter_lines(chunks(), head=b"\n")]
+
+        assert asyncio.run(collect()) == [
+            b"",
+            b'{"a": 1}',
+            b'{"b": 2}',
+            b"",
+            b'{"c": 3}',
+        ]
+
+    def test_feedback_ingestion_saves_full_chunks(self, store):
+        ingestion = FeedbackIngestion(store, chunk_size=2)
+
+        ingestion.add([build_feedback("feedback 1"), {"feedback_id": "feedback 2"}])
+        assert len(store.get_feedbacks()) == 0
+        ingestion.add([build_feedback("feedback 3"), build_feedback("feedback 4")])
+        assert len(store.get_feedbacks()) == 2
+
+        result = ingestion.finish()
+        assert len(store.get_feedbacks()) == 3
+        assert (result["saved"], result["invalid"], result["failed"]) == (3, 1, 0)
+        assert [item["index"] for item in result["items"]] == list(range(4))
+
+    def test_ingest_feedbacks(self, store):
+        store.save_feedback(
+            {**build_feedback("feedback 1", thumbs_up=False), "context": "context"}
+        )
+
+        result = ingest_feedbacks(
+            store,
+            [
+                build_feedback("feedback 1"),
+                {"feedback_id": "feedback 2"},
+                InvalidLine("test error"),
+                *[build_feedback(f"feedback {idx}") for idx in range(3, 8)],
+            ],
+            chunk_size=2,
+        )
+
+        assert (result["saved"], result["invalid"], result["failed"]) == (6, 2, 0)
+        assert [item["index"] for item in result["items"]] == list(range(8))
+        assert result["items"][2] == {
+            "index": 2,
+            "status": "invalid",
+            "error": "test error",
+        }
+
+        feedbacks = store.get_feedbacks()
+        assert len(feedbacks) == 6
+        assert feedbacks[0]["thumbs_up"]
+        assert feedbacks[0]["context"] is None
+
+    def test_ingest_feedbacks_with_failed_chunk(self, store):
+        # Feedback failing a constraint fails its chunk, other feedbacks in the chunk are still saved
+        store._connections.get().execute(
+            "CREATE TRIGGER reject BEFORE INSERT ON feedback_table WHEN NEW.answer='rejected' BEGIN SELECT RAISE(ABORT, 'rejected'); END"
+        )
+
+        result = ingest_feedbacks(
+            store,
+            [
+                build_feedback("feedback 1"),
+                build_feedback("feedback 2", answer="rejected"),
+                build_feedback("feedback 3"),
+            ],
+            chunk_size=10,
+        )
+
+        assert [item["status"] for item in result["items"]] == [
+            "saved",
+            "failed",
+            "saved",
+        ]
+        assert result["items"][1]["error"] == "rejected"
+        assert len(store.get_feedbacks()) == 2
+
+    def test_main(self, store, tmp_path, mocker, capsys):
+        feedbacks_file = tmp_path / "feedbacks.jsonl"
+        feedbacks_file.write_text(
+            "\n".join(
+                json.dumps(build_feedback(f"feedback {idx}")) for idx in range(100)
+            )
+        )
+        mocker.patch.object(
+            feedback_ingestion.StoreFactory, "get_store", return_value=store
+        )
+        mocker.patch.object(
+            sys,
+            "argv",
+            ["feedback_ingestion", str(feedbacks_file), "--chunk-size", "7"],
+        )
+
+        with pytest.raises(SystemExit) as exit_info:
+            feedback_ingestion.main()
+
+        assert exit_info.value.code == 0
+        assert "saved: 100, invalid: 0, failed: 0" in capsys.readouterr().out
+        assert len(store.get_feedbacks()) == 100
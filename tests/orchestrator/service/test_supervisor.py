@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2022 PrimeQA Team
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import signal
+import time
+import pytest
+import uvicorn
+
+from orchestrator.service.supervisor import Supervisor
+
+
+class SleepingSupervisor(Supervisor):
+    def _run_worker(self, sock):
+        time.sleep(60)
+
+
+class TestSupervisor:
+    @pytest.fixture()
+    def supervisor(self) -> Supervisor:
+        supervisor = SleepingSupervisor(
+            uvicorn.Config("orchestrator.service.application:app", port=0),
+            num_workers=2,
+            graceful_timeout=5,
+        )
+        supervisor.start()
+        yield supervisor
+        supervisor.stop()
+        supervisor._socket.close()
+
+    def _is_alive(self, pid: int) -> bool:
+        try:
+            os.kill(pid, 0)
+            return True
+        except ProcessLookupError:
+            return False
+
+    def test_start(self, supervisor):
+        assert len(supervisor.workers) == 2
+        assert all(self._is_alive(pid) for pid in supervisor.workers)
+
+    def test_reap_workers_restarts_crashed_worker(self, supervisor):
+        crashed_pid = next(iter(supervisor.workers))
+        os.kill(crashed_pid, signal.SIGKILL)
+
+        exited = []
+        while not exited:
+            exited = supervisor.reap_workers()
+            time.sleep(0.01)
+
+        assert exited == [crashed_pid]
+        assert len(supervisor.workers) == 2
+        assert crashed_pid not in supervisor.workers
+
+    def test_reload(self, supervisor):
+        old_pids = set(supervisor.workers)
+        supervisor.reload()
+        assert len(supervisor.workers) == 2
+        assert not old_pids & set(supervisor.workers)
+        assert not any(self._is_alive(pid) for pid in old_pids)
+
+    def test_stop(self, supervisor):
+        pids = list(supervisor.workers)
+        supervisor.stop()
+        assert not supervisor.workers
+        assert not any(self._is_alive(pid) for pid in pids)
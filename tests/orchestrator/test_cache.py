@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2022 PrimeQA Team
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+import threading
+import time
+import pytest
+
+from orchestrator.cache import (
+    LoadingCache,
+    PersistentCache,
+    SingleFlight,
+    TieredCache,
+    build_cache_key,
+)
+from orchestrator.exceptions import Error
+from orchestrator.metrics import Metrics
+
+
+class TestCache:
+    @pytest.fixture()
+    def persistent_cache(self, tmp_path) -> PersistentCache:
+        cache = PersistentCache(
+            db_file=str(tmp_path / "cache_db.db"), ttl=60, compaction_interval=0
+        )
+        yield cache
+        cache.close()
+
+    def test_build_cache_key(self):
+        assert build_cache_key("a", "b") == build_cache_key("a", "b")
+        assert build_cache_key("a", "b") != build_cache_key("ab")
+
+    def test_loading_cache(self):
+        Metrics.reset()
+        cache = LoadingCache(name="test", ttl=60, beta=0.0)
+        loader = MagicMock(return_value={"value": 1})
+        assert cache.get("key 1", loader) == {"value": 1}
+        assert cache.get("key 1", loader) == {"value": 1}
+        loader.assert_called_once()
+        assert Metrics.value("test_misses") == 1
+        assert Metrics.value("test_hits") == 1
+
+    def test_loading_cache_with_expired_entry(self):
+        cache = LoadingCache(name="test", ttl=60, beta=0.0)
+        cache.set("key 1", 1)
+        cache._entries["key 1"].expires_at = time.time() - 1
+        assert cache.get("key 1", lambda: 2) == 2
+
+    def test_loading_cache_ttl_jitter(self):
+        cache = LoadingCache(name="test", ttl=100, jitter=0.1)
+        for idx in range(50):
+            cache.set(f"key {idx}", idx)
+        expiries = [entry.expires_at - time.time() for entry in cache._entries.values()]
+        assert all(89 <= expiry <= 110 for expiry in expiries)
+        assert len(set(expiries)) > 1
+
+    def test_loading_cache_early_refresh(self):
+        Metrics.reset()
+        cache = LoadingCache(name="test", ttl=60, beta=1.0)
+        cache.set("key 1", 1, delta=1e6)
+        assert cache.get("key 1", lambda: 2) == 2
+        assert Metrics.value("test_early_refreshes") == 1
+
+    def test_loading_cache_serves_stale_value_on_error(self):
+        Metrics.reset()
+        cache = LoadingCache(name="test", ttl=60, beta=0.0, stale_ttl=60)
+        cache.set("key 1", 1)
+        cache._entries["key 1"].expires_at = time.time() - 1
+        loader = MagicMock(side_effect=Error("backend failed"))
+        assert cache.get("key 1", loader) == 1
+        assert Metrics.value("test_stale_served") == 1
+
+        # Beyond stale period, error is raised
+        cache._entries["key 1"].stale_until = time.time() - 1
+        with pytest.raises(Error, match="backend failed"):
+            cache.get("key 1", loader)
+
+    def test_loading_cache_evicts_least_recently_used(self):
+        cache = LoadingCache(name="test", ttl=60, max_size=2, beta=0.0)
+        cache.set("key 1", 1)
+        cache.set("key 2", 2)
+        cache.get("key 1", lambda: None)
+        cache.set("key 3", 3)
+        assert len(cache) == 2
+        assert "key 2" not in cache._entries
+        cache.invalidate("key 1")
+        assert len(cache) == 1
+        cache.invalidate()
+        assert len(cache) == 0
+
+    def test_persistent_cache(self, tmp_path, persistent_cache):
+        persistent_cache.set("key 1", {"value": 1}, version="v1")
+        assert persistent_cache.get("key 1", version="v1") == {"value": 1}
+        assert persistent_cache.get("key 1", version="v2") is None
+
+        # Entries survive re-opening the cache
+        reopened_cache = PersistentCache(
+            db_file=str(tmp_path / "cache_db.db"), ttl=60, compaction_interval=0
+        )
+        assert reopened_cache.get("key 1", version="v1") == {"value": 1}
+        reopened_cache.close()
+
+    def test_persistent_cache_compact(self, persistent_cache):
+        persistent_cache.set("key 1", 1, ttl=-1)
+        persistent_cache.set("key 2", 2, version="v1")
+        persistent_cache.set("key 3", 3, version="v2")
+        assert persistent_cache.get("key 1") is None
+        assert persistent_cache.compact(version="v2") == 2
+        assert persistent_cache.get("key 3", version="v2") == 3
+
+    def test_tiered_cache(self, persistent_cache):
+        persistent_cache.set("key 1", {"value": 1}, version="v1")
+        cache = TieredCache(
+            memory=LoadingCache(name="test", ttl=60, beta=0.0),
+            persistent=persistent_cache,
+        )
+        loader = MagicMock(return_value=2)
+        assert cache.get("key 1", loader, version="v1") == {"value": 1}
+        loader.assert_not_called()
+
+        assert cache.get("key 2", loader, version="v1") == 2
+        assert cache.get("key 2", loader, version="v1") == 2
+        loader.assert_called_once()
+        assert persistent_cache.get("key 2", version="v1") == 2
+
+    def test_single_flight(self):
+        Metrics.reset()
+        single_flight = SingleFlight(name="test")
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def slow_call():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return {"value": 1}
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            leader = executor.submit(single_flight.do, "key", slow_call)
+            started.wait(5)
+            followers = [
+                executor.submit(single_flight.do, "key", slow_call) for _ in range(3)
+            ]
+            while single_flight._calls["key"].followers < 3:
+                time.sleep(0.001)
+            release.set()
+
+            assert leader.result() == ({"value": 1}, False)
+            for follower in followers:
+                assert follower.result() == ({"value": 1}, True)
+
+        assert len(calls) == 1
+        assert Metrics.value("test_executions") == 1
+        assert Metrics.value("test_coalesced_calls") == 3
+
+    def test_single_flight_propagates_leader_error(self):
+        single_flight = SingleFlight(name="test")
+        started = threading.Event()
+        release = threading.Event()
+
+        def failing_call():
+            started.set()
+            release.wait(5)
+            raise ValueError("leader failed")
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            leader = executor.submit(single_flight.do, "key", failing_call)
+            started.wait(5)
+            follower = executor.submit(single_flight.do, "key", failing_call)
+            while not single_flight._calls["key"].followers:
+                time.sleep(0.001)
+            release.set()
+
+            with pytest.raises(ValueError, match="leader failed"):
+                leader.result()
+            with pytest.raises(ValueError, match="leader failed"):
+                follower.result()
+
+        # Subsequent calls are not affected by previous failure
+        assert single_flight.do("key", lambda: 1) == (1, False)
@@ -0,0 +1,33 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2022 PrimeQA Team
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from orchestrator.metrics import Metrics
+
+
+class TestMetrics:
+    def test_metrics(self):
+        Metrics.reset()
+        Metrics.increment("test_counter")
+        Metrics.increment("test_counter", 2)
+        Metrics.set("test_gauge", 0.5)
+        assert Metrics.value("test_counter") == 3
+        assert Metrics.value("test_gauge") == 0.5
+        assert Metrics.value("missing") is None
+        assert Metrics.get() == {
+            "counters": {"test_counter": 3},
+            "gauges": {"test_gauge": 0.5},
+        }
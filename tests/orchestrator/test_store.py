@@ -0,0 +1,494 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2022 PrimeQA Team
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import sqlite3
+import threading
+
+import pytest
+
+from orchestrator.constants import FEEDBACK
+from orchestrator.store import (
+    SCHEMA_VERSION,
+    Store,
+    WriteBehindQueue,
+    build_select_clause,
+    build_where_clause,
+    migrate,
+)
+
+
+def build_feedback(feedback_id: str, user_id: str = "user 1", **kwargs) -> dict:
+    return {
+        "feedback_id": feedback_id,
+        "user_id": user_id,
+        "question": "test question",
+        "answer": "test answer",
+        "thumbs_up": True,
+        "thumbs_down": False,
+        "context": "test context",
+        "start_char_offset": 0,
+        "end_char_offset": 11,
+        "application": "reading",
+        **kwargs,
+    }
+
+
+class TestStore:
+    @pytest.fixture()
+    def store(self, tmp_path, monkeypatch) -> Store:
+        monkeypatch.setenv("STORE_DIR", str(tmp_path))
+        store = Store()
+        yield store
+        store.close()
+
+    def test_save_feedback(self, store):
+        assert store.save_feedback(build_feedback("feedback 1")) == build_feedback(
+            "feedback 1"
+        )
+        store.save_feedback(build_feedback("feedback 2", user_id="user 2"))
+
+        assert store.get_feedbacks(where_clauses={"feedback_id": "feedback 1"}) == [
+            build_feedback("feedback 1")
+        ]
+        assert len(store.get_feedbacks()) == 2
+
+    @pytest.mark.parametrize("supports_returning", [True, False])
+    def test_save_existing_feedback(self, store, mocker, supports_returning):
+        mocker.patch("orchestrator.store._SUPPORTS_RETURNING", supports_returning)
+        assert store.save_feedback(build_feedback("feedback 1")) == build_feedback(
+            "feedback 1"
+        )
+
+        saved_feedback = store.save_feedback(
+            build_feedback("feedback 1", thumbs_up=False, thumbs_down=True)
+        )
+        assert not saved_feedback["thumbs_up"]
+        assert saved_feedback["thumbs_down"]
+        assert store.get_feedbacks() == [saved_feedback]
+
+    @pytest.mark.parametrize("supports_returning", [True, False])
+    def test_save_feedback_updates_provided_fields_only(
+        self, store, mocker, supports_returning
+    ):
+        mocker.patch("orchestrator.store._SUPPORTS_RETURNING", supports_returning)
+        store.save_feedback(build_feedback("feedback 1"))
+
+        saved_feedback = store.save_feedback(
+            {
+                "feedback_id": "feedback 1",
+                "user_id": "user 1",
+                "thumbs_up": False,
+                "thumbs_down": True,
+            }
+        )
+        assert saved_feedback == build_feedback(
+            "feedback 1", thumbs_up=False, thumbs_down=True
+        )
+
+    def test_save_feedback_failure(self, store):
+        store._connections.get().execute("DROP TABLE feedback_table")
+        assert store.save_feedback(build_feedback("feedback 1")) is None
+
+    def test_update_and_delete_feedback(self, store):
+        store.save_feedback(build_feedback("feedback 1"))
+
+        assert store.update_feedback(
+            "feedback 1", "user 1", {"user_id": "user 1", "answer": "new answer"}
+        ) == {"OK": True}
+        assert store.get_feedbacks()[0]["answer"] == "new answer"
+
+        assert store.delete_feedback("feedback 1", "user 1") == {"OK": True}
+        assert store.get_feedbacks() == []
+
+    def test_feedback_writes_do_not_print(self, store, capsys):
+        store.save_feedback(build_feedback("feedback 1"))
+        store.update_feedback("feedback 1", "user 1", {"answer": "new answer"})
+        store.delete_feedback("feedback 1", "user 1")
+
+        assert capsys.readouterr().out == ""
+
+    def test_connections_are_reused_per_thread(self, store):
+        conn = store._connections.get()
+        assert store._connections.get() is conn
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+
+        other_thread_conn = []
+        thread = threading.Thread(
+            target=lambda: other_thread_conn.append(store._connections.get())
+        )
+        thread.start()
+        thread.join()
+        assert other_thread_conn[0] is not conn
+
+    def test_concurrent_feedback_writes(self, store):
+        def write(idx):
+            store.save_feedback(build_feedback(f"feedback {idx}"))
+            return store.get_feedbacks(where_clauses={"feedback_id": f"feedback {idx}"})
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(write, range(200)))
+
+        assert all(len(result) == 1 for result in results)
+        assert len(store.get_feedbacks()) == 200
+
+    def test_schema_version(self, store):
+        conn = store._connections.get()
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+        assert migrate(conn) == SCHEMA_VERSION
+
+        indexes = {
+            row[0]
+            for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type='index' AND tbl_name='feedback_table'"
+            )
+        }
+        assert {
+            "feedback_table_feedback_id_user_id",
+            "feedback_table_application",
+            "feedback_table_user_id",
+        } <= indexes
+
+    def test_feedback_lookups_use_indexes(self, store):
+        conn = store._connections.get()
+        for query in [
+            "SELECT * FROM feedback_table WHERE feedback_id='feedback 1' AND user_id='user 1'",
+            "SELECT * FROM feedback_table WHERE application='reading'",
+            "SELECT * FROM feedback_table WHERE user_id='user 1'",
+            build_select_clause() + " WHERE feedback_id='feedback 1'",
+        ]:
+            plan = " ".join(
+                row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}")
+            )
+            assert "USING INDEX" in plan
+
+    def test_migrate_existing_database(self, tmp_path, monkeypatch):
+        # Database created before schema versioning, with duplicate feedbacks
+        conn = sqlite3.connect(str(tmp_path / "sqlite_db.db"))
+        conn.execute(
+            "CREATE TABLE feedback_table (feedback_id VARCHAR, user_id VARCHAR, question VARCHAR, answer VARCHAR, thumbs_up BOOLEAN, thumbs_down BOOLEAN, context VARCHAR, start_char_offset INTEGER, end_char_offset INTEGER, application VARCAR)"
+        )
+        conn.executemany(
+            "INSERT INTO feedback_table VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                list(build_feedback("feedback 1", answer="old answer").values()),
+                list(build_feedback("feedback 1", answer="new answer").values()),
+                list(build_feedback("feedback 2").values()),
+            ],
+        )
+        conn.commit()
+        conn.close()
+
+        monkeypatch.setenv("STORE_DIR", str(tmp_path))
+        store = Store()
+        try:
+            feedbacks = store.get_feedbacks()
+            assert len(feedbacks) == 2
+            assert feedbacks[0]["answer"] == "new answer"
+            assert feedbacks[0]["context"] == "test context"
+            assert (
+                store._connections.get()
+                .execute("SELECT COUNT(*) FROM context_table")
+                .fetchone()[0]
+                == 1
+            )
+            assert (
+                store._connections.get().execute("PRAGMA user_version").fetchone()[0]
+                == SCHEMA_VERSION
+            )
+        finally:
+            store.close()
+
+    def test_migrate_existing_database_drops_duplicates(
+        self, tmp_path, monkeypatch, caplog
+    ):
+        # Database created before unique (feedback_id, user_id) index, with duplicate feedbacks
+        conn = sqlite3.connect(str(tmp_path / "sqlite_db.db"))
+        conn.execute(
+            "CREATE TABLE feedback_table (feedback_id VARCHAR, user_id VARCHAR, question VARCHAR, answer VARCHAR, thumbs_up BOOLEAN, thumbs_down BOOLEAN, context VARCHAR, start_char_offset INTEGER, end_char_offset INTEGER, application VARCAR)"
+        )
+        conn.executemany(
+            "INSERT INTO feedback_table VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                list(build_feedback("feedback 1", answer="first answer").values()),
+                list(build_feedback("feedback 2").values()),
+                list(build_feedback("feedback 1", answer="second answer").values()),
+                list(
+                    build_feedback(
+                        "feedback 1", user_id="other user", answer="other answer"
+                    ).values()
+                ),
+                list(build_feedback("feedback 1", answer="third answer").values()),
+            ],
+        )
+        conn.commit()
+        conn.close()
+
+        monkeypatch.setenv("STORE_DIR", str(tmp_path))
+        with caplog.at_level(logging.WARNING, logger="orchestrator.store"):
+            store = Store()
+        try:
+            feedbacks = store.get_feedbacks(where_clauses={"feedback_id": "feedback 1"})
+            assert sorted(feedback["answer"] for feedback in feedbacks) == [
+                "other answer",
+                "third answer",
+            ]
+            assert len(store.get_feedbacks()) == 3
+        finally:
+            store.close()
+
+        assert "Dropped 2 duplicate feedback(s)" in caplog.text
+
+    def test_get_feedbacks_page(self, store):
+        for idx in range(25):
+            store.save_feedback(
+                build_feedback(f"feedback {idx}", user_id=f"user {idx % 2}")
+            )
+
+        pages = []
+        after = None
+        while True:
+            feedbacks, after = store.get_feedbacks_page(
+                where_clauses={"user_id": ["user 0"]}, limit=5, after=after
+            )
+            pages.append([feedback["feedback_id"] for feedback in feedbacks])
+            if after is None:
+                break
+
+        assert [len(page) for page in pages] == [5, 5, 3]
+        assert sum(pages, []) == [f"feedback {idx}" for idx in range(0, 25, 2)]
+
+    def test_get_feedbacks_page_after_vacuum(self, store):
+        for idx in range(10):
+            store.save_feedback(build_feedback(f"feedback {idx}"))
+
+        feedbacks, after = store.get_feedbacks_page(limit=5)
+        assert [feedback["feedback_id"] for feedback in feedbacks] == [
+            f"feedback {idx}" for idx in range(5)
+        ]
+
+        # NOTE: VACUUM may renumber implicit rowids, positions are explicit "INTEGER PRIMARY KEY" row ids
+        assert ("feedback_row_id", "INTEGER", 1) in [
+            (column[1], column[2], column[5])
+            for column in store._connections.get().execute(
+                "PRAGMA table_info(feedback_table)"
+            )
+        ]
+        for idx in range(3):
+            store.delete_feedback(f"feedback {idx}", "user 1")
+        store._connections.get().execute("VACUUM")
+
+        feedbacks, _ = store.get_feedbacks_page(limit=5, after=after)
+        assert [feedback["feedback_id"] for feedback in feedbacks] == [
+            f"feedback {idx}" for idx in range(5, 10)
+        ]
+
+    def test_iter_feedbacks(self, store):
+        for idx in range(10):
+            store.save_feedback(build_feedback(f"feedback {idx}"))
+
+        chunks = store.iter_feedbacks(chunk_size=4)
+        first_chunk = next(chunks)
+
+        # Feedbacks saved during iteration are not visible to it
+        store.save_feedback(build_feedback("feedback 10"))
+
+        assert [len(chunk) for chunk in [first_chunk, *chunks]] == [4, 4, 2]
+        assert len(store.get_feedbacks()) == 11
+
+    def test_build_where_clause(self):
+        assert build_where_clause() == ("", [])
+
+        # Conditions are ordered by column, lists are padded to the next arity
+        where_clause, params = build_where_clause(
+            {
+                FEEDBACK.APPLICATION: ["reading", "qa", "retrieval"],
+                "feedback_id": "feedback 1",
+            }
+        )
+        assert where_clause == " WHERE feedback_id=? AND application IN (?, ?, ?, ?)"
+        assert params == ["feedback 1", "reading", "qa", "retrieval", "retrieval"]
+
+        # Filters with similar numbers of values share the same statement
+        assert (
+            build_where_clause({"user_id": ["user 1", "user 2", "user 3"]})[0]
+            == build_where_clause(
+                {"user_id": ["user 1", "user 2", "user 3", "user 4"]}
+            )[0]
+        )
+        assert (
+            build_where_clause({"user_id": [f"user {idx}" for idx in range(300)]})[
+                0
+            ].count("?")
+            == 512
+        )
+
+        with pytest.raises(ValueError):
+            build_where_clause({"feedback_id=feedback_id OR 1": "feedback 1"})
+
+    def test_get_feedbacks_with_quotes_in_values(self, store):
+        store.save_feedback(build_feedback('feedback "1"'))
+        store.save_feedback(build_feedback("feedback 2"))
+
+        assert [
+            feedback["feedback_id"]
+            for feedback in store.get_feedbacks(
+                where_clauses={"feedback_id": ['feedback "1"', "feedback 3"]}
+            )
+        ] == ['feedback "1"']
+        assert store.get_feedbacks(where_clauses={"unknown": "value"}) == []
+
+    def test_write_behind(self, store):
+        # Long flush interval, so that writes are only applied on read, flush or close
+        store.enable_write_behind(flush_interval=60)
+
+        assert store.save_feedback(build_feedback("feedback 1")) == build_feedback(
+            "feedback 1"
+        )
+        store.save_feedback(build_feedback("feedback 2"))
+        assert store.update_feedback(
+            "feedback 1", "user 1", {"answer": "new answer"}
+        ) == {"OK": True}
+        assert store.delete_feedback("feedback 2", "user 1") == {"OK": True}
+
+        # Reads see earlier writes
+        assert store.get_feedbacks() == [
+            build_feedback("feedback 1", answer="new answer")
+        ]
+
+    def test_write_behind_batches_writes(self, store, mocker):
+        apply = mocker.spy(WriteBehindQueue, "_apply")
+        store.enable_write_behind(flush_interval=60, batch_size=4)
+
+        for idx in range(10):
+            store.save_feedback(build_feedback(f"feedback {idx}"))
+        store.flush()
+
+        assert [len(call.args[2]) for call in apply.call_args_list] == [4, 4, 2]
+        assert len(store.get_feedbacks()) == 10
+
+    def test_write_behind_with_failed_write(self, store):
+        store._connections.get().execute(
+            "CREATE TRIGGER reject BEFORE INSERT ON feedback_table WHEN NEW.answer='rejected' BEGIN SELECT RAISE(ABORT, 'rejected'); END"
+        )
+        store.enable_write_behind(flush_interval=60)
+
+        store.save_feedback(build_feedback("feedback 1"))
+        store.save_feedback(build_feedback("feedback 2", answer="rejected"))
+        store.save_feedback(build_feedback("feedback 3"))
+
+        assert [feedback["feedback_id"] for feedback in store.get_feedbacks()] == [
+            "feedback 1",
+            "feedback 3",
+        ]
+
+    def test_write_behind_with_failed_write_binding(self, store):
+        store.enable_write_behind(flush_interval=60)
+
+        store.save_feedback(build_feedback("feedback 1"))
+        # NOTE: Binding integers beyond 64 bits raises "OverflowError", not "sqlite3.Error"
+        store.save_feedback(build_feedback("feedback 2", start_char_offset=2**70))
+        store.save_feedback(build_feedback("feedback 3"))
+
+        assert [feedback["feedback_id"] for feedback in store.get_feedbacks()] == [
+            "feedback 1",
+            "feedback 3",
+        ]
+        assert store._write_behind._writer.is_alive()
+        assert not store._connections.get().in_transaction
+
+    @pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+    def test_write_behind_restarts_stopped_writer(self, store):
+        store.enable_write_behind(flush_interval=60)
+
+        def stop_writer(conn):
+            raise SystemExit()
+
+        store._write_behind.submit(stop_writer)
+        assert store._write_behind.flush(timeout=5)
+        store._write_behind._writer.join(timeout=5)
+        assert not store._write_behind._writer.is_alive()
+
+        store.save_feedback(build_feedback("feedback 1"))
+        assert [feedback["feedback_id"] for feedback in store.get_feedbacks()] == [
+            "feedback 1"
+        ]
+
+    def test_write_behind_applies_queued_writes_on_close(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("STORE_DIR", str(tmp_path))
+        store = Store()
+        store.enable_write_behind(flush_interval=60)
+        store.save_feedback(build_feedback("feedback 1"))
+        store.close()
+
+        # Writes submitted after close are applied synchronously
+        assert store.save_feedback(build_feedback("feedback 2")) == build_feedback(
+            "feedback 2"
+        )
+        store.close()
+
+        reopened_store = Store()
+        assert len(reopened_store.get_feedbacks()) == 2
+        reopened_store.close()
+
+    def test_contexts_are_stored_once(self, store):
+        long_context = "PrimeQA is a public open source repository. " * 100
+        store.save_feedback(build_feedback("feedback 1", context=long_context))
+        store.save_feedbacks(
+            [
+                build_feedback(f"feedback {idx}", context=long_context)
+                for idx in range(2, 5)
+            ]
+            + [build_feedback("feedback 5", context=None)]
+        )
+        store.update_feedback("feedback 5", "user 1", {"context": "test context"})
+
+        conn = store._connections.get()
+        contexts = [row[0] for row in conn.execute("SELECT context FROM context_table")]
+        assert len(contexts) == 2
+
+        # Long contexts are stored compressed
+        assert any(
+            isinstance(context, bytes) and len(context) < len(long_context)
+            for context in contexts
+        )
+
+        feedbacks = store.get_feedbacks()
+        assert [feedback["context"] for feedback in feedbacks] == [long_context] * 4 + [
+            "test context"
+        ]
+        assert store.get_feedbacks_page(limit=10)[0] == feedbacks
+        assert next(store.iter_feedbacks()) == feedbacks
+        assert (
+            len(store.get_feedbacks(where_clauses={"context": [long_context, "other"]}))
+            == 4
+        )
+
+    def test_delete_unreferenced_contexts(self, store):
+        store.save_feedback(build_feedback("feedback 1", context="context 1"))
+        store.save_feedback(build_feedback("feedback 2", context="context 2"))
+        store.save_feedback(build_feedback("feedback 3", context="context 2"))
+        store.save_feedback(build_feedback("feedback 1", context="context 3"))
+        store.delete_feedback("feedback 2", "user 1")
+
+        assert store.delete_unreferenced_contexts() == 1
+        assert [feedback["context"] for feedback in store.get_feedbacks()] == [
+            "context 3",
+            "context 2",
+        ]
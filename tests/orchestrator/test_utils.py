@@ -19,6 +19,7 @@ from unittest.mock import MagicMock
 import pytest
 
 from orchestrator.utils import (
+    get_snippet_bounds,
     load_json,
     min_max_normalization,
     normalize,
@@ -100,3 +101,15 @@ class TestUtils:
         data_2 = [{"value": 5}]
         normalize(data_2, field="value")
         assert data_2[0]["confidence"] == 1.0
+
+    def test_get_snippet_bounds(self):
+        assert get_snippet_bounds(100, [(40, 50)], 10) == (30, 60)
+        assert get_snippet_bounds(100, [(5, 10), (80, 95)], 10) == (0, 100)
+        assert get_snippet_bounds(100, [], 10) == (0, 20)
+        assert get_snippet_bounds(100, [(40, 50)], -1) == (40, 50)
+
+    def test_get_snippet_bounds_with_max_length(self):
+        assert get_snippet_bounds(100, [], max_length=30) == (0, 30)
+        assert get_snippet_bounds(100, [(40, 50)], max_length=20) == (35, 55)
+        assert get_snippet_bounds(100, [(90, 98)], max_length=20) == (80, 100)
+        assert get_snippet_bounds(100, [(40, 50)], 10, max_length=100) == (30, 60)